@@ -0,0 +1,44 @@
+"""add data_points id timestamp index
+
+Revision ID: a3f1c9e2b7d4
+Revises: 59de50678d81
+Create Date: 2026-10-17 10:12:44.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f1c9e2b7d4'
+down_revision: Union[str, Sequence[str], None] = '59de50678d81'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY can't run inside a transaction, it builds the index without blocking writes to data_points
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_data_points_id_timestamp',
+            'data_points',
+            ['id', 'timestamp'],
+            unique=False,
+            postgresql_include=['decay_rate', 'items_flagged', 'notification_type'],
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_data_points_id_timestamp',
+            table_name='data_points',
+            postgresql_concurrently=True,
+            if_exists=True
+        )
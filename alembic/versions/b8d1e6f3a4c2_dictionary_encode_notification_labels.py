@@ -0,0 +1,100 @@
+"""dictionary encode notification labels
+
+Revision ID: b8d1e6f3a4c2
+Revises: f4a9c3e7b2d5
+Create Date: 2026-10-17 22:15:37.481093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d1e6f3a4c2'
+down_revision: Union[str, Sequence[str], None] = 'f4a9c3e7b2d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# label column of data_points and the lookup table holding its codes
+LABELS = [
+    ('notification_type', 'notification_types'),
+    ('notification_category', 'notification_categories'),
+]
+
+# same columns, in the same order, as data_points had before its labels were encoded
+DECODED_VIEW = """
+    CREATE VIEW data_points_decoded AS
+    SELECT points.dataset_id, points.id, points.timestamp, points.decay_value, points.items_flagged,
+        types.name AS notification_type, categories.name AS notification_category, points.decay_rate
+    FROM data_points AS points
+    LEFT JOIN notification_types AS types ON types.code = points.notification_type_code
+    LEFT JOIN notification_categories AS categories ON categories.code = points.notification_category_code
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for column, table in LABELS:
+        op.create_table(table,
+        sa.Column('code', sa.SmallInteger(), sa.Identity(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint('code'),
+        sa.UniqueConstraint('name')
+        )
+        op.execute(f"""
+            INSERT INTO {table} (name)
+            SELECT DISTINCT {column} FROM data_points WHERE {column} IS NOT NULL ORDER BY 1
+        """)
+        op.add_column('data_points', sa.Column(f'{column}_code', sa.SmallInteger(), nullable=True))
+
+    op.execute("""
+        UPDATE data_points AS points
+        SET notification_type_code = types.code, notification_category_code = categories.code
+        FROM data_points AS labels
+        LEFT JOIN notification_types AS types ON types.name = labels.notification_type
+        LEFT JOIN notification_categories AS categories ON categories.name = labels.notification_category
+        WHERE labels.dataset_id = points.dataset_id AND labels.timestamp = points.timestamp
+        AND (labels.notification_type IS NOT NULL OR labels.notification_category IS NOT NULL)
+    """)
+
+    op.drop_index('ix_data_points_id_timestamp', table_name='data_points')
+    for column, _ in LABELS:
+        op.drop_column('data_points', column)
+    op.create_index(
+        'ix_data_points_id_timestamp',
+        'data_points',
+        ['id', 'timestamp'],
+        unique=False,
+        postgresql_include=['decay_rate', 'items_flagged', 'notification_type_code']
+    )
+    op.execute(DECODED_VIEW)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP VIEW data_points_decoded")
+    for column, _ in LABELS:
+        op.add_column('data_points', sa.Column(column, sa.String(), nullable=True))
+    op.execute("""
+        UPDATE data_points AS points
+        SET notification_type = types.name, notification_category = categories.name
+        FROM data_points AS codes
+        LEFT JOIN notification_types AS types ON types.code = codes.notification_type_code
+        LEFT JOIN notification_categories AS categories ON categories.code = codes.notification_category_code
+        WHERE codes.dataset_id = points.dataset_id AND codes.timestamp = points.timestamp
+        AND (codes.notification_type_code IS NOT NULL OR codes.notification_category_code IS NOT NULL)
+    """)
+
+    op.drop_index('ix_data_points_id_timestamp', table_name='data_points')
+    for column, table in LABELS:
+        op.drop_column('data_points', f'{column}_code')
+        op.drop_table(table)
+    op.create_index(
+        'ix_data_points_id_timestamp',
+        'data_points',
+        ['id', 'timestamp'],
+        unique=False,
+        postgresql_include=['decay_rate', 'items_flagged', 'notification_type']
+    )
@@ -0,0 +1,112 @@
+"""partition data_points by month
+
+Revision ID: c7e4b2a9d1f3
+Revises: a3f1c9e2b7d4
+Create Date: 2026-10-17 14:36:05.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e4b2a9d1f3'
+down_revision: Union[str, Sequence[str], None] = 'a3f1c9e2b7d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# partitions created past the current month, later months are added by DataPointPartitionMaintainer
+MONTHS_AHEAD = 3
+
+COLUMNS = "dataset_id, id, timestamp, decay_value, items_flagged, notification_type, notification_category, decay_rate"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # the partition key must be part of the primary key, so timestamp becomes NOT NULL
+    op.execute("""
+        CREATE TABLE data_points_partitioned (
+            dataset_id VARCHAR NOT NULL,
+            id VARCHAR,
+            timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            decay_value FLOAT,
+            items_flagged INTEGER,
+            notification_type VARCHAR,
+            notification_category VARCHAR,
+            decay_rate FLOAT
+        ) PARTITION BY RANGE (timestamp)
+    """)
+    # rows outside every monthly partition, e.g. backfills older than the oldest month
+    op.execute("CREATE TABLE data_points_default PARTITION OF data_points_partitioned DEFAULT")
+
+    # one partition per month from the oldest data point up to MONTHS_AHEAD months from now
+    op.execute(f"""
+        DO $$
+        DECLARE
+            month DATE;
+        BEGIN
+            FOR month IN
+                SELECT generate_series(
+                    date_trunc('month', coalesce((SELECT min(timestamp) FROM data_points), CURRENT_DATE)),
+                    date_trunc('month', CURRENT_DATE) + INTERVAL '{MONTHS_AHEAD} months',
+                    INTERVAL '1 month'
+                )::DATE
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF data_points_partitioned FOR VALUES FROM (%L) TO (%L)',
+                    'data_points_' || to_char(month, 'YYYY_MM'),
+                    month,
+                    (month + INTERVAL '1 month')::DATE
+                );
+            END LOOP;
+        END $$
+    """)
+
+    # no statement matches a point without a timestamp, they are kept in the default partition at the epoch
+    op.execute(f"""
+        INSERT INTO data_points_partitioned ({COLUMNS})
+        SELECT dataset_id, id, coalesce(timestamp, 'epoch'), decay_value, items_flagged, notification_type,
+            notification_category, decay_rate
+        FROM data_points
+    """)
+    op.drop_table('data_points')
+    op.rename_table('data_points_partitioned', 'data_points')
+
+    op.create_primary_key('data_points_pkey', 'data_points', ['dataset_id', 'timestamp'])
+    op.create_index(
+        'ix_data_points_id_timestamp',
+        'data_points',
+        ['id', 'timestamp'],
+        unique=False,
+        postgresql_include=['decay_rate', 'items_flagged', 'notification_type']
+    )
+    op.execute("ANALYZE data_points")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_table('data_points_unpartitioned',
+    sa.Column('dataset_id', sa.String(), nullable=False),
+    sa.Column('id', sa.String(), nullable=True),
+    sa.Column('timestamp', sa.DateTime(), nullable=True),
+    sa.Column('decay_value', sa.Float(), nullable=True),
+    sa.Column('items_flagged', sa.Integer(), nullable=True),
+    sa.Column('notification_type', sa.String(), nullable=True),
+    sa.Column('notification_category', sa.String(), nullable=True),
+    sa.Column('decay_rate', sa.Float(), nullable=True)
+    )
+    op.execute(f"INSERT INTO data_points_unpartitioned ({COLUMNS}) SELECT {COLUMNS} FROM data_points")
+    # drops every partition with it
+    op.drop_table('data_points')
+    op.rename_table('data_points_unpartitioned', 'data_points')
+
+    op.create_primary_key('data_points_pkey', 'data_points', ['dataset_id'])
+    op.create_index(
+        'ix_data_points_id_timestamp',
+        'data_points',
+        ['id', 'timestamp'],
+        unique=False,
+        postgresql_include=['decay_rate', 'items_flagged', 'notification_type']
+    )
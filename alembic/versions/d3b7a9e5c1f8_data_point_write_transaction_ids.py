@@ -0,0 +1,43 @@
+"""data point write transaction ids
+
+Revision ID: d3b7a9e5c1f8
+Revises: b8d1e6f3a4c2
+Create Date: 2026-10-18 09:42:11.203518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3b7a9e5c1f8'
+down_revision: Union[str, Sequence[str], None] = 'b8d1e6f3a4c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DECODED_VIEW = """
+    CREATE OR REPLACE VIEW data_points_decoded AS
+    SELECT points.dataset_id, points.id, points.timestamp, points.decay_value, points.items_flagged,
+        types.name AS notification_type, categories.name AS notification_category, points.decay_rate{write_xid}
+    FROM data_points AS points
+    LEFT JOIN notification_types AS types ON types.code = points.notification_type_code
+    LEFT JOIN notification_categories AS categories ON categories.code = points.notification_category_code
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # existing rows get the frozen transaction id, visible in every snapshot, without rewriting the table
+    op.execute("ALTER TABLE data_points ADD COLUMN write_xid XID8 NOT NULL DEFAULT '2'")
+    op.execute("ALTER TABLE data_points ALTER COLUMN write_xid SET DEFAULT pg_current_xact_id()")
+    op.create_index('ix_data_points_id_write_xid', 'data_points', ['id', 'write_xid'], unique=False)
+    op.execute(DECODED_VIEW.format(write_xid=", points.write_xid"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP VIEW data_points_decoded")
+    op.execute(DECODED_VIEW.format(write_xid=""))
+    op.drop_index('ix_data_points_id_write_xid', table_name='data_points')
+    op.drop_column('data_points', 'write_xid')
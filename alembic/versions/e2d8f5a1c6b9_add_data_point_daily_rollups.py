@@ -0,0 +1,64 @@
+"""add data point daily rollups
+
+Revision ID: e2d8f5a1c6b9
+Revises: c7e4b2a9d1f3
+Create Date: 2026-10-17 17:03:51.224690
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2d8f5a1c6b9'
+down_revision: Union[str, Sequence[str], None] = 'c7e4b2a9d1f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('data_point_daily_rollups',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('notification_type', sa.String(), nullable=True),
+    sa.Column('notification_category', sa.String(), nullable=True),
+    sa.Column('point_count', sa.BigInteger(), nullable=False),
+    sa.Column('decay_value_count', sa.BigInteger(), nullable=False),
+    sa.Column('decay_value_sum', sa.Float(), nullable=False),
+    sa.Column('decay_value_sum_squares', sa.Float(), nullable=False),
+    sa.Column('decay_rate_count', sa.BigInteger(), nullable=False),
+    sa.Column('decay_rate_sum', sa.Float(), nullable=False),
+    sa.Column('decay_rate_sum_squares', sa.Float(), nullable=False),
+    sa.Column('items_flagged_count', sa.BigInteger(), nullable=False),
+    sa.Column('items_flagged_sum', sa.BigInteger(), nullable=False),
+    sa.Column('items_flagged_sum_squares', sa.Float(), nullable=False)
+    )
+    # NULLS NOT DISTINCT (Postgres 15+) so points without a type or category share one row per day
+    op.create_index(
+        'ux_data_point_daily_rollups_key',
+        'data_point_daily_rollups',
+        ['id', 'day', 'notification_type', 'notification_category'],
+        unique=True,
+        postgresql_nulls_not_distinct=True
+    )
+    # points written by processes still running the previous release are picked up by python -m src.backfill_rollups
+    op.execute("""
+        INSERT INTO data_point_daily_rollups
+        SELECT id, DATE(timestamp), notification_type, notification_category, count(*),
+            count(decay_value), coalesce(sum(decay_value), 0), coalesce(sum(decay_value * decay_value), 0),
+            count(decay_rate), coalesce(sum(decay_rate), 0), coalesce(sum(decay_rate * decay_rate), 0),
+            count(items_flagged), coalesce(sum(items_flagged), 0),
+            coalesce(sum(items_flagged::FLOAT * items_flagged), 0)
+        FROM data_points
+        WHERE id IS NOT NULL
+        GROUP BY id, DATE(timestamp), notification_type, notification_category
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ux_data_point_daily_rollups_key', table_name='data_point_daily_rollups')
+    op.drop_table('data_point_daily_rollups')
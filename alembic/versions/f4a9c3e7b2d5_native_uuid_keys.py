@@ -0,0 +1,51 @@
+"""native uuid keys
+
+Revision ID: f4a9c3e7b2d5
+Revises: e2d8f5a1c6b9
+Create Date: 2026-10-17 19:48:12.660431
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4a9c3e7b2d5'
+down_revision: Union[str, Sequence[str], None] = 'e2d8f5a1c6b9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# statement ids stay text, seeded ones aren't valid uuids and stored statements compare them as string literals
+UUID_COLUMNS = [
+    ('data_points', 'dataset_id'),
+    ('dataset_configs', 'id'),
+    ('view_configs', 'id'),
+    ('view_configs', 'element_id'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # rewrites each table and rebuilds its indexes, 16 byte keys instead of 36 characters of text
+    for table, column in UUID_COLUMNS:
+        op.alter_column(
+            table,
+            column,
+            existing_type=sa.String(),
+            type_=sa.Uuid(),
+            postgresql_using=f'{column}::uuid'
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, column in UUID_COLUMNS:
+        op.alter_column(
+            table,
+            column,
+            existing_type=sa.Uuid(),
+            type_=sa.String(),
+            postgresql_using=f'{column}::text'
+        )
@@ -0,0 +1,119 @@
+"""
+latency and allocations of loading dataset aggregates on a cold cache, in one statement with a json array
+of layouts hydrated from plain rows, versus the previous ORM select with selectinload of layouts and statement
+
+    python -m benchmarks.aggregate_loading
+
+needs DATABASE_URL pointing at a migrated database, the generated configurations are rolled back
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+import tracemalloc
+import uuid
+from typing import Awaitable, Callable
+
+from sqlalchemy import select, insert
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncConnection
+from sqlalchemy.orm import selectinload
+
+from src.core import DatasetConfigAggregate
+from src.infrastructure.data_access import load_dataset_aggregates
+from src.infrastructure.models import start_mappers, dataset_configs, sql_statements, view_configs
+
+Loader = Callable[[AsyncSession, list[str]], Awaitable[list[DatasetConfigAggregate]]]
+
+
+async def load_with_selectinload(session: AsyncSession, ids: list[str]) -> list[DatasetConfigAggregate]:
+    result = await session.execute(
+        select(DatasetConfigAggregate).where(DatasetConfigAggregate.id.in_(ids)).options(
+            selectinload(DatasetConfigAggregate.layouts),
+            selectinload(DatasetConfigAggregate.statement),
+        )
+    )
+    return list(result.scalars().all())
+
+
+LOADERS: dict[str, Loader] = {
+    "selectinload": load_with_selectinload,
+    "json_agg": load_dataset_aggregates,
+}
+
+
+async def generate(connection: AsyncConnection, count: int, layouts: int) -> list[str]:
+    ids = [str(uuid.uuid4()) for _ in range(count)]
+    statements = [str(uuid.uuid4()) for _ in range(count)]
+    await connection.execute(insert(sql_statements), [
+        {"id": x, "statement": "SELECT DATE(timestamp) AS time_point FROM data_points"} for x in statements
+    ])
+    await connection.execute(insert(dataset_configs), [
+        {"id": _id, "statement_id": statement_id, "is_mutable": True} for _id, statement_id in zip(ids, statements)
+    ])
+    await connection.execute(insert(view_configs), [
+        {"id": str(uuid.uuid4()), "element_id": _id, "breakpoint": f"bp{i}", "coordinates": [i, 0, 4, 4], "static": False}
+        for _id in ids for i in range(layouts)
+    ])
+    return ids
+
+
+async def measure(connection: AsyncConnection, load: Loader, ids: list[str], repeat: int) -> tuple[float, int, int, int]:
+    """
+    median seconds, peak bytes allocated during a load, and the bytes and blocks still allocated after it,
+    through a new session each time so nothing is served from an identity map
+    """
+    timings = []
+    for _ in range(repeat):
+        async with AsyncSession(bind=connection) as session:
+            started = time.perf_counter()
+            await load(session, ids)
+            timings.append(time.perf_counter() - started)
+
+    async with AsyncSession(bind=connection) as session:
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        traced, _ = tracemalloc.get_traced_memory()
+        aggregates = await load(session, ids)
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+    allocated = [x for x in after.compare_to(before, "filename") if x.size_diff > 0]
+    assert len(aggregates) == len(ids)
+    return statistics.median(timings), peak - traced, sum(x.size_diff for x in allocated), sum(x.count_diff for x in allocated)
+
+
+async def run(args) -> None:
+    start_mappers()
+    engine = create_async_engine(os.environ["DATABASE_URL"])
+    results = {}
+    try:
+        async with engine.connect() as connection:
+            transaction = await connection.begin()
+            try:
+                ids = await generate(connection, args.configs, args.layouts)
+                for batch in (1, args.configs):
+                    for name, load in LOADERS.items():
+                        results[name, batch] = await measure(connection, load, ids[:batch], args.repeat)
+            finally:
+                await transaction.rollback()
+    finally:
+        await engine.dispose()
+
+    print(f"layouts={args.layouts} repeat={args.repeat}")
+    print(f"{'loader':<14} {'configs':>8} {'median':>12} {'peak':>12} {'retained':>12} {'blocks':>9}")
+    for (name, batch), (seconds, peak, size, count) in results.items():
+        print(f"{name:<14} {batch:>8} {seconds * 1000:9.2f} ms {peak / 1024:9.1f} KB {size / 1024:9.1f} KB {count:>9,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--configs", type=int, default=200)
+    parser.add_argument("--layouts", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=50)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
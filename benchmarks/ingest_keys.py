@@ -0,0 +1,101 @@
+"""
+ingest rate and primary key index size of data points keyed by random uuid4 text (the previous schema),
+random uuid4 in a native uuid column, and time ordered uuid7 in a native uuid column (the current schema)
+
+    python -m benchmarks.ingest_keys
+
+needs DATABASE_URL, the tables are created in a transaction which is rolled back
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncConnection
+
+from src.crosscutting import uuid7
+
+VARIANTS = {
+    "text uuid4": ("VARCHAR", lambda: str(uuid.uuid4())),
+    "uuid uuid4": ("UUID", uuid.uuid4),
+    "uuid uuid7": ("UUID", uuid7),
+}
+
+
+async def ingest(connection: AsyncConnection,
+    name: str,
+    key_type: str,
+    new_key: Callable[[], Any],
+    rows: int,
+    batch_size: int
+) -> tuple[float, int, int]:
+    """
+    copies rows into a fresh table in batches, returns rows per second of copying, index and table bytes
+    """
+    table = f"ingest_keys_{name.replace(' ', '_')}"
+    await connection.execute(text(f"""
+        CREATE TABLE {table} (
+            dataset_id {key_type} PRIMARY KEY,
+            id VARCHAR,
+            timestamp TIMESTAMP WITHOUT TIME ZONE,
+            decay_value FLOAT,
+            items_flagged INTEGER
+        )
+    """))
+    raw_connection = await connection.get_raw_connection()
+    driver_connection = raw_connection.driver_connection
+
+    elapsed = 0.0
+    for written in range(0, rows, batch_size):
+        batch = [
+            (new_key(), "a1b2c3d4-e5f6-4789-abcd-123456789abc", datetime.now(), i * 0.5, i % 10)
+            for i in range(min(batch_size, rows - written))
+        ]
+        started = time.perf_counter()
+        await driver_connection.copy_records_to_table(
+            table,
+            records=batch,
+            columns=("dataset_id", "id", "timestamp", "decay_value", "items_flagged")
+        )
+        elapsed += time.perf_counter() - started
+
+    result = await connection.execute(text(
+        f"SELECT pg_relation_size('{table}_pkey'), pg_relation_size('{table}')"
+    ))
+    index_bytes, table_bytes = result.one()
+    return rows / elapsed, index_bytes, table_bytes
+
+
+async def run(args) -> None:
+    engine = create_async_engine(os.environ["DATABASE_URL"])
+    results = {}
+    try:
+        async with engine.connect() as connection:
+            transaction = await connection.begin()
+            try:
+                for name, (key_type, new_key) in VARIANTS.items():
+                    results[name] = await ingest(connection, name, key_type, new_key, args.rows, args.batch_size)
+            finally:
+                await transaction.rollback()
+    finally:
+        await engine.dispose()
+
+    print(f"rows={args.rows} batch_size={args.batch_size}")
+    print(f"{'keys':<12} {'rows/s':>12} {'pkey index':>14} {'table':>14}")
+    for name, (rate, index_bytes, table_bytes) in results.items():
+        print(f"{name:<12} {rate:12,.0f} {index_bytes / 2 ** 20:11.1f} MB {table_bytes / 2 ** 20:11.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--batch-size", type=int, default=5_000)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
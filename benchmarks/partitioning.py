@@ -0,0 +1,154 @@
+"""
+partitions scanned and execution time of the seeded statement shapes against the monthly partitioned data_points,
+versus the same rows in an unpartitioned table
+
+    python -m benchmarks.partitioning
+
+needs DATABASE_URL pointing at a migrated database, the generated rows and partitions are rolled back
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncConnection
+
+from src.infrastructure import FakeStatementGenerator
+from src.infrastructure.data_access import SqlAlchemyDataPointPartitionManager, shadow_data_points
+from src.infrastructure.partitioning import add_months
+
+GENERATED_ID = "f6a7b8c9-0d1e-4f23-a456-789012345f01"
+BETWEEN_ID = "a7b8c9d0-1e2f-4a34-b567-890123456a12"
+TYPES = ["Critical", "Info", "Warning"]
+CATEGORIES = ["Need approval", "System"]
+
+
+async def load_statements(seed_path: str) -> dict[str, str]:
+    with open(seed_path) as f:
+        statements = {x["id"]: x["statement"] for x in json.load(f)["queries"]}
+    statements[GENERATED_ID] = await FakeStatementGenerator()("", GENERATED_ID)
+    statements[BETWEEN_ID] = f"""
+        SELECT DATE(timestamp) AS time_point, SUM(items_flagged) AS data_value
+        FROM data_points
+        WHERE id = '{BETWEEN_ID}'
+        AND timestamp BETWEEN :start_date AND :end_date
+        GROUP BY DATE(timestamp);
+    """
+    return statements
+
+
+async def generate(connection: AsyncConnection, statement_ids: list[str], rows: int, months: int) -> int:
+    """
+    spreads rows evenly over the last `months` months for every statement, returns the number of partitions
+    """
+    today = date.today()
+    session = AsyncSession(bind=connection)
+    await SqlAlchemyDataPointPartitionManager(session)(start=add_months(today, -months), end=add_months(today, 3))
+    for table, names in (("notification_types", TYPES), ("notification_categories", CATEGORIES)):
+        await connection.execute(
+            text(f"INSERT INTO {table} (name) SELECT unnest(CAST(:names AS VARCHAR[])) ON CONFLICT (name) DO NOTHING"),
+            {"names": names}
+        )
+    await connection.execute(
+        text(f"""
+            INSERT INTO data_points (dataset_id, id, timestamp, decay_value, decay_rate, items_flagged,
+                notification_type_code, notification_category_code)
+            SELECT gen_random_uuid(), ids[1 + i % cardinality(ids)],
+                now() - make_interval(secs => random() * CAST(:seconds AS INTEGER)), random() * 100, random(),
+                (random() * 10)::int, types.codes[1 + i % {len(TYPES)}], categories.codes[1 + i % {len(CATEGORIES)}]
+            FROM generate_series(1, CAST(:rows AS INTEGER)) AS i, CAST(:ids AS VARCHAR[]) AS ids,
+                (SELECT array_agg(code ORDER BY name) AS codes FROM notification_types
+                    WHERE name = ANY(CAST(:types AS VARCHAR[]))) AS types,
+                (SELECT array_agg(code ORDER BY name) AS codes FROM notification_categories
+                    WHERE name = ANY(CAST(:categories AS VARCHAR[]))) AS categories
+        """),
+        {"ids": statement_ids, "seconds": months * 30 * 86400, "rows": rows, "types": TYPES, "categories": CATEGORIES}
+    )
+    await connection.execute(text("ANALYZE data_points"))
+    result = await connection.execute(
+        text("SELECT count(*) FROM pg_inherits WHERE inhparent = CAST('public.data_points' AS regclass)")
+    )
+    return result.scalar_one()
+
+
+def scanned_partitions(plan: dict) -> set[str]:
+    names = set()
+    if plan.get("Relation Name", "").startswith("data_points_"):
+        names.add(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        names |= scanned_partitions(child)
+    return names
+
+
+async def measure(connection: AsyncConnection, statement: str, params: dict, repeat: int) -> tuple[int, float]:
+    statement = shadow_data_points(statement)
+    result = await connection.execute(text(f"EXPLAIN (ANALYZE, FORMAT JSON) {statement.strip().rstrip(';')}"), params)
+    plan = result.scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await connection.execute(text(statement), params)
+        timings.append(time.perf_counter() - started)
+    return len(scanned_partitions(plan[0]["Plan"])), statistics.median(timings)
+
+
+async def run(args) -> None:
+    statements = await load_statements(args.seed)
+    today = date.today()
+    params = {"start_date": today - timedelta(days=30), "end_date": today, "day_range": 30}
+    engine = create_async_engine(os.environ["DATABASE_URL"])
+    try:
+        async with engine.connect() as connection:
+            transaction = await connection.begin()
+            try:
+                partitions = await generate(connection, list(statements), args.rows, args.months)
+                partitioned = {
+                    _id: await measure(connection, statement, params, args.repeat)
+                    for _id, statement in statements.items()
+                }
+                # an unpartitioned copy in pg_temp, and a view decoding it, shadow data_points for the unqualified statements
+                await connection.execute(text("CREATE TEMP TABLE data_points (LIKE public.data_points INCLUDING ALL)"))
+                await connection.execute(text("INSERT INTO pg_temp.data_points SELECT * FROM public.data_points"))
+                await connection.execute(text("ANALYZE pg_temp.data_points"))
+                await connection.execute(text("""
+                    CREATE TEMP VIEW data_points_decoded AS
+                    SELECT points.dataset_id, points.id, points.timestamp, points.decay_value, points.items_flagged,
+                        types.name AS notification_type, categories.name AS notification_category, points.decay_rate,
+                        points.write_xid
+                    FROM pg_temp.data_points AS points
+                    LEFT JOIN notification_types AS types ON types.code = points.notification_type_code
+                    LEFT JOIN notification_categories AS categories ON categories.code = points.notification_category_code
+                """))
+                unpartitioned = {
+                    _id: await measure(connection, statement, params, args.repeat)
+                    for _id, statement in statements.items()
+                }
+            finally:
+                await transaction.rollback()
+    finally:
+        await engine.dispose()
+
+    print(f"rows={args.rows} months={args.months} partitions={partitions} repeat={args.repeat}")
+    print(f"{'statement':<38} {'scanned':>9} {'partitioned':>14} {'unpartitioned':>14}")
+    for _id in statements:
+        scanned, seconds = partitioned[_id]
+        print(f"{_id:<38} {scanned:>4}/{partitions:<4} {seconds * 1000:11.2f} ms {unpartitioned[_id][1] * 1000:11.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", default="./seed_data.json")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
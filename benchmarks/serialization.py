@@ -0,0 +1,78 @@
+"""
+per request CPU of serialising a 10k row dataset response, validated through the response_model
+versus constructed without validation and rendered by FastJSONResponse
+
+    python -m benchmarks.serialization
+"""
+import argparse
+import time
+from datetime import date, timedelta
+
+from fastapi import FastAPI
+from starlette.testclient import TestClient
+
+from src.application.mappers import map_dataset_aggregate_to_contract, map_view_to_contract
+from src.core import DatasetConfigAggregate, DatasetResult, RecordPage, ViewConfig
+from src.web.models import AnalyticsResponseSchema
+from src.web.responses import FastJSONResponse
+
+
+def make_dataset(rows: int) -> DatasetResult:
+    start = date(2025, 1, 1)
+    return DatasetResult(
+        dataset=DatasetConfigAggregate(
+            id="53aaf9d4-04d3-43d3-9f40-6ce4a9282a5c",
+            is_mutable=True,
+            layouts=[ViewConfig(breakpoint="lg", coordinates=[0, 0, 4, 4], static=False)]
+        ),
+        page=RecordPage(
+            columns=["time_point", "data_value", "event_category"],
+            rows=[(start + timedelta(minutes=i), i * 0.5, "Warning") for i in range(rows)]
+        )
+    )
+
+
+def make_app(dataset: DatasetResult) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/validated", response_model=AnalyticsResponseSchema)
+    async def validated():
+        # previous path, validated by the mapper and again against the response_model
+        return AnalyticsResponseSchema(
+            id=dataset.dataset.id,
+            is_mutable=dataset.dataset.is_mutable,
+            records=dataset.records,
+            layouts=[map_view_to_contract(x) for x in dataset.dataset.layouts]
+        )
+
+    @app.get("/trusted", response_model=AnalyticsResponseSchema)
+    async def trusted():
+        return FastJSONResponse(map_dataset_aggregate_to_contract(dataset))
+
+    return app
+
+
+def measure(client: TestClient, path: str, requests: int) -> tuple[float, int]:
+    size = len(client.get(path).content)  # warm up
+    started = time.process_time()
+    for _ in range(requests):
+        client.get(path)
+    return (time.process_time() - started) / requests, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    client = TestClient(make_app(make_dataset(args.rows)))
+    print(f"rows={args.rows} requests={args.requests}")
+    results = {path: measure(client, path, args.requests) for path in ("/validated", "/trusted")}
+    for path, (cpu, size) in results.items():
+        print(f"{path:<12} {cpu * 1000:8.2f} ms cpu/request {size:>10} bytes")
+    print(f"speedup      {results['/validated'][0] / results['/trusted'][0]:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,147 @@
-from datetime import timezone, datetime
+import base64
+import json
+import re
+from datetime import timezone, datetime, date
+from decimal import Decimal
+from typing import Optional, Any
 
-from src.core import DatasetConfigAggregate, ViewConfig, DataPoint
-from src.web.models import AnalyticsResponseSchema, LayoutConfigSchema, ConfigurationCreateSchema, DataEntryCreateSchema
+from src.core import DatasetConfigAggregate, ViewConfig, DataPoint, DatasetBatch, DatasetResult
+from src.crosscutting import uuid7
+from src.web.models import AnalyticsResponseSchema, LayoutConfigSchema, ConfigurationCreateSchema, DataEntryCreateSchema, \
+    AnalyticsBatchResponseSchema, DatasetErrorSchema, ElementLayoutSchema, AnalyticsColumnarResponseSchema
 import uuid
 
 
-def map_dataset_aggregate_to_contract(dataset_agg: DatasetConfigAggregate) -> AnalyticsResponseSchema:
-    return AnalyticsResponseSchema(
+def map_dataset_aggregate_to_contract(result: DatasetResult, breakpoint: Optional[str] = None) -> AnalyticsResponseSchema:
+    """
+    built without validation, records come from our own statements and are passed through as is
+    """
+    dataset_agg = result.dataset
+    return AnalyticsResponseSchema.model_construct(
         id=dataset_agg.id,
         is_mutable=dataset_agg.is_mutable,
-        records=dataset_agg.records,
-        layouts=[map_view_to_contract(x) for x in dataset_agg.layouts]
+        records=result.records,
+        layouts=[map_view_to_contract(x) for x in dataset_agg.layouts if breakpoint is None or x.breakpoint == breakpoint],
+        next_cursor=map_key_to_cursor(result.page.next_key),
+        truncated=result.page.truncated,
+        watermark=map_key_to_cursor(result.page.watermark),
+        incremental=result.page.incremental
+    )
+
+
+def map_dataset_aggregate_to_columnar_contract(result: DatasetResult) -> AnalyticsColumnarResponseSchema:
+    """
+    built without validation, the records are passed through as column arrays
+    """
+    dataset_agg = result.dataset
+    return AnalyticsColumnarResponseSchema.model_construct(
+        id=dataset_agg.id,
+        is_mutable=dataset_agg.is_mutable,
+        columns=result.page.columns,
+        data=result.page.to_columns(),
+        layouts=[map_view_to_contract(x) for x in dataset_agg.layouts],
+        next_cursor=map_key_to_cursor(result.page.next_key),
+        truncated=result.page.truncated,
+        watermark=map_key_to_cursor(result.page.watermark),
+        incremental=result.page.incremental
+    )
+
+
+_CURSOR_PARSERS = {
+    "datetime": datetime.fromisoformat,
+    "date": date.fromisoformat,
+    "decimal": Decimal,
+    "int": int,
+    "float": float,
+    "str": str,
+    "null": lambda _: None,
+}
+
+
+def _encode_key(key: Any) -> list:
+    if key is None:
+        return ["null", None]
+    if isinstance(key, tuple):
+        return ["tuple", [_encode_key(x) for x in key]]
+    if isinstance(key, datetime):
+        return ["datetime", key.isoformat()]
+    if isinstance(key, date):
+        return ["date", key.isoformat()]
+    if isinstance(key, Decimal):
+        return ["decimal", str(key)]
+    if isinstance(key, (int, float)) and not isinstance(key, bool):
+        return [type(key).__name__, key]
+    return ["str", str(key)]
+
+
+def _decode_key(value: list) -> Any:
+    tag, value = value
+    if tag == "tuple":
+        return tuple(_decode_key(x) for x in value)
+    return _CURSOR_PARSERS[tag](value)
+
+
+def map_key_to_cursor(key: Any) -> Optional[str]:
+    """
+    opaque cursor carrying the key and the type of each of its values, so they bind as the types they were read as
+    """
+    if key is None:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(_encode_key(key)).encode()).decode()
+
+
+def map_cursor_to_page_key(cursor: Optional[str]) -> Optional[tuple[Any, int]]:
+    """
+    :raises ValueError: the cursor isn't the next_cursor of a page
+    """
+    key = map_cursor_to_key(cursor)
+    if key is not None and not (isinstance(key, tuple) and len(key) == 2 and isinstance(key[1], int)):
+        raise ValueError("Invalid cursor")
+    return key
+
+
+_SNAPSHOT_PATTERN = re.compile(r"\d+:\d+:(\d+(,\d+)*)?")
+
+
+def map_watermark_to_domain(watermark: Optional[str]) -> Optional[str]:
+    """
+    :raises ValueError: the watermark wasn't issued with a response
+    """
+    since = map_cursor_to_key(watermark)
+    if since is not None and not (isinstance(since, str) and _SNAPSHOT_PATTERN.fullmatch(since)):
+        raise ValueError("Invalid watermark")
+    return since
+
+
+def map_cursor_to_key(cursor: Optional[str]) -> Any:
+    """
+    :raises ValueError: the cursor wasn't issued by map_key_to_cursor
+    """
+    if cursor is None:
+        return None
+    try:
+        return _decode_key(json.loads(base64.urlsafe_b64decode(cursor.encode())))
+    except (ValueError, TypeError, KeyError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def map_dataset_batch_to_contract(batch: DatasetBatch, breakpoint: Optional[str] = None) -> AnalyticsBatchResponseSchema:
+    return AnalyticsBatchResponseSchema.model_construct(
+        datasets=[map_dataset_aggregate_to_contract(x, breakpoint=breakpoint) for x in batch.datasets],
+        errors=[DatasetErrorSchema.model_construct(id=_id, detail=detail) for _id, detail in batch.errors.items()]
     )
 
 
 def map_view_to_contract(view: ViewConfig) -> LayoutConfigSchema:
-    return LayoutConfigSchema(
+    return LayoutConfigSchema.model_construct(
+        breakpoint=view.breakpoint,
+        coordinates=view.coordinates,  # [x, y, w, h]
+        static=view.static
+    )
+
+def map_view_to_element_contract(view: ViewConfig) -> ElementLayoutSchema:
+    return ElementLayoutSchema.model_construct(
+        id=view.element_id,
         breakpoint=view.breakpoint,
         coordinates=view.coordinates,  # [x, y, w, h]
         static=view.static
@@ -41,7 +167,8 @@ def map_dataset_config_contract_to_domain(create_request: ConfigurationCreateSch
     )
 
 def map_datapoint_contract_to_domain(create_request: DataEntryCreateSchema) -> DataPoint:
-    record_id = str(uuid.uuid4())
+    # time ordered, so new points are appended to the right of the primary key index
+    record_id = str(uuid7())
     return DataPoint(
         dataset_id=record_id,
         timestamp=datetime.now(),
@@ -50,4 +177,31 @@ def map_datapoint_contract_to_domain(create_request: DataEntryCreateSchema) -> D
         items_flagged=create_request.items_flagged,
         notification_type=create_request.notification_type,
         notification_category=create_request.notification_category
-    )
\ No newline at end of file
+    )
+
+
+def map_data_point_columns_to_domain(columns: dict[str, list]) -> list[DataPoint]:
+    """
+    columns already validated field by field, missing columns are left empty
+    """
+    count = max(map(len, columns.values()), default=0)
+    empty = [None] * count
+    timestamp = datetime.now()
+    return [
+        DataPoint(
+            dataset_id=str(uuid7()),
+            timestamp=timestamp,
+            decay_value=decay_value,
+            decay_rate=decay_rate,
+            items_flagged=items_flagged,
+            notification_type=notification_type,
+            notification_category=notification_category
+        )
+        for decay_value, decay_rate, items_flagged, notification_type, notification_category in zip(
+            columns.get("decay_value", empty),
+            columns.get("decay_rate", empty),
+            columns.get("items_flagged", empty),
+            columns.get("notification_type", empty),
+            columns.get("notification_category", empty)
+        )
+    ]
\ No newline at end of file
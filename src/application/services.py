@@ -1,11 +1,15 @@
 import asyncio
+import time
 import uuid
-from datetime import date
-from typing import Optional
+from datetime import date, datetime
+from typing import Optional, AsyncIterator, Any, Union
 
 from src.core import UnitOfWork, DbHealthReader, GenericDataSeeder, DataLoader, DatasetConfigAggregate, \
     DatasetAggregateReader, DataPointReader, DatasetAggregateWriter, StatementGenerator, SqlStatement, DataPoint, \
-    DataPointWriter
+    DataPointWriter, DataChangeListener, DatasetBatch, DatasetAggregateBatchReader, UnitOfWorkFactory, \
+    ConfigurationChangeListener, LayoutIndex, ViewConfigReader, ViewConfig, DataPointStreamReader, RecordPage, \
+    DataVersionStore, DatasetVersion, DataPointBatchWriter, DataPointQueue, DataPointWriteStatus, StatementIndex, \
+    StatementIdReader, DataPointExporter, DailyRollupRebuilder, DatasetResult, DataPointPositionReader
 from src.crosscutting import auto_slots, Logger
 
 
@@ -32,21 +36,245 @@ class DataRetrievalHandler:
     def __init__(self, unit_of_work: UnitOfWork):
         self.unit_of_work = unit_of_work
 
-    async def __call__(self, _id: str, start_date: date, end_date: date, day_range: int) -> Optional[DatasetConfigAggregate]:
+    async def __call__(self,
+        _id: str,
+        start_date: date,
+        end_date: date,
+        day_range: int,
+        limit: int,
+        after: Any = None,
+        since: Optional[str] = None
+    ) -> Optional[DatasetResult]:
         async with self.unit_of_work as uow:
             config_reader = uow.persistence_factory(DatasetAggregateReader)
             records_reader = uow.persistence_factory(DataPointReader)
             dataset_config = await config_reader(_id=_id)
             if dataset_config is None:
                 return None
-            records = await records_reader(
-                statement=dataset_config.statement.statement,
+            page = await records_reader(
+                statement=dataset_config.statement,
                 start_date=start_date,
                 end_date=end_date,
-                day_range=day_range
+                day_range=day_range,
+                limit=limit,
+                after=after,
+                since=since,
+                final=dataset_config.has_final_results(end_date)
             )
-        dataset_config.records = records
-        return dataset_config
+        return DatasetResult(dataset=dataset_config, page=page)
+
+
+@auto_slots
+class DataVersionHandler:
+
+    def __init__(self, unit_of_work: UnitOfWork, version_store: DataVersionStore):
+        self.version_store = version_store
+        self.unit_of_work = unit_of_work
+
+    async def __call__(self, _id: str) -> Optional[DatasetVersion]:
+        async with self.unit_of_work as uow:
+            config_reader = uow.persistence_factory(DatasetAggregateReader)
+            dataset_config = await config_reader(_id=_id)
+
+        if dataset_config is None:
+            return None
+
+        return DatasetVersion(
+            dataset_id=dataset_config.id,
+            statement_id=dataset_config.statement_id,
+            version=self.version_store.get(dataset_config.statement_id),
+            epoch=self.version_store.epoch
+        )
+
+
+@auto_slots
+class DataStreamHandler:
+
+    def __init__(self, unit_of_work: UnitOfWork):
+        self.unit_of_work = unit_of_work
+
+    async def __call__(self, _id: str, start_date: date, end_date: date, day_range: int, limit: int) -> Optional[AsyncIterator[dict]]:
+        """
+        resolves the dataset up front so a missing dataset can be reported before anything is streamed
+        :param limit: maximum number of records, one more follows when the dataset has more
+        """
+        async with self.unit_of_work as uow:
+            config_reader = uow.persistence_factory(DatasetAggregateReader)
+            dataset_config = await config_reader(_id=_id)
+
+        if dataset_config is None:
+            return None
+
+        return self.stream_records(dataset_config.statement, start_date, end_date, day_range, limit)
+
+    async def stream_records(self, statement: SqlStatement, start_date: date, end_date: date, day_range: int, limit: int) -> AsyncIterator[dict]:
+        async with self.unit_of_work as uow:
+            records_reader = uow.persistence_factory(DataPointStreamReader)
+            async for record in records_reader(
+                statement=statement,
+                start_date=start_date,
+                end_date=end_date,
+                day_range=day_range,
+                limit=limit
+            ):
+                yield record
+
+
+class DatasetTopic:
+    """
+    subscribers sharing one dataset read, keyed by the dataset and the parameters it is read with
+    """
+    __slots__ = "key", "result", "subscribers", "refreshing", "stale"
+
+    def __init__(self, key: tuple, result: DatasetResult):
+        self.key = key
+        self.result = result
+        self.subscribers: set[asyncio.Queue] = set()
+        self.refreshing: Optional[asyncio.Task] = None
+        self.stale = False
+
+
+class DatasetUpdatePublisher:
+    """
+    pushes refreshed dataset records to every subscriber, a change to a statement reads each subscribed dataset once
+    and changes notified while that read runs are coalesced into one more read
+    """
+    __slots__ = "unit_of_work_factory", "logger", "topics"
+
+    def __init__(self, unit_of_work_factory: UnitOfWorkFactory, logger: Logger):
+        self.logger = logger
+        self.unit_of_work_factory = unit_of_work_factory
+        self.topics: dict[tuple, DatasetTopic] = {}
+
+    async def subscribe(self,
+        _id: str,
+        start_date: date,
+        end_date: date,
+        day_range: int,
+        limit: int,
+        keep_alive_seconds: float
+    ) -> Optional[AsyncIterator[Optional[DatasetResult]]]:
+        """
+        resolves the dataset up front so a missing dataset can be reported before anything is streamed,
+        later subscribers to a topic start from its latest read
+        """
+        key = (_id, start_date, end_date, day_range, limit)
+        topic = self.topics.get(key)
+        if topic is None:
+            result = await self.read(key)
+            if result is None:
+                return None
+            topic = self.topics.setdefault(key, DatasetTopic(key, result))
+
+        queue = asyncio.Queue(maxsize=1)
+        topic.subscribers.add(queue)
+        return self.updates(topic, queue, keep_alive_seconds)
+
+    async def updates(self,
+        topic: DatasetTopic,
+        queue: asyncio.Queue,
+        keep_alive_seconds: float
+    ) -> AsyncIterator[Optional[DatasetResult]]:
+        """
+        yields the topic's latest read and then every refresh, None when nothing changed within keep_alive_seconds
+        """
+        try:
+            result = topic.result
+            while True:
+                yield result
+                try:
+                    result = await asyncio.wait_for(queue.get(), keep_alive_seconds)
+                except asyncio.TimeoutError:
+                    result = None
+        finally:
+            topic.subscribers.discard(queue)
+            if not topic.subscribers and self.topics.get(topic.key) is topic:
+                del self.topics[topic.key]
+                if topic.refreshing is not None:
+                    topic.refreshing.cancel()
+
+    async def __call__(self, statement_id: str) -> None:
+        for topic in list(self.topics.values()):
+            if topic.result.dataset.statement_id != statement_id:
+                continue
+            if topic.refreshing is not None and not topic.refreshing.done():
+                topic.stale = True
+                continue
+            topic.refreshing = asyncio.create_task(self.refresh(topic))
+
+    async def refresh(self, topic: DatasetTopic) -> None:
+        topic.stale = True
+        while topic.stale:
+            topic.stale = False
+            try:
+                result = await self.read(topic.key)
+            except Exception as e:
+                self.logger.error("Failed to refresh dataset", exc_info=e, dataset_id=topic.key[0])
+                return
+            if result is None:
+                continue
+            topic.result = result
+            for queue in topic.subscribers:
+                # slow subscribers skip to the newest read rather than queueing every refresh
+                if queue.full():
+                    queue.get_nowait()
+                queue.put_nowait(result)
+        self.logger.info("Dataset update published", dataset_id=topic.key[0], subscribers=len(topic.subscribers))
+
+    async def read(self, key: tuple) -> Optional[DatasetResult]:
+        _id, start_date, end_date, day_range, limit = key
+        handler = DataRetrievalHandler(unit_of_work=self.unit_of_work_factory())
+        return await handler(_id=_id, start_date=start_date, end_date=end_date, day_range=day_range, limit=limit)
+
+
+@auto_slots
+class DatasetBatchRetrievalHandler:
+
+    def __init__(self,
+        unit_of_work: UnitOfWork,
+        unit_of_work_factory: UnitOfWorkFactory,
+        logger: Logger
+    ):
+        self.logger = logger
+        self.unit_of_work_factory = unit_of_work_factory
+        self.unit_of_work = unit_of_work
+
+    async def __call__(self, ids: list[str], start_date: date, end_date: date, day_range: int, limit: int) -> DatasetBatch:
+        ids = list(dict.fromkeys(ids))
+        async with self.unit_of_work as uow:
+            config_reader = uow.persistence_factory(DatasetAggregateBatchReader)
+            dataset_configs = await config_reader(ids=ids)
+
+        async def read_records(dataset_config: DatasetConfigAggregate) -> RecordPage:
+            async with self.unit_of_work_factory() as records_uow:
+                records_reader = records_uow.persistence_factory(DataPointReader)
+                return await records_reader(
+                    statement=dataset_config.statement,
+                    start_date=start_date,
+                    end_date=end_date,
+                    day_range=day_range,
+                    limit=limit,
+                    final=dataset_config.has_final_results(end_date)
+                )
+
+        results = await asyncio.gather(
+            *(read_records(dataset_config) for dataset_config in dataset_configs),
+            return_exceptions=True
+        )
+
+        batch = DatasetBatch()
+        for dataset_config, page in zip(dataset_configs, results):
+            if isinstance(page, Exception):
+                self.logger.error("Failed to read dataset records", exc_info=page, dataset_id=dataset_config.id)
+                batch.errors[dataset_config.id] = "Failed to read dataset records"
+                continue
+            batch.datasets.append(DatasetResult(dataset=dataset_config, page=page))
+
+        found = {dataset_config.id for dataset_config in dataset_configs}
+        for _id in ids:
+            if _id not in found:
+                batch.errors[_id] = "Dataset not found"
+        return batch
 
 
 @auto_slots
@@ -75,8 +303,10 @@ class ConfigurationManager:
 
     def __init__(self,
         unit_of_work: UnitOfWork,
-        prompt_generator: StatementGenerator
+        prompt_generator: StatementGenerator,
+        change_listeners: list[ConfigurationChangeListener]
     ):
+        self.change_listeners = change_listeners
         self.prompt_generator = prompt_generator
         self.unit_of_work = unit_of_work
 
@@ -91,25 +321,257 @@ class ConfigurationManager:
             writer = uow.persistence_factory(DatasetAggregateWriter)
             await writer(aggregate)
             await uow.save()
+
+        for listener in self.change_listeners:
+            await listener(aggregate)
         return aggregate.id
 
 
 @auto_slots
-class DataPointCreationService:
+class LayoutRetrievalHandler:
 
-    def __init__(self, unit_of_work: UnitOfWork):
+    def __init__(self, unit_of_work: UnitOfWork, layout_index: LayoutIndex):
+        self.layout_index = layout_index
         self.unit_of_work = unit_of_work
 
-    async def __call__(self, config_id: str, data_point: DataPoint) -> Optional[str]:
+    async def __call__(self, breakpoint: str) -> list[ViewConfig]:
+        if not self.layout_index.is_loaded:
+            await self.load()
+        return self.layout_index.get(breakpoint)
+
+    async def load(self) -> None:
         async with self.unit_of_work as uow:
-            reader = uow.persistence_factory(DatasetAggregateReader)
-            aggregate = await reader(config_id)
+            reader = uow.persistence_factory(ViewConfigReader)
+            views = await reader()
+        self.layout_index.load(views)
 
-            if aggregate is None:
-                return None
 
-            data_point.id = aggregate.statement_id
+@auto_slots
+class LayoutIndexUpdater:
+
+    def __init__(self, layout_index: LayoutIndex):
+        self.layout_index = layout_index
+
+    async def __call__(self, aggregate: DatasetConfigAggregate) -> None:
+        self.layout_index.add(aggregate.layouts)
+
+
+@auto_slots
+class StatementLookupHandler:
+
+    def __init__(self, unit_of_work: UnitOfWork, statement_index: StatementIndex):
+        self.statement_index = statement_index
+        self.unit_of_work = unit_of_work
+
+    async def __call__(self, dataset_id: str) -> Optional[str]:
+        """
+        configurations created by other processes since the index was loaded are read on their first lookup
+        """
+        if not self.statement_index.is_loaded:
+            await self.load()
+        statement_id = self.statement_index.get(dataset_id)
+        if statement_id is not None:
+            return statement_id
+
+        async with self.unit_of_work as uow:
+            reader = uow.persistence_factory(StatementIdReader)
+            statement_ids = await reader(ids=[dataset_id])
+        statement_id = statement_ids.get(dataset_id)
+        if statement_id is not None:
+            self.statement_index.add(dataset_id, statement_id)
+        return statement_id
+
+    async def load(self) -> None:
+        async with self.unit_of_work as uow:
+            reader = uow.persistence_factory(StatementIdReader)
+            statement_ids = await reader()
+        self.statement_index.load(statement_ids)
+
+
+@auto_slots
+class StatementIndexUpdater:
+
+    def __init__(self, statement_index: StatementIndex):
+        self.statement_index = statement_index
+
+    async def __call__(self, aggregate: DatasetConfigAggregate) -> None:
+        self.statement_index.add(aggregate.id, aggregate.statement_id)
+
+
+@auto_slots
+class DataExportHandler:
+
+    def __init__(self, unit_of_work: UnitOfWork, statement_lookup: StatementLookupHandler):
+        self.statement_lookup = statement_lookup
+        self.unit_of_work = unit_of_work
+
+    async def __call__(self,
+        _id: str,
+        format: str,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        after: Optional[str]
+    ) -> Optional[AsyncIterator[bytes]]:
+        """
+        resolves the dataset, and the point to resume after, up front so either can be reported before anything is streamed
+        :raises ValueError: after isn't a data point of the dataset
+        """
+        statement_id = await self.statement_lookup(_id)
+        if statement_id is None:
+            return None
+        if after is not None:
+            async with self.unit_of_work as uow:
+                position_reader = uow.persistence_factory(DataPointPositionReader)
+                if await position_reader(statement_id=statement_id, dataset_id=after) is None:
+                    raise ValueError("Unknown after")
+        return self.export(statement_id, format, start, end, after)
+
+    async def export(self,
+        statement_id: str,
+        format: str,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        after: Optional[str]
+    ) -> AsyncIterator[bytes]:
+        async with self.unit_of_work as uow:
+            exporter = uow.persistence_factory(DataPointExporter)
+            async for chunk in exporter(statement_id=statement_id, format=format, start=start, end=end, after=after):
+                yield chunk
+
+
+@auto_slots
+class DataVersionBumper:
+
+    def __init__(self, version_store: DataVersionStore):
+        self.version_store = version_store
+
+    async def __call__(self, statement_id: str) -> None:
+        self.version_store.bump(statement_id)
+
+
+@auto_slots
+class ConfigurationVersionBumper:
+
+    def __init__(self, version_store: DataVersionStore):
+        self.version_store = version_store
+
+    async def __call__(self, aggregate: DatasetConfigAggregate) -> None:
+        self.version_store.bump(aggregate.statement_id)
+
+
+@auto_slots
+class DataPointCreationService:
+
+    def __init__(self,
+        unit_of_work: UnitOfWork,
+        statement_lookup: StatementLookupHandler,
+        change_listeners: list[DataChangeListener],
+        data_point_queue: DataPointQueue
+    ):
+        self.data_point_queue = data_point_queue
+        self.change_listeners = change_listeners
+        self.statement_lookup = statement_lookup
+        self.unit_of_work = unit_of_work
+
+    async def __call__(self, config_id: str, data_point: DataPoint) -> Optional[DataPointWriteStatus]:
+        """
+        writes the data point, or with write-behind enabled queues it to be written in a later batch
+        :return: None when the dataset doesn't exist
+        """
+        statement_id = await self.statement_lookup(config_id)
+        if statement_id is None:
+            return None
+
+        data_point.id = statement_id
+        if self.data_point_queue.enabled:
+            queued = self.data_point_queue.put(data_point)
+            return DataPointWriteStatus.QUEUED if queued else DataPointWriteStatus.REJECTED
+
+        async with self.unit_of_work as uow:
             writer = uow.persistence_factory(DataPointWriter)
             await writer(data_point)
             await uow.save()
-        return aggregate.id
\ No newline at end of file
+
+        for listener in self.change_listeners:
+            await listener(statement_id)
+        return DataPointWriteStatus.CREATED
+
+
+@auto_slots
+class DataPointBatchCreationService:
+
+    def __init__(self,
+        unit_of_work: UnitOfWork,
+        statement_lookup: StatementLookupHandler,
+        change_listeners: list[DataChangeListener],
+        logger: Logger
+    ):
+        self.logger = logger
+        self.change_listeners = change_listeners
+        self.statement_lookup = statement_lookup
+        self.unit_of_work = unit_of_work
+
+    async def __call__(self,
+        config_id: str,
+        data_points: Union[list[DataPoint], AsyncIterator[list[DataPoint]]]
+    ) -> Optional[str]:
+        """
+        resolves the statement once and writes every data point in a single transaction
+        :param data_points: the data points, or chunks of them written as they are decoded
+        """
+        started = time.perf_counter()
+        statement_id = await self.statement_lookup(config_id)
+        if statement_id is None:
+            return None
+
+        chunks = _single_chunk(data_points) if isinstance(data_points, list) else data_points
+        count = 0
+        async with self.unit_of_work as uow:
+            writer = uow.persistence_factory(DataPointBatchWriter)
+            async for chunk in chunks:
+                for data_point in chunk:
+                    data_point.id = statement_id
+                await writer(chunk)
+                count += len(chunk)
+            await uow.save()
+
+        seconds = time.perf_counter() - started
+        self.logger.info(
+            "Data points written",
+            count=count,
+            seconds=round(seconds, 4),
+            rows_per_second=round(count / seconds) if seconds > 0 else None
+        )
+
+        for listener in self.change_listeners:
+            await listener(statement_id)
+        return config_id
+
+
+@auto_slots
+class DailyRollupBackfillService:
+
+    def __init__(self, unit_of_work: UnitOfWork, logger: Logger):
+        self.logger = logger
+        self.unit_of_work = unit_of_work
+
+    async def __call__(self, statement_id: Optional[str] = None, start: Optional[date] = None, end: Optional[date] = None) -> int:
+        """
+        rebuilds the daily rollups of every statement, or of one, from the raw data points in one transaction
+        """
+        started = time.perf_counter()
+        async with self.unit_of_work as uow:
+            rebuild = uow.persistence_factory(DailyRollupRebuilder)
+            count = await rebuild(statement_id=statement_id, start=start, end=end)
+            await uow.save()
+        self.logger.info(
+            "Daily rollups rebuilt",
+            statement_id=statement_id,
+            rows=count,
+            seconds=round(time.perf_counter() - started, 4)
+        )
+        return count
+
+
+async def _single_chunk(data_points: list[DataPoint]) -> AsyncIterator[list[DataPoint]]:
+    yield data_points
@@ -0,0 +1,38 @@
+"""
+rebuilds data_point_daily_rollups from the raw data points, e.g. after points were written by a release
+predating the rollups
+
+    python -m src.backfill_rollups [--statement-id ID] [--start YYYY-MM-DD] [--end YYYY-MM-DD]
+"""
+import argparse
+import asyncio
+from datetime import date
+
+from fastapi import FastAPI
+
+from src.application.services import DailyRollupBackfillService
+from src.bootstrap import bootstrap
+from src.core import ConnectionPool
+
+
+async def backfill(args) -> int:
+    app = FastAPI()
+    bootstrap(app=app)
+    provider = app.state.services
+    try:
+        return await provider[DailyRollupBackfillService](statement_id=args.statement_id, start=args.start, end=args.end)
+    finally:
+        await provider[ConnectionPool].dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--statement-id", default=None, help="only rebuild this statement's rollups")
+    parser.add_argument("--start", type=date.fromisoformat, default=None, help="first day to rebuild")
+    parser.add_argument("--end", type=date.fromisoformat, default=None, help="last day to rebuild")
+    rows = asyncio.run(backfill(parser.parse_args()))
+    print(f"{rows} rollup rows written")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,20 +7,38 @@ from fastapi import FastAPI
 from punq import Container, Scope
 
 from src.application.services import SystemStatusChecker, DataBootstrapper, DataRetrievalHandler, \
-    ConfigurationManager, DataPointCreationService
+    ConfigurationManager, DataPointCreationService, DatasetBatchRetrievalHandler, LayoutRetrievalHandler, \
+    LayoutIndexUpdater, DataStreamHandler, DataVersionHandler, DataVersionBumper, ConfigurationVersionBumper, \
+    DatasetUpdatePublisher, DataPointBatchCreationService, StatementLookupHandler, StatementIndexUpdater, \
+    DataExportHandler, DailyRollupBackfillService
 from src.core import UnitOfWork, DbHealthReader, DataLoader, GenericDataSeeder, DatasetAggregateReader, \
-    DataPointReader, DatasetAggregateWriter, DataPointWriter, StatementGenerator
+    DataPointReader, DatasetAggregateWriter, DataPointWriter, StatementGenerator, ConnectionPool, \
+    BackgroundWorker, DataChangeListener, DatasetAggregateBatchReader, UnitOfWorkFactory, \
+    ConfigurationChangeListener, LayoutIndex, ViewConfigReader, DataPointStreamReader, DataVersionStore, \
+    DataNotificationListener, DataPointBatchWriter, DataPointQueue, StatementIndex, StatementIdReader, \
+    DataPointExporter, DataPointPartitionManager, DailyRollupRebuilder, DataPointPositionReader
 from src.crosscutting import Logger, ServiceProvider
-from src.infrastructure import Settings, SqlAlchemyUnitOfWork, register, FakeStatementGenerator
+from src.infrastructure import Settings, SqlAlchemyUnitOfWork, register, FakeStatementGenerator, \
+    SqlAlchemyConnectionPool, SqlAlchemyUnitOfWorkFactory
+from src.infrastructure.caching import CacheSweeper, RecordCacheInvalidator
 from src.infrastructure.security import PlatformValidator
 from src.infrastructure.data_processing import ConfigurationImporter, JsonViewConfigProcessor, JsonSqlStatementProcessor, \
     JsonDataPointProcessor
 from src.infrastructure.models import start_mappers
 from src.infrastructure.data_access import DatasetRetriever, SqlAlchemyDataPointReader, \
-    SqlAlchemyDbHealthReader, DatabaseBootstrapper, SqlAlchemyDatasetAggregateWriter, SqlAlchemyDataPointWriter
+    SqlAlchemyDbHealthReader, DatabaseBootstrapper, SqlAlchemyDatasetAggregateWriter, SqlAlchemyDataPointWriter, \
+    DatasetBatchRetriever, SqlAlchemyViewConfigReader, SqlAlchemyDataPointStreamReader, SqlAlchemyDataPointBatchWriter, \
+    SqlAlchemyStatementIdReader, AsyncpgDataPointExporter, SqlAlchemyDataPointPartitionManager, \
+    SqlAlchemyDailyRollupRebuilder, SqlAlchemyDataPointPositionReader
+from src.infrastructure.indexes import InMemoryLayoutIndex, InMemoryStatementIndex
+from src.infrastructure.ingestion import WriteBehindDataPointQueue
+from src.infrastructure.notifications import PostgresDataChangeFeed
+from src.infrastructure.partitioning import DataPointPartitionMaintainer
+from src.infrastructure.versions import InMemoryDataVersionStore
 from src.web import Authenticator
 from src.web.middleware import configure_error_handling
-from src.web.endpoints import status_router, analytics_router
+from src.web.responses import ResponseCache
+from src.web.endpoints import status_router, analytics_router, layout_router
 
 
 def bootstrap(app: FastAPI,
@@ -40,9 +58,12 @@ def bootstrap(app: FastAPI,
     configure_error_handling(app=app)
     add_database(container=container)
     add_services(container=container)
+    add_indexes(container=container)
+    add_change_listeners(container=container)
     add_loaders(container=container)
     add_generation(container=container)
     add_auth(container=container)
+    add_background_workers(container=container)
     initialise_actions(container)
     return container
 
@@ -50,11 +71,31 @@ def add_database(container: Container):
     start_mappers()
     register(DbHealthReader, SqlAlchemyDbHealthReader)
     register(DataPointReader, SqlAlchemyDataPointReader)
+    register(DataPointStreamReader, SqlAlchemyDataPointStreamReader)
     register(DatasetAggregateReader, DatasetRetriever)
+    register(DatasetAggregateBatchReader, DatasetBatchRetriever)
+    register(ViewConfigReader, SqlAlchemyViewConfigReader)
+    register(StatementIdReader, SqlAlchemyStatementIdReader)
+    register(DataPointExporter, AsyncpgDataPointExporter)
+    register(DataPointPositionReader, SqlAlchemyDataPointPositionReader)
     register(GenericDataSeeder, DatabaseBootstrapper)
     register(DatasetAggregateWriter, SqlAlchemyDatasetAggregateWriter)
     register(DataPointWriter, SqlAlchemyDataPointWriter)
+    register(DataPointBatchWriter, SqlAlchemyDataPointBatchWriter)
+    register(DataPointPartitionManager, SqlAlchemyDataPointPartitionManager)
+    register(DailyRollupRebuilder, SqlAlchemyDailyRollupRebuilder)
+    container.register(SqlAlchemyConnectionPool, scope=Scope.singleton)
+    container.register(ConnectionPool, factory=lambda: container.resolve(SqlAlchemyConnectionPool))
     container.register(UnitOfWork, SqlAlchemyUnitOfWork)
+    container.register(UnitOfWorkFactory, SqlAlchemyUnitOfWorkFactory)
+    container.register(DataPointQueue, WriteBehindDataPointQueue, scope=Scope.singleton)
+
+def add_background_workers(container: Container):
+    container.register(BackgroundWorker, DataPointPartitionMaintainer)
+    container.register(BackgroundWorker, CacheSweeper)
+    container.register(BackgroundWorker, PostgresDataChangeFeed)
+    # stopped before the feed and the sweeper so queued data points are flushed while the pool is still open
+    container.register(BackgroundWorker, factory=lambda: container.resolve(DataPointQueue))
 
 def add_generation(container: Container):
     container.register(StatementGenerator, FakeStatementGenerator)
@@ -75,13 +116,41 @@ def add_routing(app: FastAPI, container: Container):
     app.state.services = ServiceProvider(container=container)
     app.include_router(router=status_router)
     app.include_router(router=analytics_router)
+    app.include_router(router=layout_router)
+
+def add_indexes(container: Container):
+    container.register(LayoutIndex, InMemoryLayoutIndex, scope=Scope.singleton)
+    container.register(StatementIndex, InMemoryStatementIndex, scope=Scope.singleton)
+    container.register(DataVersionStore, InMemoryDataVersionStore, scope=Scope.singleton)
+    container.register(ResponseCache, scope=Scope.singleton)
+    container.register(DatasetUpdatePublisher, scope=Scope.singleton)
+
+def add_change_listeners(container: Container):
+    container.register(DataChangeListener, DataVersionBumper)
+    container.register(DataChangeListener, RecordCacheInvalidator)
+    container.register(ConfigurationChangeListener, LayoutIndexUpdater)
+    container.register(ConfigurationChangeListener, StatementIndexUpdater)
+    container.register(ConfigurationChangeListener, ConfigurationVersionBumper)
+    # notifications also cover points written by other processes, their versions are bumped and cached results
+    # dropped before republishing, so ETags and cached responses of this process follow writes made elsewhere
+    container.register(DataNotificationListener, DataVersionBumper)
+    container.register(DataNotificationListener, RecordCacheInvalidator)
+    container.register(DataNotificationListener, factory=lambda: container.resolve(DatasetUpdatePublisher))
 
 def add_services(container: Container):
     container.register(SystemStatusChecker)
     container.register(DataRetrievalHandler)
+    container.register(DataVersionHandler)
+    container.register(DataStreamHandler)
+    container.register(DataExportHandler)
+    container.register(DatasetBatchRetrievalHandler)
+    container.register(LayoutRetrievalHandler)
+    container.register(StatementLookupHandler)
     container.register(DataBootstrapper)
     container.register(ConfigurationManager)
     container.register(DataPointCreationService)
+    container.register(DataPointBatchCreationService)
+    container.register(DailyRollupBackfillService)
 
 def add_logging(container: Container):
     container.register(Logger, factory=structlog.getLogger, scope=Scope.singleton)
@@ -1,11 +1,77 @@
 import datetime
+import re
 from dataclasses import dataclass, field
-from typing import Protocol, TypeVar, Type, Optional, Any
+from enum import Enum
+from typing import Protocol, TypeVar, Type, Optional, Any, AsyncIterator
 
 from src.crosscutting import Logger
 
 T = TypeVar("T")
 
+STATEMENT_PARAMETERS = ("start_date", "end_date", "day_range")
+_CURRENT_DATE_PATTERN = re.compile(r"\b(CURRENT_DATE|CURRENT_TIMESTAMP|NOW\s*\(|LOCALTIMESTAMP)", re.IGNORECASE)
+_ORDER_BY_PATTERN = re.compile(r"\bORDER\s+BY\b", re.IGNORECASE)
+_ORDER_BY_END_PATTERN = re.compile(r"\b(LIMIT|OFFSET|FETCH)\b|;", re.IGNORECASE)
+_NON_INCREMENTAL_PATTERN = re.compile(
+    r"\b(GROUP\s+BY|HAVING|DISTINCT|OVER|LIMIT|OFFSET|FETCH|UNION|INTERSECT|EXCEPT|RECURSIVE)\b"
+    r"|\b(COUNT|SUM|AVG|MIN|MAX|\w+_AGG|BOOL_AND|BOOL_OR|EVERY|STDDEV\w*|VARIANCE|VAR_POP|VAR_SAMP|"
+    r"PERCENTILE_CONT|PERCENTILE_DISC|MODE)\s*\(",
+    re.IGNORECASE
+)
+_ORDER_TERM_PATTERN = re.compile(
+    r'^\s*("[^"]+"|[A-Za-z_]\w*)(?:\s+(ASC|DESC))?(?:\s+NULLS\s+(FIRST|LAST))?\s*$',
+    re.IGNORECASE
+)
+_SELECT_PATTERN = re.compile(r"\bSELECT\b", re.IGNORECASE)
+_FROM_PATTERN = re.compile(r"\bFROM\b", re.IGNORECASE)
+_OUTPUT_ALIAS_PATTERN = re.compile(r'(?:\bAS\s+|[\w")\]]\s+)("[^"]+"|[A-Za-z_]\w*)\s*$', re.IGNORECASE)
+_OUTPUT_COLUMN_PATTERN = re.compile(r'^\s*(?:DISTINCT\s+)?(?:(?:"[^"]+"|\w+)\.)*("[^"]+"|[A-Za-z_]\w*)\s*$', re.IGNORECASE)
+
+
+def _top_level(statement: str, pattern: re.Pattern, start: int = 0) -> Optional[re.Match]:
+    """
+    first match of pattern outside any parentheses
+    """
+    for match in pattern.finditer(statement, start):
+        if statement.count("(", 0, match.start()) == statement.count(")", 0, match.start()):
+            return match
+    return None
+
+
+def _fold(name: str) -> str:
+    """
+    unquoted identifiers are folded to lower case
+    """
+    return name[1:-1] if name.startswith('"') else name.lower()
+
+
+def _output_names(statement: str) -> Optional[set[str]]:
+    """
+    names of the columns the outermost select list outputs, None when it selects a * whose columns aren't known,
+    expressions without an alias have no name here
+    """
+    select = _top_level(statement, _SELECT_PATTERN)
+    if select is None:
+        return set()
+    end = _top_level(statement, _FROM_PATTERN, select.end()) or _top_level(statement, _ORDER_BY_PATTERN, select.end())
+    select_list = statement[select.end():end.start() if end is not None else len(statement)]
+    items, depth, start = [], 0, 0
+    for i, char in enumerate(select_list):
+        depth += {"(": 1, ")": -1}.get(char, 0)
+        if char == "," and depth == 0:
+            items.append(select_list[start:i])
+            start = i + 1
+    items.append(select_list[start:])
+
+    names = set()
+    for item in items:
+        if item.strip().endswith("*"):
+            return None
+        match = _OUTPUT_ALIAS_PATTERN.search(item) or _OUTPUT_COLUMN_PATTERN.match(item)
+        if match is not None:
+            names.add(_fold(match.group(1)))
+    return names
+
 
 @dataclass(unsafe_hash=True)
 class DataPoint:
@@ -31,6 +97,60 @@ class SqlStatement:
     id: str = None
     statement: str = None
 
+    @property
+    def is_date_relative(self) -> bool:
+        """
+        statements evaluated against the current date give a different result each day
+        """
+        return bool(_CURRENT_DATE_PATTERN.search(self.statement or ""))
+
+    @property
+    def parameters(self) -> tuple[str, ...]:
+        """
+        bind parameters the statement actually uses
+        """
+        statement = self.statement or ""
+        return tuple(name for name in STATEMENT_PARAMETERS if f":{name}" in statement)
+
+    @property
+    def is_incremental(self) -> bool:
+        """
+        every result row comes from a single data point, so results for new points can be appended to earlier ones
+        """
+        statement = self.statement or ""
+        return "data_points" in statement and not _NON_INCREMENTAL_PATTERN.search(statement)
+
+    @property
+    def ordering(self) -> Optional[tuple[str, bool, bool]]:
+        """
+        first column of the outermost ORDER BY, whether it is descending and whether nulls sort first,
+        None when the statement isn't ordered by a plain column of its output
+        """
+        statement = self.statement or ""
+        outermost = [
+            x for x in _ORDER_BY_PATTERN.finditer(statement)
+            if statement.count("(", 0, x.start()) == statement.count(")", 0, x.start())
+        ]
+        if not outermost:
+            return None
+
+        clause = statement[outermost[-1].end():]
+        end = _ORDER_BY_END_PATTERN.search(clause)
+        if end is not None:
+            clause = clause[:end.start()]
+
+        term = _ORDER_TERM_PATTERN.match(clause.split(",")[0])
+        if term is None:
+            return None
+        # an ORDER BY may name input columns, those can't be referred to once the statement is wrapped
+        names = _output_names(statement)
+        if names is not None and _fold(term.group(1)) not in names:
+            return None
+        descending = (term.group(2) or "").upper() == "DESC"
+        # postgres sorts nulls as larger than any value unless told otherwise
+        nulls_first = descending if term.group(3) is None else term.group(3).upper() == "FIRST"
+        return term.group(1), descending, nulls_first
+
 @dataclass(unsafe_hash=True)
 class DatasetConfig:
     """
@@ -41,6 +161,32 @@ class DatasetConfig:
     is_mutable: bool = None
 
 
+@dataclass
+class RecordPage:
+    """
+    one page of statement results kept as the row tuples read from the database,
+    next_key is the ordering value and tie number of the last row, to continue after when more rows remain
+    """
+    columns: list[str] = field(default_factory=list)
+    rows: list[tuple] = field(default_factory=list)
+    next_key: Any = None
+    truncated: bool = False
+    watermark: Optional[str] = None  # snapshot of the committed data points the rows account for
+    incremental: bool = False  # rows only cover data points committed after the requested watermark
+
+    @property
+    def records(self) -> list[dict]:
+        return [dict(zip(self.columns, row)) for row in self.rows]
+
+    def to_columns(self) -> dict[str, list]:
+        """
+        column name to column values, transposed without building a dict per row
+        """
+        if not self.rows:
+            return {column: [] for column in self.columns}
+        return dict(zip(self.columns, map(list, zip(*self.rows))))
+
+
 @dataclass(unsafe_hash=True)
 class DatasetConfigAggregate(DatasetConfig):
     """
@@ -48,7 +194,49 @@ class DatasetConfigAggregate(DatasetConfig):
     """
     layouts: list[ViewConfig] = field(default_factory=list)
     statement: SqlStatement = None
-    records: list[dict] = field(default_factory=list)
+
+    def has_final_results(self, end_date: datetime.date) -> bool:
+        """
+        results can't change for immutable datasets, or for statements bounded by an end date that has already passed
+        """
+        if not self.is_mutable:
+            return True
+        return "end_date" in self.statement.parameters \
+            and not self.statement.is_date_relative \
+            and end_date < datetime.date.today()
+
+
+@dataclass
+class DatasetResult:
+    """
+    one read of a dataset, the aggregate may be shared through the configuration cache so the page is kept here
+    """
+    dataset: DatasetConfigAggregate
+    page: RecordPage = field(default_factory=RecordPage)
+
+    @property
+    def records(self) -> list[dict]:
+        return self.page.records
+
+
+@dataclass
+class DatasetVersion:
+    """
+    data version of the statement behind a dataset, changes whenever the dataset's results may have changed
+    """
+    dataset_id: str
+    statement_id: str
+    version: int
+    epoch: str = ""  # versions are only comparable within one epoch
+
+
+@dataclass
+class DatasetBatch:
+    """
+    datasets read together, failures are kept per dataset rather than failing the batch
+    """
+    datasets: list[DatasetResult] = field(default_factory=list)
+    errors: dict[str, str] = field(default_factory=dict)
 
 
 class DbHealthReader(Protocol):
@@ -63,9 +251,129 @@ class DatasetAggregateReader(Protocol):
         ...
 
 
+class DatasetAggregateBatchReader(Protocol):
+
+    async def __call__(self, ids: list[str]) -> list[DatasetConfigAggregate]:
+        ...
+
+
 class DataPointReader(Protocol):
 
-    async def __call__(self, statement: str, start_date: datetime.date, end_date: datetime.date, day_range: int) -> list[dict]:
+    async def __call__(self, statement: SqlStatement, start_date: datetime.date, end_date: datetime.date, day_range: int, limit: int, after: Any = None, since: Optional[str] = None, final: bool = False) -> RecordPage:
+        ...
+
+
+class DataPointStreamReader(Protocol):
+
+    def __call__(self, statement: SqlStatement, start_date: datetime.date, end_date: datetime.date, day_range: int, limit: int) -> AsyncIterator[dict]:
+        ...
+
+
+class DataPointExporter(Protocol):
+
+    def __call__(self, statement_id: str, format: str, start: Optional[datetime.datetime], end: Optional[datetime.datetime], after: Optional[str]) -> AsyncIterator[bytes]:
+        ...
+
+
+class DataPointPositionReader(Protocol):
+
+    async def __call__(self, statement_id: str, dataset_id: str) -> Optional[datetime.datetime]:
+        """
+        timestamp of the statement's data point, None when the statement has no such point
+        """
+        ...
+
+
+class ViewConfigReader(Protocol):
+
+    async def __call__(self) -> list[ViewConfig]:
+        ...
+
+
+class StatementIdReader(Protocol):
+
+    async def __call__(self, ids: Optional[list[str]] = None) -> dict[str, str]:
+        ...
+
+
+class DataChangeListener(Protocol):
+
+    async def __call__(self, statement_id: str) -> None:
+        ...
+
+
+class DataNotificationListener(Protocol):
+    """
+    called for data points notified by the database after commit, including points written by other processes
+    """
+
+    async def __call__(self, statement_id: str) -> None:
+        ...
+
+
+class ConfigurationChangeListener(Protocol):
+
+    async def __call__(self, aggregate: DatasetConfigAggregate) -> None:
+        ...
+
+
+class LayoutIndex(Protocol):
+
+    @property
+    def is_loaded(self) -> bool:
+        ...
+
+    def load(self, views: list[ViewConfig]) -> None:
+        ...
+
+    def add(self, views: list[ViewConfig]) -> None:
+        ...
+
+    def get(self, breakpoint: str) -> list[ViewConfig]:
+        ...
+
+
+class StatementIndex(Protocol):
+
+    @property
+    def is_loaded(self) -> bool:
+        ...
+
+    def load(self, statement_ids: dict[str, str]) -> None:
+        ...
+
+    def add(self, dataset_id: str, statement_id: str) -> None:
+        ...
+
+    def get(self, dataset_id: str) -> Optional[str]:
+        ...
+
+
+class DataVersionStore(Protocol):
+    epoch: str
+
+    def get(self, statement_id: str) -> int:
+        ...
+
+    def bump(self, statement_id: str) -> int:
+        ...
+
+
+class ConnectionPool(Protocol):
+
+    async def start(self) -> None:
+        ...
+
+    async def dispose(self) -> None:
+        ...
+
+
+class BackgroundWorker(Protocol):
+
+    async def start(self) -> None:
+        ...
+
+    async def stop(self) -> None:
         ...
 
 
@@ -83,6 +391,34 @@ class UnitOfWork(Protocol):
     async def save(self):
         ...
 
+class UnitOfWorkFactory(Protocol):
+
+    def __call__(self) -> UnitOfWork:
+        ...
+
+class DataPointWriteStatus(Enum):
+    CREATED = "created"
+    QUEUED = "queued"
+    REJECTED = "rejected"
+
+
+class DataPointQueue(Protocol):
+    """
+    buffers data points to be written in batches in the background
+    """
+    enabled: bool
+    depth: int
+    capacity: int
+    flushed: int
+    failed: int
+
+    def put(self, data_point: DataPoint) -> bool:
+        """
+        :return: False when the queue is full and the data point was not accepted
+        """
+        ...
+
+
 class DataLoader(Protocol):
     type: type
     data: list[Any]
@@ -110,4 +446,26 @@ class StatementGenerator(Protocol):
 class DataPointWriter(Protocol):
 
     async def __call__(self, record: DataPoint):
+        ...
+
+
+class DataPointBatchWriter(Protocol):
+
+    async def __call__(self, records: list[DataPoint]):
+        ...
+
+
+class DataPointPartitionManager(Protocol):
+
+    async def __call__(self, start: datetime.date, end: datetime.date) -> list[str]:
+        ...
+
+
+class DailyRollupRebuilder(Protocol):
+
+    async def __call__(self,
+        statement_id: Optional[str] = None,
+        start: Optional[datetime.date] = None,
+        end: Optional[datetime.date] = None
+    ) -> int:
         ...
\ No newline at end of file
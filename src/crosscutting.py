@@ -1,4 +1,8 @@
 import inspect
+import os
+import threading
+import time
+import uuid
 from contextlib import contextmanager
 from typing import Callable, TypeVar, Any, Protocol, Type
 from fastapi import Request, Depends
@@ -60,4 +64,32 @@ class ServiceProvider:
         self.container = container
 
     def __getitem__(self, key: Type[T]) -> T:
-        return self.container.resolve(key)
\ No newline at end of file
+        return self.container.resolve(key)
+
+
+_uuid7_lock = threading.Lock()
+_uuid7_last = (0, 0)
+
+
+def uuid7() -> uuid.UUID:
+    """
+    time ordered uuid (RFC 9562 version 7), a 48 bit unix millisecond timestamp followed by random bits,
+    ids from the same process within a millisecond are ordered by a 12 bit counter
+    """
+    global _uuid7_last
+    with _uuid7_lock:
+        millis = time.time_ns() // 1_000_000
+        last_millis, counter = _uuid7_last
+        if millis <= last_millis:
+            millis = last_millis
+            counter += 1
+            if counter > 0xFFF:
+                millis += 1
+                counter = 0
+        else:
+            # starts in the lower half so a burst within the millisecond rarely overflows
+            counter = int.from_bytes(os.urandom(2)) & 0x7FF
+        _uuid7_last = millis, counter
+
+    random = int.from_bytes(os.urandom(8)) & 0x3FFF_FFFF_FFFF_FFFF
+    return uuid.UUID(int=millis << 80 | 0x7 << 76 | counter << 64 | 0b10 << 62 | random)
@@ -1,11 +1,11 @@
-import time
-from functools import wraps
-from typing import TypeVar, Type, Any, Callable, Coroutine, Optional
+import asyncio
+from typing import Optional, Type, TypeVar
 
-import sqlalchemy
 from pydantic.v1 import BaseSettings
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import NullPool
 
 from src.crosscutting import Logger
 
@@ -27,28 +27,109 @@ class Settings(BaseSettings):
     AWS_REGION: str
     DATABASE_URL: str
     SEED_DATA_JSON: str = "../seed_data.json"
+    DATABASE_POOL_ENABLED: bool = True
+    DATABASE_POOL_SIZE: int = 10
+    DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_RECYCLE: int = 1800
+    DATABASE_POOL_PRE_PING: bool = True
+    DATABASE_POOL_WARM_CONNECTIONS: int = 5
+    CACHE_SWEEP_INTERVAL_SECONDS: int = 60
+    BATCH_MAX_CONNECTIONS: int = 4
+    DATASET_MAX_ROWS: int = 10000
+    RESPONSE_CACHE_ENABLED: bool = True
+    DATA_NOTIFICATION_RECONNECT_SECONDS: int = 5
+    DATASET_STREAM_KEEP_ALIVE_SECONDS: int = 15
+    WRITE_BEHIND_ENABLED: bool = False
+    WRITE_BEHIND_MAX_QUEUE: int = 10000
+    WRITE_BEHIND_BATCH_SIZE: int = 500
+    WRITE_BEHIND_FLUSH_INTERVAL_SECONDS: float = 0.5
+    WRITE_BEHIND_MAX_RETRIES: int = 3
+    WRITE_BEHIND_RETRY_BACKOFF_SECONDS: float = 0.5
+    DATA_POINT_PARTITION_MONTHS_AHEAD: int = 3
+    DATA_POINT_PARTITION_INTERVAL_SECONDS: int = 21600
 
     class Config:
         env_file = "../.env.local"
 
-class SqlAlchemyUnitOfWork:
-    __slots__ = "session_factory", "logger", "session"
+
+class SqlAlchemyConnectionPool:
+    """
+    process wide engine and session factory, one pool shared by every unit of work
+    """
+    __slots__ = "settings", "logger", "engine", "session_factory"
 
     def __init__(self, settings: Settings, logger: Logger):
         self.logger = logger
-        engine = sqlalchemy.ext.asyncio.create_async_engine(
-            settings.DATABASE_URL,
+        self.settings = settings
+        self.engine: Optional[AsyncEngine] = None
+        self.session_factory: Optional[async_sessionmaker] = None
+
+    def get_session_factory(self) -> async_sessionmaker:
+        """
+        lazily creates the engine when used outside of the app lifespan (e.g. seeding and tests)
+        """
+        if self.session_factory is None:
+            self._create_engine()
+        return self.session_factory
+
+    async def start(self):
+        """
+        creates the engine and warms the pool so the first requests don't pay for connecting
+        """
+        self.get_session_factory()
+        warm_connections = min(self.settings.DATABASE_POOL_WARM_CONNECTIONS, self.settings.DATABASE_POOL_SIZE)
+        if not self.settings.DATABASE_POOL_ENABLED or warm_connections <= 0:
+            return
+
+        async def _checkout():
+            async with self.engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+
+        await asyncio.gather(*(_checkout() for _ in range(warm_connections)))
+        self.logger.info("Connection pool warmed", connections=warm_connections)
+
+    async def dispose(self):
+        if self.engine is None:
+            return
+        await self.engine.dispose()
+        self.engine = None
+        self.session_factory = None
+        self.logger.info("Connection pool disposed")
+
+    def _create_engine(self):
+        if self.settings.DATABASE_POOL_ENABLED:
+            pool_options = dict(
+                pool_size=self.settings.DATABASE_POOL_SIZE,
+                max_overflow=self.settings.DATABASE_MAX_OVERFLOW,
+                pool_recycle=self.settings.DATABASE_POOL_RECYCLE,
+                pool_pre_ping=self.settings.DATABASE_POOL_PRE_PING,
+            )
+        else:
+            # connections can't be shared between event loops, e.g. a test client running a loop per request
+            pool_options = dict(poolclass=NullPool)
+
+        self.engine = create_async_engine(
+            self.settings.DATABASE_URL,
             echo=False,
             future=True,
+            **pool_options
         )
         self.session_factory = async_sessionmaker(
-            bind=engine,
+            bind=self.engine,
             expire_on_commit=False,
             class_=AsyncSession,
         )
 
+
+class SqlAlchemyUnitOfWork:
+    __slots__ = "connection_pool", "logger", "session"
+
+    def __init__(self, connection_pool: SqlAlchemyConnectionPool, logger: Logger):
+        self.logger = logger
+        self.connection_pool = connection_pool
+
     async def __aenter__(self):
-        self.session = self.session_factory()
+        self.session = self.connection_pool.get_session_factory()()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
@@ -78,28 +159,55 @@ class SqlAlchemyUnitOfWork:
         await self.session.commit()
 
 
-def async_ttl_cache(ttl_seconds: int = 300):
-    cache = {}
-
-    def decorator(func: Callable[..., Coroutine[Any, Any, Optional[Any]]]):
-        @wraps(func)
-        async def wrapper(self, _id: str, *args, **kwargs) -> Optional[Any]:
-            now = time.time()
-            logger: Logger = self.logger
-            if _id in cache:
-                cached_time, cached_value = cache[_id]
-                if now - cached_time < ttl_seconds:
-                    logger.info("Cache hit", cache_id=_id)
-                    return cached_value
-                else:
-                    logger.info("Cache expired", cache_id=_id)
-                    del cache[_id]
-            logger.info("Cache miss", cache_id=_id)
-            result = await func(self, _id, *args, **kwargs)
-            cache[_id] = (now, result)
-            return result
-        return wrapper
-    return decorator
+class ThrottledUnitOfWork:
+    """
+    unit of work that holds a slot of a shared semaphore while its session is open
+    """
+    __slots__ = "unit_of_work", "semaphore"
+
+    def __init__(self, unit_of_work: SqlAlchemyUnitOfWork, semaphore: asyncio.Semaphore):
+        self.unit_of_work = unit_of_work
+        self.semaphore = semaphore
+
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+        try:
+            await self.unit_of_work.__aenter__()
+        except BaseException:
+            self.semaphore.release()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        try:
+            await self.unit_of_work.__aexit__(exc_type, exc_val, exc_tb)
+        finally:
+            self.semaphore.release()
+
+    def persistence_factory(self, cls: Type[T]) -> T:
+        return self.unit_of_work.persistence_factory(cls)
+
+    async def save(self):
+        await self.unit_of_work.save()
+
+
+class SqlAlchemyUnitOfWorkFactory:
+    """
+    opens independent units of work for concurrent work, units of work from one factory
+    share at most BATCH_MAX_CONNECTIONS pooled connections
+    """
+    __slots__ = "connection_pool", "logger", "semaphore"
+
+    def __init__(self, connection_pool: SqlAlchemyConnectionPool, settings: Settings, logger: Logger):
+        self.logger = logger
+        self.connection_pool = connection_pool
+        self.semaphore = asyncio.Semaphore(settings.BATCH_MAX_CONNECTIONS)
+
+    def __call__(self) -> ThrottledUnitOfWork:
+        return ThrottledUnitOfWork(
+            SqlAlchemyUnitOfWork(connection_pool=self.connection_pool, logger=self.logger),
+            self.semaphore
+        )
 
 
 class FakeStatementGenerator:
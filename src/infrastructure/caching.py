@@ -0,0 +1,373 @@
+import asyncio
+import dataclasses
+import datetime
+import inspect
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import wraps
+from typing import Any, Awaitable, Callable, Coroutine, Hashable, Optional, TypeVar
+
+from src.core import SqlStatement
+from src.crosscutting import Logger
+from src.infrastructure import Settings
+
+T = TypeVar("T")
+
+KeyBuilder = Callable[[dict[str, Any]], Hashable]
+
+MISSING = object()
+
+CONFIGS_CACHE = "dataset_configs"
+RECORDS_CACHE = "dataset_records"
+FINAL_RECORDS_CACHE = "final_dataset_records"
+RESPONSES_CACHE = "dataset_responses"
+_SIZE_SAMPLE = 64
+
+
+def approximate_size(value: Any, _seen: Optional[set] = None) -> int:
+    """
+    rough deep size of a cached value in bytes, large collections are sampled and extrapolated
+    """
+    seen = _seen if _seen is not None else set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    size = sys.getsizeof(value, 64)
+    if value is None or isinstance(value, (str, bytes, bytearray, int, float, bool, datetime.date)):
+        return size
+
+    if isinstance(value, dict):
+        items = list(value.items())
+        sampled = items[:_SIZE_SAMPLE]
+        nested = sum(approximate_size(k, seen) + approximate_size(v, seen) for k, v in sampled)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        items = list(value)
+        sampled = items[:_SIZE_SAMPLE]
+        nested = sum(approximate_size(x, seen) for x in sampled)
+    elif dataclasses.is_dataclass(value):
+        return size + sum(approximate_size(getattr(value, f.name, None), seen) for f in dataclasses.fields(value))
+    else:
+        return size
+
+    if not sampled:
+        return size
+    return size + nested * len(items) // len(sampled)
+
+
+def arguments_key(arguments: dict[str, Any]) -> Hashable:
+    """
+    default key builder, every bound argument in declaration order
+    """
+    return tuple(arguments.values())
+
+
+def id_key(arguments: dict[str, Any]) -> Hashable:
+    return arguments["_id"]
+
+
+def statement_key(arguments: dict[str, Any]) -> Hashable:
+    """
+    keys query results on the statement id and only the parameters the statement binds,
+    so datasets sharing a statement share results; date relative statements are also keyed on today's date
+    """
+    statement: SqlStatement = arguments["statement"]
+    parameters = tuple(arguments[name] for name in statement.parameters)
+    today = datetime.date.today() if statement.is_date_relative else None
+    return statement.id, parameters, today
+
+
+def page_key(arguments: dict[str, Any]) -> Hashable:
+    """
+    statement_key extended with the page being read
+    """
+    return *statement_key(arguments), arguments["limit"], arguments["after"], arguments["since"]
+
+
+@dataclass
+class CacheStatistics:
+    name: str
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+    entries: int
+    size_bytes: int
+
+
+class CacheEntry:
+    __slots__ = "value", "expires_at", "size"
+
+    def __init__(self, value: Any, expires_at: Optional[float], size: int):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+
+
+class BoundedCache:
+    """
+    LRU cache bounded by entry count and approximate bytes, entries optionally expire after a TTL
+    concurrent loads of the same key share one in-flight future
+    """
+    __slots__ = "name", "max_entries", "max_bytes", "ttl_seconds", "entries", "in_flight", "size_bytes", \
+        "generation", "hits", "misses", "evictions", "expirations"
+
+    def __init__(self,
+        name: str,
+        max_entries: int = 1024,
+        max_bytes: int = 32 * 1024 * 1024,
+        ttl_seconds: Optional[float] = 300
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.entries: OrderedDict[Hashable, CacheEntry] = OrderedDict()
+        self.in_flight: dict[Hashable, asyncio.Future] = {}
+        self.size_bytes = 0
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Any:
+        """
+        :return: the cached value or MISSING, a hit moves the entry to the most recently used end
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return MISSING
+
+        if entry.expires_at is not None and entry.expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return MISSING
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry.value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if key in self.entries:
+            self._remove(key)
+
+        size = approximate_size(value)
+        if size > self.max_bytes:
+            return
+
+        expires_at = None if self.ttl_seconds is None else time.monotonic() + self.ttl_seconds
+        self.entries[key] = CacheEntry(value, expires_at, size)
+        self.size_bytes += size
+
+        while len(self.entries) > self.max_entries or self.size_bytes > self.max_bytes:
+            oldest = next(iter(self.entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    async def load(self, key: Hashable, loader: Callable[[], Awaitable[T]], min_cost_seconds: float = 0) -> T:
+        """
+        runs the loader and caches its result, callers missing on a key that is already loading wait on that load
+        :param min_cost_seconds: results that loaded faster than this are not worth the memory and aren't admitted
+        """
+        pending = self.in_flight.get(key)
+        if pending is not None:
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # the caller that owned the load was cancelled, load on behalf of this caller instead
+                return await self.load(key, loader, min_cost_seconds)
+
+        entry = self.entries.get(key)
+        if entry is not None and (entry.expires_at is None or entry.expires_at > time.monotonic()):
+            return entry.value
+
+        generation = self.generation
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        started = time.perf_counter()
+        try:
+            result = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # mark the exception retrieved, waiters (if any) re-raise it themselves
+            future.exception()
+            raise
+        else:
+            # an invalidation during the load means the result may already be stale
+            cost = time.perf_counter() - started
+            if generation == self.generation and cost >= min_cost_seconds:
+                self.set(key, result)
+            future.set_result(result)
+            return result
+        finally:
+            self.in_flight.pop(key, None)
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        self.generation += 1
+        keys = [key for key in self.entries if predicate(key)]
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    def clear(self) -> None:
+        self.generation += 1
+        self.entries.clear()
+        self.size_bytes = 0
+
+    def sweep(self) -> int:
+        """
+        removes expired entries without waiting for them to be read again
+        """
+        if self.ttl_seconds is None:
+            return 0
+        now = time.monotonic()
+        expired = [key for key, entry in self.entries.items() if entry.expires_at <= now]
+        for key in expired:
+            self._remove(key)
+        self.expirations += len(expired)
+        return len(expired)
+
+    def statistics(self) -> CacheStatistics:
+        return CacheStatistics(
+            name=self.name,
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            expirations=self.expirations,
+            entries=len(self.entries),
+            size_bytes=self.size_bytes
+        )
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self.entries.pop(key)
+        self.size_bytes -= entry.size
+
+
+CACHE_REGISTRY: dict[str, BoundedCache] = {}
+
+
+def register_cache(cache: BoundedCache) -> BoundedCache:
+    CACHE_REGISTRY[cache.name] = cache
+    return cache
+
+
+def get_cache(name: str) -> BoundedCache:
+    return CACHE_REGISTRY[name]
+
+
+def async_cache(
+    name: str,
+    ttl_seconds: Optional[float] = 300,
+    max_entries: int = 1024,
+    max_bytes: int = 32 * 1024 * 1024,
+    key_builder: KeyBuilder = arguments_key,
+    min_cost_seconds: float = 0
+):
+    """
+    caches the result of an async method in its own bounded key space
+    :param name: registry name of the cache, readable through get_cache for statistics and invalidation
+    :param key_builder: builds the key from the bound arguments of the call (excluding self)
+    :param min_cost_seconds: only results slower than this to compute are admitted
+    """
+    cache = register_cache(BoundedCache(
+        name=name,
+        max_entries=max_entries,
+        max_bytes=max_bytes,
+        ttl_seconds=ttl_seconds
+    ))
+
+    def decorator(func: Callable[..., Coroutine[Any, Any, Optional[Any]]]):
+        signature = inspect.signature(func)
+
+        @wraps(func)
+        async def wrapper(self, *args, **kwargs) -> Optional[Any]:
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+            arguments.pop("self", None)
+            key = key_builder(arguments)
+
+            logger: Logger = self.logger
+            value = cache.get(key)
+            if value is not MISSING:
+                logger.info("Cache hit", cache=name)
+                return value
+
+            logger.info("Cache miss", cache=name)
+            return await cache.load(key, lambda: func(self, *args, **kwargs), min_cost_seconds)
+
+        wrapper.cache = cache
+        return wrapper
+    return decorator
+
+
+# encoded endpoint responses, keyed like the records caches with the statement id first
+register_cache(BoundedCache(name=RESPONSES_CACHE, max_entries=4096, max_bytes=64 * 1024 * 1024, ttl_seconds=60))
+
+
+class RecordCacheInvalidator:
+    """
+    drops cached query results and responses for a statement once new data has been written for it
+    """
+    __slots__ = "logger",
+
+    def __init__(self, logger: Logger):
+        self.logger = logger
+
+    async def __call__(self, statement_id: str) -> None:
+        removed = sum(
+            get_cache(name).invalidate(lambda key: key[0] == statement_id)
+            for name in (RECORDS_CACHE, FINAL_RECORDS_CACHE, RESPONSES_CACHE)
+        )
+        self.logger.info("Cached records invalidated", statement_id=statement_id, removed=removed)
+
+
+class CacheSweeper:
+    """
+    background task removing expired entries from every registered cache
+    """
+    __slots__ = "settings", "logger", "task"
+
+    def __init__(self, settings: Settings, logger: Logger):
+        self.logger = logger
+        self.settings = settings
+        self.task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+
+    def sweep(self) -> None:
+        for cache in list(CACHE_REGISTRY.values()):
+            expired = cache.sweep()
+            if expired:
+                statistics = cache.statistics()
+                self.logger.info("Cache swept", removed=expired, **dataclasses.asdict(statistics))
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.settings.CACHE_SWEEP_INTERVAL_SECONDS)
+            try:
+                self.sweep()
+            except Exception as e:
+                self.logger.error("Cache sweep failed", exc_info=e)
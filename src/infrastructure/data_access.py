@@ -1,13 +1,24 @@
-from datetime import date
-from typing import Optional
+import asyncio
+import dataclasses
+import functools
+import re
+from datetime import date, datetime, timedelta
+from typing import Optional, AsyncIterator, Any, Type, TypeVar, Callable
 
-from sqlalchemy import text, select, exists, func
+from sqlalchemy import text, select, exists, func, insert, delete, Float, JSON, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.base import manager_of_class
 
-from src.core import DatasetConfigAggregate, DataPoint, DatasetConfig
+from src.core import DatasetConfigAggregate, DataPoint, DatasetConfig, SqlStatement, ViewConfig, RecordPage
 from src.crosscutting import auto_slots, Logger, logging_scope
-from src.infrastructure import async_ttl_cache
+from src.infrastructure.models import view_configs, data_points, dataset_configs, data_point_daily_rollups, \
+    data_points_decoded, sql_statements
+from src.infrastructure.encoding import NOTIFICATION_TYPES, NOTIFICATION_CATEGORIES
+from src.infrastructure.notifications import DATA_POINTS_CHANNEL
+from src.infrastructure.partitioning import DEFAULT_PARTITION, partition_name, add_months
+from src.infrastructure.caching import async_cache, id_key, page_key, get_cache, MISSING, RECORDS_CACHE, \
+    FINAL_RECORDS_CACHE, CONFIGS_CACHE
 
 
 @auto_slots
@@ -22,6 +33,80 @@ class SqlAlchemyDbHealthReader:
         return row
 
 
+T = TypeVar("T")
+
+LAYOUT_FIELDS = ("id", "element_id", "breakpoint", "coordinates", "static")
+
+
+@functools.cache
+def dataclass_defaults(cls: type) -> tuple[tuple[str, Any, Optional[Callable[[], Any]]], ...]:
+    """
+    name, default and default factory of every field of a dataclass
+    """
+    return tuple(
+        (x.name, x.default, None if x.default_factory is dataclasses.MISSING else x.default_factory)
+        for x in dataclasses.fields(cls)
+    )
+
+
+def hydrate(cls: Type[T], **values) -> T:
+    """
+    instance of a mapped dataclass filled like the ORM fills loaded rows, without attribute and backref events
+    and without a session, for reading only as its collections are plain lists
+    """
+    instance = manager_of_class(cls).new_instance()
+    state = instance.__dict__
+    for name, default, default_factory in dataclass_defaults(cls):
+        if name in values:
+            state[name] = values[name]
+        else:
+            state[name] = default if default_factory is None else default_factory()
+    return instance
+
+
+async def load_dataset_aggregates(session: AsyncSession, ids: list[str]) -> list[DatasetConfigAggregate]:
+    """
+    reads the configurations, their statement and a json array of their layouts in a single statement,
+    and builds the aggregates from the plain rows, nothing is loaded into the session's identity map
+    """
+    layout = func.json_build_object(*(
+        x for name in LAYOUT_FIELDS for x in (literal_column(f"'{name}'"), view_configs.c[name])
+    ))
+    # aggregated in one pass over the layouts rather than a subquery per configuration
+    layouts = select(
+        view_configs.c.element_id,
+        func.json_agg(layout, type_=JSON).label("layouts")
+    ).where(view_configs.c.element_id.in_(ids)).group_by(view_configs.c.element_id).subquery()
+    result = await session.execute(
+        select(
+            dataset_configs.c.id,
+            dataset_configs.c.statement_id,
+            dataset_configs.c.is_mutable,
+            sql_statements.c.id.label("found_statement_id"),
+            sql_statements.c.statement,
+            layouts.c.layouts,
+        )
+        .outerjoin(sql_statements, sql_statements.c.id == dataset_configs.c.statement_id)
+        .outerjoin(layouts, layouts.c.element_id == dataset_configs.c.id)
+        .where(dataset_configs.c.id.in_(ids))
+    )
+    return [
+        hydrate(
+            DatasetConfigAggregate,
+            id=row.id,
+            statement_id=row.statement_id,
+            is_mutable=row.is_mutable,
+            statement=None if row.found_statement_id is None else hydrate(
+                SqlStatement,
+                id=row.found_statement_id,
+                statement=row.statement
+            ),
+            layouts=[hydrate(ViewConfig, **x) for x in row.layouts or ()]
+        )
+        for row in result
+    ]
+
+
 @auto_slots
 class DatasetRetriever:
 
@@ -29,32 +114,398 @@ class DatasetRetriever:
         self.logger = logger
         self.session = session
 
-    @async_ttl_cache(ttl_seconds=300)
+    @async_cache(name=CONFIGS_CACHE, ttl_seconds=300, max_entries=2048, key_builder=id_key)
     async def __call__(self, _id: str) -> Optional[DatasetConfigAggregate]:
-        result = await self.session.execute(
-            select(DatasetConfigAggregate).where(DatasetConfigAggregate.id == _id).options(
-                selectinload(DatasetConfigAggregate.layouts),
-                selectinload(DatasetConfigAggregate.statement),
-            )
-        )
+        aggregates = await load_dataset_aggregates(self.session, [_id])
         self.logger.info(f"Retrieving dataset configurations for from db", dataset_configuration_id=_id)
-        return result.scalar_one_or_none()
+        return aggregates[0] if aggregates else None
+
+@auto_slots
+class DatasetBatchRetriever:
+
+    def __init__(self, session: AsyncSession, logger: Logger):
+        self.logger = logger
+        self.session = session
+
+    async def __call__(self, ids: list[str]) -> list[DatasetConfigAggregate]:
+        """
+        serves what it can from the dataset configuration cache and loads the rest in a single query
+        """
+        cache = get_cache(CONFIGS_CACHE)
+        found = {}
+        missing = []
+        for _id in ids:
+            cached = cache.get(_id)
+            if cached is MISSING:
+                missing.append(_id)
+            elif cached is not None:
+                found[_id] = cached
+
+        if missing:
+            for aggregate in await load_dataset_aggregates(self.session, missing):
+                cache.set(aggregate.id, aggregate)
+                found[aggregate.id] = aggregate
+            self.logger.info("Retrieving dataset configurations from db", requested=len(missing))
+
+        return [found[_id] for _id in ids if _id in found]
+
+
+PAGE_TIE_COLUMN = "page_tie"
+
+
+def limit_rows(statement: str) -> str:
+    """
+    wraps the statement so at most :page_limit rows are returned, in the statement's order
+    """
+    return f"SELECT * FROM (\n{statement.strip().rstrip(';')}\n) AS page LIMIT :page_limit"
+
+
+def paginate(statement: SqlStatement, after: Any) -> str:
+    """
+    wraps the stored statement so the row limit, and the keyset predicate on its first ordering column,
+    are applied by the database; rows sharing an ordering value, nulls included, are numbered by their content
+    in PAGE_TIE_COLUMN, so a page ending within them continues with the next one
+    :param after: ordering value and tie number of the last row of the previous page
+    """
+    inner = statement.statement.strip().rstrip(";")
+    ordering = statement.ordering
+    if ordering is None:
+        return limit_rows(inner)
+
+    column, descending, nulls_first = ordering
+    ranked = f"SELECT page.*, row_number() OVER (PARTITION BY page.{column} ORDER BY page::text) AS {PAGE_TIE_COLUMN} " \
+        f"FROM (\n{inner}\n) AS page"
+    predicate = ""
+    if after is not None and after[0] is None:
+        # after a null come the remaining nulls, and every value when nulls sort first
+        predicate = f"WHERE (page.{column} IS NOT NULL OR page.{PAGE_TIE_COLUMN} > :page_after_tie) " if nulls_first \
+            else f"WHERE page.{column} IS NULL AND page.{PAGE_TIE_COLUMN} > :page_after_tie "
+    elif after is not None:
+        operator = "<" if descending else ">"
+        # nulls sorting last come after every value, the first condition only involves the partition column
+        # so it is still pushed into the statement
+        nulls = "" if nulls_first else f" OR page.{column} IS NULL"
+        predicate = f"WHERE (page.{column} {operator}= :page_after{nulls}) " \
+            f"AND (page.{column} {operator} :page_after{nulls} OR page.{PAGE_TIE_COLUMN} > :page_after_tie) "
+    direction = "DESC" if descending else "ASC"
+    nulls = "FIRST" if nulls_first else "LAST"
+    return f"SELECT * FROM ({ranked}) AS page {predicate}" \
+        f"ORDER BY page.{column} {direction} NULLS {nulls}, page.{PAGE_TIE_COLUMN} LIMIT :page_limit"
+
+
+_DATA_POINTS_PATTERN = re.compile(r"\bdata_points\b", re.IGNORECASE)
+# what statements see of a data point, the write transaction id is only used to bound incremental reads
+SHADOWED_COLUMNS = ", ".join(x.name for x in data_points_decoded.columns if x.name != "write_xid")
+_WITH_PATTERN = re.compile(r"WITH(\s+RECURSIVE)?\b", re.IGNORECASE)
+
+
+def shadow_data_points(statement: str, predicate: Optional[str] = None) -> str:
+    """
+    shadows data_points with a CTE over data_points_decoded, optionally holding only the points matching predicate,
+    so the stored statement runs unchanged against points with their notification labels decoded
+    """
+    inner = statement.strip().rstrip(";")
+    if not _DATA_POINTS_PATTERN.search(inner):
+        return inner
+
+    where = f" WHERE {predicate}" if predicate else ""
+    # inlined even when referenced more than once, so predicates still reach the partitions
+    points = f"data_points AS NOT MATERIALIZED (SELECT {SHADOWED_COLUMNS} FROM {data_points_decoded.name}{where})"
+    with_clause = _WITH_PATTERN.match(inner)
+    if with_clause is not None:
+        return f"{with_clause.group(0)} {points},{inner[with_clause.end():]}"
+    return f"WITH {points}\n{inner}"
+
+
+def bound_by_watermarks(statement: SqlStatement, since: Optional[str]) -> str:
+    """
+    shadows data_points with a CTE holding only the points committed in the :until_watermark snapshot
+    (and not in the :since_watermark one), the stored statement itself runs unchanged against it
+    """
+    predicate = "pg_visible_in_snapshot(write_xid, CAST(CAST(:until_watermark AS TEXT) AS pg_snapshot))"
+    if since is not None:
+        # every transaction before the snapshot's xmin had ended, the range keeps the (id, write_xid) index usable
+        predicate += " AND write_xid >= pg_snapshot_xmin(CAST(CAST(:since_watermark AS TEXT) AS pg_snapshot))" \
+            " AND NOT pg_visible_in_snapshot(write_xid, CAST(CAST(:since_watermark AS TEXT) AS pg_snapshot))"
+    return shadow_data_points(statement.statement, predicate)
+
+
+def output_name(column: str) -> str:
+    """
+    result key of a column, unquoted identifiers are folded to lower case
+    """
+    if column.startswith('"'):
+        return column[1:-1]
+    return column.lower()
+
 
 @auto_slots
 class SqlAlchemyDataPointReader:
 
+    def __init__(self, session: AsyncSession, logger: Logger):
+        self.logger = logger
+        self.session = session
+
+    async def __call__(self,
+        statement: SqlStatement,
+        start_date: date,
+        end_date: date,
+        day_range: int,
+        limit: int,
+        after: Any = None,
+        since: Optional[str] = None,
+        final: bool = False
+    ) -> RecordPage:
+        """
+        :param limit: maximum number of records in the page
+        :param after: next_key of the previous page, its last ordering value and tie number
+        :param since: watermark of an earlier read, incremental statements only return rows for newer data points
+        :param final: the results can no longer change, so they are kept without a TTL in their own tier
+        """
+        read = self.read_final if final else self.read_recent
+        return await read(
+            statement=statement,
+            start_date=start_date,
+            end_date=end_date,
+            day_range=day_range,
+            limit=limit,
+            after=after,
+            since=since
+        )
+
+    @async_cache(
+        name=FINAL_RECORDS_CACHE,
+        ttl_seconds=None,
+        max_entries=8192,
+        max_bytes=256 * 1024 * 1024,
+        key_builder=page_key
+    )
+    async def read_final(self, statement: SqlStatement, start_date: date, end_date: date, day_range: int, limit: int, after: Any, since: Optional[str]) -> RecordPage:
+        return await self.execute(statement, start_date, end_date, day_range, limit, after, since)
+
+    @async_cache(
+        name=RECORDS_CACHE,
+        ttl_seconds=60,
+        max_entries=4096,
+        max_bytes=128 * 1024 * 1024,
+        key_builder=page_key,
+        min_cost_seconds=0.02
+    )
+    async def read_recent(self, statement: SqlStatement, start_date: date, end_date: date, day_range: int, limit: int, after: Any, since: Optional[str]) -> RecordPage:
+        return await self.execute(statement, start_date, end_date, day_range, limit, after, since)
+
+    async def execute(self, statement: SqlStatement, start_date: date, end_date: date, day_range: int, limit: int, after: Any, since: Optional[str]) -> RecordPage:
+        params = {
+            "start_date": start_date,
+            "end_date": end_date,
+            "day_range": day_range,
+            # one extra row tells whether there is another page
+            "page_limit": limit + 1,
+        }
+        if after is not None:
+            params["page_after"], params["page_after_tie"] = after
+
+        watermark = None
+        incremental = False
+        query = SqlStatement(id=statement.id, statement=shadow_data_points(statement.statement))
+        if statement.is_incremental:
+            # the watermark is a snapshot rather than a timestamp, timestamps are set before points commit and
+            # not in commit order; points of transactions still running now are returned by the next read
+            watermark = await self.session.scalar(text("SELECT CAST(pg_current_snapshot() AS TEXT)"))
+            incremental = since is not None
+            params["until_watermark"] = watermark
+            if incremental:
+                params["since_watermark"] = since
+            query = SqlStatement(id=statement.id, statement=bound_by_watermarks(statement, since if incremental else None))
+
+        result = await self.session.execute(text(paginate(query, after)), params)
+        columns = list(result.keys())
+        rows = result.all()
+
+        truncated = len(rows) > limit
+        next_key = None
+        if columns[-1] == PAGE_TIE_COLUMN:
+            columns.pop()
+            if truncated:
+                last = rows[limit - 1]
+                next_key = (last[columns.index(output_name(statement.ordering[0]))], last[-1])
+            rows = [tuple(row)[:-1] for row in rows[:limit]]
+        else:
+            rows = [tuple(row) for row in rows[:limit]]
+        return RecordPage(
+            columns=columns,
+            rows=rows,
+            next_key=next_key,
+            truncated=truncated,
+            watermark=watermark,
+            incremental=incremental
+        )
+
+
+STREAM_BATCH_SIZE = 1000
+
+
+@auto_slots
+class SqlAlchemyDataPointStreamReader:
+
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def __call__(self, statement: str, start_date: date, end_date: date, day_range: int) -> list[dict]:
+    async def __call__(self, statement: SqlStatement, start_date: date, end_date: date, day_range: int, limit: int) -> AsyncIterator[dict]:
+        """
+        reads through a server side cursor, only one batch of rows is held in memory at a time
+        :param limit: maximum number of records, one more is read when there are more so callers can tell
+        """
         params = {
             "start_date": start_date,
             "end_date": end_date,
             "day_range": day_range,
+            "page_limit": limit + 1,
         }
-        result = await self.session.execute(text(statement), params)
-        rows = result.mappings().all()
-        return [dict(row) for row in rows]
+        result = await self.session.stream(
+            text(limit_rows(shadow_data_points(statement.statement))),
+            params,
+            execution_options={"yield_per": STREAM_BATCH_SIZE}
+        )
+        async for rows in result.mappings().partitions():
+            for row in rows:
+                yield dict(row)
+
+
+EXPORT_COLUMNS = (
+    "dataset_id", "timestamp", "decay_value", "decay_rate", "items_flagged", "notification_type", "notification_category"
+)
+EXPORT_BUFFERED_CHUNKS = 16
+
+
+@auto_slots
+class AsyncpgDataPointExporter:
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def __call__(self,
+        statement_id: str,
+        format: str,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        after: Optional[str]
+    ) -> AsyncIterator[bytes]:
+        """
+        streams the statement's data points with COPY ... TO STDOUT in (timestamp, dataset_id) order,
+        at most EXPORT_BUFFERED_CHUNKS chunks are held while the consumer catches up
+        :param after: dataset_id of the last data point already exported, to resume an interrupted export
+        """
+        arguments: list[Any] = [statement_id]
+        conditions = ["id = $1"]
+        if start is not None:
+            arguments.append(start)
+            conditions.append(f"timestamp >= ${len(arguments)}")
+        if end is not None:
+            arguments.append(end)
+            conditions.append(f"timestamp < ${len(arguments)}")
+        if after is not None:
+            arguments.append(after)
+            conditions.append(
+                f"(timestamp, dataset_id) > "
+                f"(SELECT timestamp, dataset_id FROM data_points WHERE id = $1 AND dataset_id = ${len(arguments)})"
+            )
+        query = f"SELECT {', '.join(EXPORT_COLUMNS)} FROM {data_points_decoded.name} WHERE {' AND '.join(conditions)} ORDER BY timestamp, dataset_id"
+
+        if format == "csv":
+            options = dict(format="csv", header=True)
+        else:
+            # one json document per line, delimiter and quote can't occur in json so nothing is quoted or escaped
+            query = f"SELECT row_to_json(export)::text FROM ({query}) AS export"
+            options = dict(format="csv", delimiter="\x02", quote="\x01")
+
+        connection = await self.session.connection()
+        raw_connection = await connection.get_raw_connection()
+        driver_connection = raw_connection.driver_connection
+        chunks: asyncio.Queue = asyncio.Queue(maxsize=EXPORT_BUFFERED_CHUNKS)
+
+        async def copy() -> None:
+            try:
+                await driver_connection.copy_from_query(query, *arguments, output=chunks.put, **options)
+            except Exception as e:
+                await chunks.put(e)
+            else:
+                await chunks.put(None)
+
+        task = asyncio.create_task(copy())
+        try:
+            while True:
+                chunk = await chunks.get()
+                if chunk is None:
+                    return
+                if isinstance(chunk, Exception):
+                    raise chunk
+                yield bytes(chunk)
+        finally:
+            if not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+
+
+@auto_slots
+class SqlAlchemyDataPointPositionReader:
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def __call__(self, statement_id: str, dataset_id: str) -> Optional[datetime]:
+        return await self.session.scalar(
+            select(data_points.c.timestamp).where(data_points.c.id == statement_id, data_points.c.dataset_id == dataset_id)
+        )
+
+
+@auto_slots
+class SqlAlchemyStatementIdReader:
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def __call__(self, ids: Optional[list[str]] = None) -> dict[str, str]:
+        """
+        :param ids: dataset configuration ids to read, every configuration when None
+        """
+        query = select(dataset_configs.c.id, dataset_configs.c.statement_id)
+        if ids is not None:
+            query = query.where(dataset_configs.c.id.in_(ids))
+        result = await self.session.execute(query)
+        return {row.id: row.statement_id for row in result}
+
+
+@auto_slots
+class SqlAlchemyViewConfigReader:
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def __call__(self) -> list[ViewConfig]:
+        """
+        reads plain column rows rather than loading mapped entities into the session
+        """
+        result = await self.session.execute(select(
+            view_configs.c.id,
+            view_configs.c.element_id,
+            view_configs.c.breakpoint,
+            view_configs.c.coordinates,
+            view_configs.c.static,
+        ))
+        return [
+            ViewConfig(
+                id=row.id,
+                element_id=row.element_id,
+                breakpoint=row.breakpoint,
+                coordinates=row.coordinates,
+                static=row.static
+            )
+            for row in result
+        ]
 
 
 @auto_slots
@@ -78,7 +529,11 @@ class DatabaseBootstrapper:
             if count > 0:
                 return
 
-            self.session.add_all(data)
+            if _type is DataPoint:
+                await insert_data_points(self.session, data)
+                await upsert_daily_rollups(self.session, data)
+            else:
+                self.session.add_all(data)
 
 
 @auto_slots
@@ -98,4 +553,219 @@ class SqlAlchemyDataPointWriter:
         self.session = session
 
     async def __call__(self, record: DataPoint):
-        self.session.add(record)
\ No newline at end of file
+        await insert_data_points(self.session, [record])
+        await upsert_daily_rollups(self.session, [record])
+        # delivered to listeners once the transaction commits, dropped with it on rollback
+        await notify_data_points(self.session, record.id)
+
+
+COPY_MIN_ROWS = 1000
+# columns filled by the database, like the write transaction id, are left to their defaults
+DATA_POINT_COLUMNS = tuple(column.name for column in data_points.columns if column.server_default is None)
+
+
+async def encode_data_points(session: AsyncSession, records: list[DataPoint]) -> list[tuple]:
+    """
+    rows of DATA_POINT_COLUMNS for the records, their notification labels replaced by lookup codes
+    """
+    types = await NOTIFICATION_TYPES.encode(session, (record.notification_type for record in records))
+    categories = await NOTIFICATION_CATEGORIES.encode(session, (record.notification_category for record in records))
+    rows = []
+    for record in records:
+        codes = {
+            "notification_type_code": types.get(record.notification_type),
+            "notification_category_code": categories.get(record.notification_category),
+        }
+        rows.append(tuple(codes[x] if x in codes else getattr(record, x) for x in DATA_POINT_COLUMNS))
+    return rows
+
+
+async def insert_data_points(session: AsyncSession, records: list[DataPoint]) -> None:
+    """
+    COPY_MIN_ROWS or more records are written with a binary COPY, fewer as a multi-row insert
+    """
+    rows = await encode_data_points(session, records)
+    if len(rows) >= COPY_MIN_ROWS:
+        connection = await session.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            data_points.name,
+            records=rows,
+            columns=DATA_POINT_COLUMNS
+        )
+    else:
+        await session.execute(insert(data_points), [dict(zip(DATA_POINT_COLUMNS, row)) for row in rows])
+
+
+async def notify_data_points(session: AsyncSession, statement_id: str) -> None:
+    await session.execute(
+        text("SELECT pg_notify(:channel, :statement_id)"),
+        {"channel": DATA_POINTS_CHANNEL, "statement_id": statement_id}
+    )
+
+
+@auto_slots
+class SqlAlchemyDataPointBatchWriter:
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def __call__(self, records: list[DataPoint]):
+        """
+        batches of COPY_MIN_ROWS or more are written with a binary COPY, smaller ones as a multi-row insert
+        """
+        if not records:
+            return
+
+        # also starts the transaction before a COPY, which otherwise runs outside of it on the raw connection
+        for statement_id in dict.fromkeys(record.id for record in records):
+            await notify_data_points(self.session, statement_id)
+
+        await insert_data_points(self.session, records)
+        await upsert_daily_rollups(self.session, records)
+
+
+ROLLUP_KEY = ("id", "day", "notification_type", "notification_category")
+ROLLUP_MEASURES = ("decay_value", "decay_rate", "items_flagged")
+ROLLUP_TOTALS = ("point_count",) + tuple(
+    f"{measure}_{total}" for measure in ROLLUP_MEASURES for total in ("count", "sum", "sum_squares")
+)
+
+
+def rollup_rows(records: list[DataPoint]) -> list[dict]:
+    """
+    the records' totals per rollup key, ordered by key so concurrent writers lock rollup rows in the same order
+    """
+    rollups: dict[tuple, dict] = {}
+    for record in records:
+        if record.id is None or record.timestamp is None:
+            continue
+        key = (record.id, record.timestamp.date(), record.notification_type, record.notification_category)
+        row = rollups.get(key)
+        if row is None:
+            row = rollups[key] = {**dict(zip(ROLLUP_KEY, key)), **dict.fromkeys(ROLLUP_TOTALS, 0)}
+        row["point_count"] += 1
+        for measure in ROLLUP_MEASURES:
+            value = getattr(record, measure)
+            if value is not None:
+                row[f"{measure}_count"] += 1
+                row[f"{measure}_sum"] += value
+                row[f"{measure}_sum_squares"] += value * value
+    return [rollups[key] for key in sorted(rollups, key=lambda x: (x[0], x[1], x[2] or "", x[3] or ""))]
+
+
+async def upsert_daily_rollups(session: AsyncSession, records: list[DataPoint]) -> None:
+    """
+    adds the records to their daily rollups within the session's transaction
+    """
+    rows = rollup_rows(records)
+    if not rows:
+        return
+    statement = pg_insert(data_point_daily_rollups)
+    statement = statement.on_conflict_do_update(
+        index_elements=list(ROLLUP_KEY),
+        set_={name: data_point_daily_rollups.c[name] + statement.excluded[name] for name in ROLLUP_TOTALS}
+    )
+    await session.execute(statement, rows)
+
+
+@auto_slots
+class SqlAlchemyDailyRollupRebuilder:
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def __call__(self, statement_id: Optional[str] = None, start: Optional[date] = None, end: Optional[date] = None) -> int:
+        """
+        recomputes the daily rollups from the raw data points, optionally only for a statement and a day range,
+        writers wait for the table lock so no point is counted twice or missed while it runs
+        :param end: last day included
+        :return: number of rollup rows written
+        """
+        await self.session.execute(text(f"LOCK TABLE {data_point_daily_rollups.name} IN SHARE ROW EXCLUSIVE MODE"))
+
+        points = data_points_decoded
+        day = func.date(points.c.timestamp)
+        conditions = [points.c.id.is_not(None)]
+        rollup_conditions = []
+        if statement_id is not None:
+            conditions.append(points.c.id == statement_id)
+            rollup_conditions.append(data_point_daily_rollups.c.id == statement_id)
+        if start is not None:
+            conditions.append(points.c.timestamp >= start)
+            rollup_conditions.append(data_point_daily_rollups.c.day >= start)
+        if end is not None:
+            conditions.append(points.c.timestamp < end + timedelta(days=1))
+            rollup_conditions.append(data_point_daily_rollups.c.day <= end)
+
+        totals = [func.count()]
+        for measure in ROLLUP_MEASURES:
+            column = points.c[measure]
+            totals += [
+                func.count(column),
+                func.coalesce(func.sum(column), 0),
+                func.coalesce(func.sum(column.cast(Float) * column), 0)
+            ]
+        keys = [points.c.id, day, points.c.notification_type, points.c.notification_category]
+        rollups = select(*keys, *totals).where(*conditions).group_by(*keys)
+
+        await self.session.execute(delete(data_point_daily_rollups).where(*rollup_conditions))
+        result = await self.session.execute(
+            insert(data_point_daily_rollups).from_select(ROLLUP_KEY + ROLLUP_TOTALS, rollups)
+        )
+        return result.rowcount
+
+
+# serialises partition maintenance across processes, held until the transaction ends
+PARTITION_LOCK_KEY = 72_530_201
+
+
+@auto_slots
+class SqlAlchemyDataPointPartitionManager:
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def __call__(self, start: date, end: date) -> list[str]:
+        """
+        creates the missing monthly partitions from the month of start to the month of end,
+        points already written to the default partition for such a month are moved into it
+        :return: names of the created partitions
+        """
+        await self.session.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK_KEY})
+        result = await self.session.execute(
+            text(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE pg_inherits.inhparent = CAST(:parent AS regclass)"
+            ),
+            {"parent": data_points.name}
+        )
+        existing = set(result.scalars().all())
+
+        created = []
+        month = start.replace(day=1)
+        while month <= end:
+            following = add_months(month, 1)
+            name = partition_name(month)
+            if name not in existing:
+                # a plain partition of the default one can't be created while it holds rows of the range,
+                # so they are moved into a standalone table which is then attached
+                await self.session.execute(text(
+                    f"CREATE TABLE {name} (LIKE {data_points.name} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+                ))
+                await self.session.execute(
+                    text(
+                        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+                        f"WHERE timestamp >= :lower AND timestamp < :upper RETURNING *) "
+                        f"INSERT INTO {name} SELECT * FROM moved"
+                    ),
+                    {"lower": datetime(month.year, month.month, 1), "upper": datetime(following.year, following.month, 1)}
+                )
+                await self.session.execute(text(
+                    f"ALTER TABLE {data_points.name} ATTACH PARTITION {name} "
+                    f"FOR VALUES FROM ('{month.isoformat()}') TO ('{following.isoformat()}')"
+                ))
+                created.append(name)
+            month = following
+        return created
@@ -7,7 +7,7 @@ from typing import Any
 import aiofiles
 
 from src.core import DatasetConfig, ViewConfig, SqlStatement, DataPoint
-from src.crosscutting import auto_slots, Logger
+from src.crosscutting import auto_slots, Logger, uuid7
 from src.infrastructure import Settings
 import uuid
 
@@ -71,7 +71,7 @@ class JsonDataPointProcessor:
         records: list[DataPoint] = []
         for record in data.get("data_records", []):
             records.append(DataPoint(
-                dataset_id=str(uuid.uuid4()),
+                dataset_id=str(uuid7()),
                 id=record.get("id"),
                 timestamp=datetime.fromisoformat(record["timestamp"]),
                 decay_value=record.get("decay_value"),
@@ -0,0 +1,57 @@
+from typing import Iterable, Optional
+
+from sqlalchemy import Table, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.infrastructure.models import notification_types, notification_categories
+
+# session.info key of the (table, label) pairs a session added to the lookup tables
+ADDED_LABELS = "added_labels"
+
+
+class LabelDictionary:
+    """
+    process wide cache of the committed codes of a label lookup table, a code never changes once committed
+    so cached codes stay valid for the life of the process
+    """
+    __slots__ = "table", "codes"
+
+    def __init__(self, table: Table):
+        self.table = table
+        self.codes: dict[str, int] = {}
+
+    async def encode(self, session: AsyncSession, labels: Iterable[Optional[str]]) -> dict[str, int]:
+        """
+        codes of the labels, labels seen for the first time are added to the lookup table in the session's
+        own transaction, so their codes are only cached once a lookup from another session finds them committed
+        """
+        wanted = {x for x in labels if x is not None}
+        missing = wanted - self.codes.keys()
+        codes = {x: self.codes[x] for x in wanted - missing}
+        if missing:
+            codes.update(await self._load(session, missing))
+            unknown = missing - codes.keys()
+            if unknown:
+                # sorted so concurrent writers adding the same labels wait on each other rather than deadlock
+                await session.execute(
+                    pg_insert(self.table).on_conflict_do_nothing(index_elements=["name"]),
+                    [{"name": x} for x in sorted(unknown)]
+                )
+                session.info.setdefault(ADDED_LABELS, set()).update((self.table.name, x) for x in unknown)
+                codes.update(await self._load(session, unknown))
+        return codes
+
+    async def _load(self, session: AsyncSession, names: set[str]) -> dict[str, int]:
+        result = await session.execute(
+            select(self.table.c.name, self.table.c.code).where(self.table.c.name.in_(names))
+        )
+        codes = {row.name: row.code for row in result}
+        # rows added by this session may still be rolled back with its transaction
+        added = session.info.get(ADDED_LABELS, ())
+        self.codes.update({name: code for name, code in codes.items() if (self.table.name, name) not in added})
+        return codes
+
+
+NOTIFICATION_TYPES = LabelDictionary(notification_types)
+NOTIFICATION_CATEGORIES = LabelDictionary(notification_categories)
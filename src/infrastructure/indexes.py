@@ -0,0 +1,92 @@
+from array import array
+from typing import Optional
+
+from src.core import ViewConfig
+
+
+class IndexedLayout:
+    """
+    compact layout entry, coordinates are packed into an int array rather than kept as ORM/JSON objects
+    """
+    __slots__ = "element_id", "coordinates", "static"
+
+    def __init__(self, element_id: str, coordinates: array, static: Optional[bool]):
+        self.element_id = element_id
+        self.coordinates = coordinates
+        self.static = static
+
+
+class InMemoryLayoutIndex:
+    """
+    every view configuration keyed by breakpoint then view id, lets dashboards be laid out without a db round trip
+    """
+    __slots__ = "layouts", "loaded"
+
+    def __init__(self):
+        self.layouts: dict[str, dict[str, IndexedLayout]] = {}
+        self.loaded = False
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.loaded
+
+    def load(self, views: list[ViewConfig]) -> None:
+        layouts: dict[str, dict[str, IndexedLayout]] = {}
+        for view in views:
+            layouts.setdefault(view.breakpoint, {})[view.id] = _index(view)
+        self.layouts = layouts
+        self.loaded = True
+
+    def add(self, views: list[ViewConfig]) -> None:
+        """
+        views added before the index is loaded are picked up by the load itself
+        """
+        if not self.loaded:
+            return
+        for view in views:
+            self.layouts.setdefault(view.breakpoint, {})[view.id] = _index(view)
+
+    def get(self, breakpoint: str) -> list[ViewConfig]:
+        return [
+            ViewConfig(
+                id=view_id,
+                element_id=layout.element_id,
+                breakpoint=breakpoint,
+                coordinates=layout.coordinates.tolist(),
+                static=layout.static
+            )
+            for view_id, layout in self.layouts.get(breakpoint, {}).items()
+        ]
+
+
+class InMemoryStatementIndex:
+    """
+    statement id of every dataset configuration, lets data points be written without reading their dataset
+    """
+    __slots__ = "statement_ids", "loaded"
+
+    def __init__(self):
+        self.statement_ids: dict[str, str] = {}
+        self.loaded = False
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.loaded
+
+    def load(self, statement_ids: dict[str, str]) -> None:
+        self.statement_ids = {**statement_ids, **self.statement_ids}
+        self.loaded = True
+
+    def add(self, dataset_id: str, statement_id: str) -> None:
+        self.statement_ids[dataset_id] = statement_id
+
+    def get(self, dataset_id: str) -> Optional[str]:
+        return self.statement_ids.get(dataset_id)
+
+
+def _index(view: ViewConfig) -> IndexedLayout:
+    return IndexedLayout(
+        element_id=view.element_id,
+        coordinates=array("i", view.coordinates or []),
+        static=view.static
+    )
@@ -0,0 +1,131 @@
+import asyncio
+from typing import Optional
+
+from src.core import DataPoint, UnitOfWorkFactory, DataChangeListener, DataPointBatchWriter
+from src.crosscutting import Logger
+from src.infrastructure import Settings
+
+
+class WriteBehindDataPointQueue:
+    """
+    bounded in-process queue of data points drained by a background flusher, a batch is written once it reaches
+    WRITE_BEHIND_BATCH_SIZE or its oldest point has waited WRITE_BEHIND_FLUSH_INTERVAL_SECONDS
+    points still queued when the process dies without a graceful shutdown are lost
+    """
+    __slots__ = "unit_of_work_factory", "change_listeners", "settings", "logger", "queue", "batch", "task", \
+        "flushing", "flushed", "failed"
+
+    def __init__(self,
+        unit_of_work_factory: UnitOfWorkFactory,
+        change_listeners: list[DataChangeListener],
+        settings: Settings,
+        logger: Logger
+    ):
+        self.logger = logger
+        self.settings = settings
+        self.change_listeners = change_listeners
+        self.unit_of_work_factory = unit_of_work_factory
+        self.queue: asyncio.Queue[DataPoint] = asyncio.Queue(maxsize=settings.WRITE_BEHIND_MAX_QUEUE)
+        self.batch: list[DataPoint] = []
+        self.task: Optional[asyncio.Task] = None
+        self.flushing: Optional[asyncio.Task] = None
+        self.flushed = 0
+        self.failed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.settings.WRITE_BEHIND_ENABLED
+
+    @property
+    def depth(self) -> int:
+        return self.queue.qsize() + len(self.batch)
+
+    @property
+    def capacity(self) -> int:
+        return self.queue.maxsize
+
+    def put(self, data_point: DataPoint) -> bool:
+        try:
+            self.queue.put_nowait(data_point)
+        except asyncio.QueueFull:
+            self.logger.warning("Data point queue full", capacity=self.capacity)
+            return False
+        return True
+
+    async def start(self) -> None:
+        if self.enabled and self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        waits for the batch being written, then writes everything still queued
+        """
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+        if self.flushing is not None:
+            await self.flushing
+
+        while self.batch or not self.queue.empty():
+            self._take(self.settings.WRITE_BEHIND_BATCH_SIZE)
+            await self._flush()
+        self.logger.info("Data point queue drained", flushed=self.flushed, failed=self.failed)
+
+    def _take(self, size: int) -> None:
+        while len(self.batch) < size and not self.queue.empty():
+            self.batch.append(self.queue.get_nowait())
+
+    async def _next_batch(self) -> None:
+        size = self.settings.WRITE_BEHIND_BATCH_SIZE
+        self.batch.append(await self.queue.get())
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.settings.WRITE_BEHIND_FLUSH_INTERVAL_SECONDS
+        while len(self.batch) < size:
+            self._take(size)
+            timeout = deadline - loop.time()
+            if len(self.batch) >= size or timeout <= 0:
+                return
+            try:
+                self.batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                return
+
+    async def _run(self) -> None:
+        while True:
+            await self._next_batch()
+            # a shutdown waits for the batch being written instead of cancelling it
+            self.flushing = asyncio.create_task(self._flush())
+            await asyncio.shield(self.flushing)
+            self.flushing = None
+
+    async def _flush(self) -> None:
+        batch, self.batch = self.batch, []
+        if not batch:
+            return
+
+        retries = self.settings.WRITE_BEHIND_MAX_RETRIES
+        for attempt in range(retries + 1):
+            try:
+                async with self.unit_of_work_factory() as uow:
+                    writer = uow.persistence_factory(DataPointBatchWriter)
+                    await writer(batch)
+                    await uow.save()
+                break
+            except Exception as e:
+                if attempt == retries:
+                    self.failed += len(batch)
+                    self.logger.error("Data point batch dropped", exc_info=e, count=len(batch), attempts=attempt + 1)
+                    return
+                self.logger.warning("Data point batch failed, retrying", exc_info=e, count=len(batch), attempt=attempt + 1)
+                await asyncio.sleep(self.settings.WRITE_BEHIND_RETRY_BACKOFF_SECONDS * 2 ** attempt)
+
+        self.flushed += len(batch)
+        self.logger.info("Data point batch flushed", count=len(batch), depth=self.depth)
+        for statement_id in dict.fromkeys(data_point.id for data_point in batch):
+            for listener in self.change_listeners:
+                await listener(statement_id)
@@ -1,8 +1,11 @@
 from typing import Optional, Any
 
 from sqlalchemy import (
-    Table, MetaData, Column, String, Float, DateTime, Integer, Boolean, ForeignKey, JSON
+    Table, MetaData, Column, String, Float, DateTime, Date, Integer, SmallInteger, BigInteger, Boolean, ForeignKey, JSON,
+    Index, Uuid, Identity
 )
+from sqlalchemy.sql import table, column, text
+from sqlalchemy.types import UserDefinedType
 from sqlalchemy.orm import registry, relationship, foreign
 
 from src.core import DataPoint, DatasetConfig, ViewConfig, SqlStatement, DatasetConfigAggregate
@@ -12,17 +15,96 @@ _mappers_started = False
 mapper_registry = registry()
 metadata = MetaData()
 
+
+class Xid8(UserDefinedType):
+    """
+    64 bit transaction id, compared against pg_snapshot values
+    """
+    cache_ok = True
+
+    def get_col_spec(self, **kw):
+        return "XID8"
+
+
 data_points = Table(
     "data_points",
     metadata,
-    Column("dataset_id", String, primary_key=True),
+    Column("dataset_id", Uuid(as_uuid=False), primary_key=True),
     Column("id", String, nullable=True),
     Column("timestamp", DateTime, nullable=True),
     Column("decay_value", Float, nullable=True),
     Column("decay_rate", Float, nullable=True),
     Column("items_flagged", Integer, nullable=True),
+    # codes of the notification_types and notification_categories lookup tables
+    Column("notification_type_code", SmallInteger, nullable=True),
+    Column("notification_category_code", SmallInteger, nullable=True),
+    # transaction that wrote the point, incremental reads return the points committed since an earlier snapshot
+    Column("write_xid", Xid8, nullable=False, server_default=text("pg_current_xact_id()")),
+    # statements filter by id and a timestamp range, the included columns allow index-only aggregates
+    Index(
+        "ix_data_points_id_timestamp",
+        "id",
+        "timestamp",
+        postgresql_include=["decay_rate", "items_flagged", "notification_type_code"]
+    ),
+    Index("ix_data_points_id_write_xid", "id", "write_xid"),
+)
+
+notification_types = Table(
+    "notification_types",
+    metadata,
+    Column("code", SmallInteger, Identity(), primary_key=True),
+    Column("name", String, nullable=False, unique=True),
+)
+
+notification_categories = Table(
+    "notification_categories",
+    metadata,
+    Column("code", SmallInteger, Identity(), primary_key=True),
+    Column("name", String, nullable=False, unique=True),
+)
+
+# view joining the labels back onto data_points, what statements and readers see as data_points
+data_points_decoded = table(
+    "data_points_decoded",
+    column("dataset_id", Uuid(as_uuid=False)),
+    column("id", String),
+    column("timestamp", DateTime),
+    column("decay_value", Float),
+    column("items_flagged", Integer),
+    column("notification_type", String),
+    column("notification_category", String),
+    column("decay_rate", Float),
+    column("write_xid", Xid8),
+)
+
+# one row per statement, day and category, kept in step with data_points by the data point writers
+data_point_daily_rollups = Table(
+    "data_point_daily_rollups",
+    metadata,
+    Column("id", String, nullable=False),
+    Column("day", Date, nullable=False),
     Column("notification_type", String, nullable=True),
     Column("notification_category", String, nullable=True),
+    Column("point_count", BigInteger, nullable=False),
+    Column("decay_value_count", BigInteger, nullable=False),
+    Column("decay_value_sum", Float, nullable=False),
+    Column("decay_value_sum_squares", Float, nullable=False),
+    Column("decay_rate_count", BigInteger, nullable=False),
+    Column("decay_rate_sum", Float, nullable=False),
+    Column("decay_rate_sum_squares", Float, nullable=False),
+    Column("items_flagged_count", BigInteger, nullable=False),
+    Column("items_flagged_sum", BigInteger, nullable=False),
+    Column("items_flagged_sum_squares", Float, nullable=False),
+    Index(
+        "ux_data_point_daily_rollups_key",
+        "id",
+        "day",
+        "notification_type",
+        "notification_category",
+        unique=True,
+        postgresql_nulls_not_distinct=True
+    ),
 )
 
 sql_statements = Table(
@@ -35,7 +117,7 @@ sql_statements = Table(
 dataset_configs = Table(
     "dataset_configs",
     metadata,
-    Column("id", String, primary_key=True),
+    Column("id", Uuid(as_uuid=False), primary_key=True),
     Column("statement_id", String, nullable=True),
     Column("is_mutable", Boolean, nullable=True),
 )
@@ -43,8 +125,8 @@ dataset_configs = Table(
 view_configs = Table(
     "view_configs",
     metadata,
-    Column("id", String, primary_key=True),
-    Column("element_id", String, nullable=True),
+    Column("id", Uuid(as_uuid=False), primary_key=True),
+    Column("element_id", Uuid(as_uuid=False), nullable=True),
     Column("breakpoint", String, nullable=True),
     Column("coordinates", JSON, nullable=True),  # [x, y, w, h]
     Column("static", Boolean, nullable=True)
@@ -56,7 +138,12 @@ def start_mappers():
         return
     _mappers_started = True
 
-    mapper_registry.map_imperatively(DataPoint, data_points)
+    # written with their labels encoded by the data point writers, never loaded through the mapper
+    mapper_registry.map_imperatively(
+        DataPoint,
+        data_points,
+        exclude_properties=["notification_type_code", "notification_category_code", "write_xid"]
+    )
 
     mapper_registry.map_imperatively(SqlStatement, sql_statements)
 
@@ -64,6 +151,7 @@ def start_mappers():
 
     mapper_registry.map_imperatively(DatasetConfig, dataset_configs)
 
+    # written through the mapper only, aggregates are read in a single statement by load_dataset_aggregates
     mapper_registry.map_imperatively(
         DatasetConfigAggregate,
         dataset_configs,
@@ -72,13 +160,13 @@ def start_mappers():
                 SqlStatement,
                 primaryjoin=foreign(dataset_configs.c.statement_id) == sql_statements.c.id,
                 backref="dataset_configurations",
-                lazy="joined"
+                lazy="raise"
             ),
             "layouts": relationship(
                 ViewConfig,
                 primaryjoin=foreign(view_configs.c.element_id) == dataset_configs.c.id,
                 backref="dataset_configuration",
-                lazy="joined"
+                lazy="raise"
             )
         }
     )
\ No newline at end of file
@@ -0,0 +1,82 @@
+import asyncio
+from typing import Optional
+
+from src.core import DataNotificationListener
+from src.crosscutting import Logger
+from src.infrastructure import Settings, SqlAlchemyConnectionPool
+
+DATA_POINTS_CHANNEL = "data_points"
+
+
+class PostgresDataChangeFeed:
+    """
+    background task holding one LISTEN connection for the process, every committed data point notification
+    is passed to the listeners, the connection is re-established if it drops
+    """
+    __slots__ = "connection_pool", "listeners", "settings", "logger", "task", "pending"
+
+    def __init__(self,
+        connection_pool: SqlAlchemyConnectionPool,
+        listeners: list[DataNotificationListener],
+        settings: Settings,
+        logger: Logger
+    ):
+        self.logger = logger
+        self.settings = settings
+        self.listeners = listeners
+        self.connection_pool = connection_pool
+        self.task: Optional[asyncio.Task] = None
+        self.pending: set[asyncio.Task] = set()
+
+    async def start(self) -> None:
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+        for task in list(self.pending):
+            task.cancel()
+
+    async def dispatch(self, statement_id: str) -> None:
+        for listener in self.listeners:
+            try:
+                await listener(statement_id)
+            except Exception as e:
+                self.logger.error("Data notification listener failed", exc_info=e, statement_id=statement_id)
+
+    def _notified(self, connection, pid: int, channel: str, payload: str) -> None:
+        task = asyncio.create_task(self.dispatch(payload))
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._listen()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error("Data notification connection failed", exc_info=e)
+            await asyncio.sleep(self.settings.DATA_NOTIFICATION_RECONNECT_SECONDS)
+
+    async def _listen(self) -> None:
+        self.connection_pool.get_session_factory()
+        async with self.connection_pool.engine.connect() as connection:
+            raw_connection = await connection.get_raw_connection()
+            driver_connection = raw_connection.driver_connection
+            terminated = asyncio.Event()
+            driver_connection.add_termination_listener(lambda _: terminated.set())
+            await driver_connection.add_listener(DATA_POINTS_CHANNEL, self._notified)
+            self.logger.info("Listening for data notifications", channel=DATA_POINTS_CHANNEL)
+            try:
+                await terminated.wait()
+            finally:
+                if not driver_connection.is_closed():
+                    await driver_connection.remove_listener(DATA_POINTS_CHANNEL, self._notified)
@@ -0,0 +1,74 @@
+import asyncio
+from datetime import date
+from typing import Optional
+
+from src.core import UnitOfWorkFactory, DataPointPartitionManager
+from src.crosscutting import Logger
+from src.infrastructure import Settings
+
+DEFAULT_PARTITION = "data_points_default"
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(day: date, months: int) -> date:
+    """
+    first day of the month `months` after the month of day
+    """
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"data_points_{month:%Y_%m}"
+
+
+class DataPointPartitionMaintainer:
+    """
+    background task keeping a monthly data_points partition ready for the current month and the
+    DATA_POINT_PARTITION_MONTHS_AHEAD months after it, so new points never land in the default partition
+    """
+    __slots__ = "unit_of_work_factory", "settings", "logger", "task"
+
+    def __init__(self, unit_of_work_factory: UnitOfWorkFactory, settings: Settings, logger: Logger):
+        self.logger = logger
+        self.settings = settings
+        self.unit_of_work_factory = unit_of_work_factory
+        self.task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+
+    async def maintain(self, today: Optional[date] = None) -> list[str]:
+        today = today or date.today()
+        async with self.unit_of_work_factory() as uow:
+            ensure_partitions = uow.persistence_factory(DataPointPartitionManager)
+            created = await ensure_partitions(
+                start=month_start(today),
+                end=add_months(today, self.settings.DATA_POINT_PARTITION_MONTHS_AHEAD)
+            )
+            await uow.save()
+        if created:
+            self.logger.info("Data point partitions created", partitions=created)
+        return created
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.maintain()
+            except Exception as e:
+                self.logger.error("Data point partition maintenance failed", exc_info=e)
+            await asyncio.sleep(self.settings.DATA_POINT_PARTITION_INTERVAL_SECONDS)
@@ -0,0 +1,21 @@
+import uuid
+
+
+class InMemoryDataVersionStore:
+    """
+    monotonically increasing data version per statement id, statements start at version 0
+    versions restart with the process, so each store has its own epoch to tell them apart
+    """
+    __slots__ = "versions", "epoch"
+
+    def __init__(self):
+        self.versions: dict[str, int] = {}
+        self.epoch = uuid.uuid4().hex
+
+    def get(self, statement_id: str) -> int:
+        return self.versions.get(statement_id, 0)
+
+    def bump(self, statement_id: str) -> int:
+        version = self.versions.get(statement_id, 0) + 1
+        self.versions[statement_id] = version
+        return version
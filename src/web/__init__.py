@@ -6,7 +6,8 @@ from fastapi.params import Depends
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from starlette.requests import Request
 
-from src.application.services import DataBootstrapper
+from src.application.services import DataBootstrapper, LayoutRetrievalHandler, StatementLookupHandler
+from src.core import ConnectionPool, BackgroundWorker
 from src.crosscutting import Logger, ServiceProvider
 
 
@@ -17,12 +18,22 @@ security = HTTPBearer()
 async def lifespan(app: FastAPI):
     provider: ServiceProvider = app.state.services
     provider[Logger].info("Starting service")
+    connection_pool = provider[ConnectionPool]
+    await connection_pool.start()
     seed_service = provider[DataBootstrapper]
     await seed_service()
+    await provider[LayoutRetrievalHandler].load()
+    await provider[StatementLookupHandler].load()
+    workers = provider[list[BackgroundWorker]]
+    for worker in workers:
+        await worker.start()
 
     yield
 
     provider[Logger].info("Shutting down service")
+    for worker in reversed(workers):
+        await worker.stop()
+    await connection_pool.dispose()
 
 
 class Authenticator(Protocol):
@@ -0,0 +1,190 @@
+import codecs
+import csv
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Optional
+
+import msgpack
+
+from src.application.mappers import map_data_point_columns_to_domain
+from src.core import DataPoint
+from src.web.models import DataEntryCreateSchema
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+CSV_MEDIA_TYPE = "text/csv"
+
+INGEST_CHUNK_ROWS = 1000
+
+DATA_ENTRY_FIELDS = tuple(DataEntryCreateSchema.model_fields)
+
+
+class DataDecodeError(ValueError):
+    pass
+
+
+def _to_float(value: Any) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        raise ValueError(value)
+    return float(value)
+
+
+def _to_int(value: Any) -> Optional[int]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError(value)
+    return int(value)
+
+
+def _to_str(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        raise ValueError(value)
+    return value
+
+
+_CONVERTERS: dict[type, Callable[[Any], Any]] = {float: _to_float, int: _to_int, str: _to_str}
+COLUMN_CONVERTERS = {
+    name: _CONVERTERS[field.annotation]
+    for name, field in DataEntryCreateSchema.model_fields.items()
+}
+
+
+def validate_columns(columns: dict[str, list], first_row: int) -> dict[str, list]:
+    """
+    converts each column with its field's converter in one pass instead of validating a model per row
+    """
+    validated = {}
+    for name, values in columns.items():
+        convert = COLUMN_CONVERTERS.get(name)
+        if convert is None:
+            raise DataDecodeError(f"Unknown column {name}")
+        try:
+            validated[name] = list(map(convert, values))
+        except (TypeError, ValueError):
+            row = next(i for i, value in enumerate(values) if not _converts(convert, value))
+            raise DataDecodeError(f"Invalid {name} in row {first_row + row}")
+    return validated
+
+
+def _converts(convert: Callable[[Any], Any], value: Any) -> bool:
+    try:
+        convert(value)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+def _rows_to_columns(rows: list[list], names: tuple[str, ...], first_row: int) -> dict[str, list]:
+    for i, row in enumerate(rows):
+        if len(row) != len(names):
+            raise DataDecodeError(f"Expected {len(names)} values in row {first_row + i}")
+    return validate_columns(dict(zip(names, map(list, zip(*rows)))), first_row)
+
+
+async def decode_csv(body: AsyncIterator[bytes]) -> AsyncIterator[dict[str, list]]:
+    """
+    utf-8 csv with a header row naming the columns, quoted fields may span lines,
+    yields validated columns of up to INGEST_CHUNK_ROWS rows
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    names: Optional[tuple[str, ...]] = None
+    rows: list[list] = []
+    row_number = 1
+    pending = ""
+    # one reader over the lines of the body, it is only advanced once a whole row is buffered
+    buffered: deque[str] = deque()
+    reader = csv.reader(iter(buffered.popleft, None))
+    quotes = 0
+
+    async def lines() -> AsyncIterator[str]:
+        nonlocal pending
+        async for chunk in body:
+            pending += decoder.decode(chunk)
+            *complete, pending = pending.split("\n")
+            for line in complete:
+                yield line + "\n"
+        pending += decoder.decode(b"", final=True)
+        if pending:
+            yield pending
+
+    try:
+        async for line in lines():
+            buffered.append(line)
+            # quotes within fields are doubled, so a row is complete once its quotes pair up
+            quotes += line.count('"')
+            if quotes % 2:
+                continue
+            quotes = 0
+            row = next(reader)
+            if not row:
+                continue
+            if names is None:
+                names = tuple(x.strip() for x in row)
+                continue
+            # csv has no null, an empty cell is a missing value whatever the column's type
+            rows.append([None if x == "" else x for x in row])
+            if len(rows) >= INGEST_CHUNK_ROWS:
+                yield _rows_to_columns(rows, names, row_number)
+                row_number += len(rows)
+                rows = []
+    except UnicodeDecodeError:
+        raise DataDecodeError("Body is not valid utf-8")
+
+    if buffered:
+        raise DataDecodeError(f"Unterminated quoted field in row {row_number + len(rows)}")
+    if rows:
+        yield _rows_to_columns(rows, names, row_number)
+
+
+async def decode_msgpack(body: AsyncIterator[bytes]) -> AsyncIterator[dict[str, list]]:
+    """
+    a stream of rows, each a map of field names or an array in DATA_ENTRY_FIELDS order, a single array of rows is
+    also accepted, yields validated columns of up to INGEST_CHUNK_ROWS rows
+    """
+    unpacker = msgpack.Unpacker(raw=False)
+    columns: dict[str, list] = {name: [] for name in DATA_ENTRY_FIELDS}
+    count = 0
+    row_number = 1
+
+    def append(row: Any) -> None:
+        nonlocal count
+        if isinstance(row, dict):
+            values = [row.get(name) for name in DATA_ENTRY_FIELDS]
+            unknown = row.keys() - columns.keys()
+            if unknown:
+                raise DataDecodeError(f"Unknown column {sorted(unknown)[0]}")
+        elif isinstance(row, (list, tuple)) and len(row) == len(DATA_ENTRY_FIELDS):
+            values = row
+        else:
+            raise DataDecodeError(f"Invalid row {row_number + count}")
+        for name, value in zip(DATA_ENTRY_FIELDS, values):
+            columns[name].append(value)
+        count += 1
+
+    try:
+        async for chunk in body:
+            unpacker.feed(chunk)
+            for item in unpacker:
+                rows = item if isinstance(item, list) and item and isinstance(item[0], (dict, list)) else [item]
+                for row in rows:
+                    append(row)
+                    if count >= INGEST_CHUNK_ROWS:
+                        yield validate_columns(columns, row_number)
+                        row_number += count
+                        columns = {name: [] for name in DATA_ENTRY_FIELDS}
+                        count = 0
+    except (msgpack.UnpackException, ValueError) as e:
+        if isinstance(e, DataDecodeError):
+            raise
+        raise DataDecodeError("Body is not valid msgpack")
+
+    if count:
+        yield validate_columns(columns, row_number)
+
+
+async def decode_data_points(columns: AsyncIterator[dict[str, list]]) -> AsyncIterator[list[DataPoint]]:
+    async for chunk in columns:
+        yield map_data_point_columns_to_domain(chunk)
@@ -1,19 +1,35 @@
-from datetime import date
-from typing import Optional
+from datetime import date, datetime
+from typing import Optional, Literal, Annotated
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, Query, Body, Path
-from starlette.responses import JSONResponse, Response
-from starlette.status import HTTP_201_CREATED, HTTP_404_NOT_FOUND, HTTP_401_UNAUTHORIZED, HTTP_403_FORBIDDEN
+from fastapi import APIRouter, Depends, Query, Body, Path, Header, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import TypeAdapter, ValidationError, Field
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.status import HTTP_201_CREATED, HTTP_404_NOT_FOUND, HTTP_401_UNAUTHORIZED, HTTP_403_FORBIDDEN, \
+    HTTP_400_BAD_REQUEST, HTTP_304_NOT_MODIFIED, HTTP_202_ACCEPTED, HTTP_503_SERVICE_UNAVAILABLE, \
+    HTTP_415_UNSUPPORTED_MEDIA_TYPE
 
 from src.application.mappers import map_dataset_aggregate_to_contract, map_dataset_config_contract_to_domain, \
-    map_datapoint_contract_to_domain
+    map_datapoint_contract_to_domain, map_dataset_batch_to_contract, map_view_to_element_contract, map_cursor_to_page_key, map_key_to_cursor, \
+    map_dataset_aggregate_to_columnar_contract, map_watermark_to_domain
 from src.application.services import SystemStatusChecker, DataRetrievalHandler, ConfigurationManager, \
-    DataPointCreationService
+    DataPointCreationService, DatasetBatchRetrievalHandler, LayoutRetrievalHandler, DataStreamHandler, \
+    DataVersionHandler, DatasetUpdatePublisher, DataPointBatchCreationService, DataExportHandler
+from src.core import DataPointWriteStatus, DataPointQueue
 from src.crosscutting import get_service, logging_scope, Logger
+from src.infrastructure import Settings
 from src.web import auth_provider, Authenticator
+from src.web.responses import accepts, encode_ndjson, NDJSON_MEDIA_TYPE, ARROW_STREAM_MEDIA_TYPE, \
+    encode_arrow_stream, FastJSONResponse, ResponseCache, response_key, entity_tag, etag_matches, encode_events, \
+    EVENT_STREAM_MEDIA_TYPE, CSV_EXPORT_MEDIA_TYPE, gzip_stream
+from src.web.decoders import decode_csv, decode_msgpack, decode_data_points, DataDecodeError, \
+    CSV_MEDIA_TYPE, MSGPACK_MEDIA_TYPE
 from src.web.models import AnalyticsResponseSchema, SystemStatusSchema, ResourceCreatedSchema, ConfigurationCreateSchema, \
-    DataEntryCreateSchema
+    DataEntryCreateSchema, AnalyticsBatchResponseSchema, ElementLayoutSchema, IngestionStatusSchema
+
+JSON_MEDIA_TYPE = "application/json"
+DATA_ENTRIES = TypeAdapter(Annotated[list[DataEntryCreateSchema], Field(min_length=1, max_length=10000)])
 
 status_router = APIRouter(
     prefix="/health",
@@ -35,28 +51,109 @@ async def get_system_health(
         database_result = await health_check_service()
         return {"application": True, "database": database_result}
 
+@status_router.get(
+    "/ingestion",
+    response_model=IngestionStatusSchema,
+    summary="Ingestion status",
+    description="Depth of the write-behind data point queue and the number of data points it has written or dropped"
+)
+async def get_ingestion_status(
+    logger: Logger = Depends(get_service(Logger)),
+    data_point_queue: DataPointQueue = Depends(get_service(DataPointQueue))
+):
+    with logging_scope(operation=get_ingestion_status.__name__):
+        logger.info("Endpoint called")
+        return IngestionStatusSchema(
+            write_behind=data_point_queue.enabled,
+            queue_depth=data_point_queue.depth,
+            queue_capacity=data_point_queue.capacity,
+            flushed=data_point_queue.flushed,
+            failed=data_point_queue.failed
+        )
+
 analytics_router = APIRouter(
     prefix="/data",
     tags=["Data"]
 )
 
+@analytics_router.get(
+    "/",
+    response_model=AnalyticsBatchResponseSchema,
+    responses={
+        HTTP_401_UNAUTHORIZED: {"description": "Unauthenticated"},
+        HTTP_403_FORBIDDEN: {"description": "Token invalid"}
+    },
+    summary="Get datasets",
+    description="Get many dataset configurations, data and layouts in one request, errors are reported per dataset. "
+                "Records per dataset are capped at the server maximum"
+)
+async def get_analytics_datasets(
+    ids: list[UUID] = Query(..., max_length=100, description="dataset configuration ids to fetch"),
+    breakpoint: Optional[str] = Query(None, description="Only include layouts for this breakpoint"),
+    start_date: Optional[date] = Query('2025-06-01', description="Start date for filtering"),
+    end_date: Optional[date] = Query('2025-06-30', description="End date for filtering"),
+    day_range: Optional[int] = Query(30, description="Number of days before today"),
+    get_datasets_service: DatasetBatchRetrievalHandler = Depends(get_service(DatasetBatchRetrievalHandler)),
+    settings: Settings = Depends(get_service(Settings)),
+    _ = Depends(auth_provider),
+    logger: Logger = Depends(get_service(Logger))
+):
+    id_strs = [str(x) for x in ids]
+    with logging_scope(
+        operation=get_analytics_datasets.__name__,
+        ids=id_strs,
+        breakpoint=breakpoint,
+        start_date=start_date,
+        end_date=end_date,
+        day_range=day_range,
+    ):
+        logger.info("Endpoint called")
+
+        batch = await get_datasets_service(
+            ids=id_strs,
+            start_date=start_date,
+            end_date=end_date,
+            day_range=day_range,
+            limit=settings.DATASET_MAX_ROWS
+        )
+
+        return FastJSONResponse(map_dataset_batch_to_contract(batch, breakpoint=breakpoint))
+
+
 @analytics_router.get(
     "/{dataset_id}",
     response_model=AnalyticsResponseSchema,
     responses={
+        200: {"content": {NDJSON_MEDIA_TYPE: {}, ARROW_STREAM_MEDIA_TYPE: {}}},
+        HTTP_304_NOT_MODIFIED: {"description": "Data unchanged since the ETag sent in If-None-Match"},
+        HTTP_400_BAD_REQUEST: {"description": "Invalid cursor or watermark"},
         HTTP_404_NOT_FOUND: {"description": "Dataset not found"},
         HTTP_401_UNAUTHORIZED: {"description": "Unauthenticated"},
         HTTP_403_FORBIDDEN: {"description": "Token invalid"}
     },
     summary="Get dataset",
-    description="Get dataset configuration, data and layouts"
+    description=f"Get dataset configuration, data and layouts. Send Accept: {NDJSON_MEDIA_TYPE} to stream records only, "
+                f"one per line, or Accept: {ARROW_STREAM_MEDIA_TYPE} for the records as an Arrow IPC stream, "
+                f"paged through the X-Next-Cursor and X-Truncated headers. Records of statements with one row per data point "
+                f"can be polled incrementally with since, other statements return their full result with incremental false"
 )
 async def get_analytics_dataset(
     dataset_id: UUID = Path(description="dataset configuration id to search under"),
     start_date: Optional[date] = Query('2025-06-01', description="Start date for filtering"),
     end_date: Optional[date] = Query('2025-06-30', description="End date for filtering"),
     day_range: Optional[int] = Query(30, description="Number of days before today"),
+    limit: Optional[int] = Query(None, ge=1, description="Maximum number of records, capped at the server maximum"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    since: Optional[str] = Query(None, description="watermark of an earlier response, only records added after it are returned"),
+    format: Literal["records", "columnar"] = Query("records", description="Records as one object per row, or as column arrays"),
+    accept: Optional[str] = Header(None, include_in_schema=False),
+    accept_encoding: Optional[str] = Header(None, include_in_schema=False),
+    if_none_match: Optional[str] = Header(None, include_in_schema=False),
     get_dataset_service: DataRetrievalHandler = Depends(get_service(DataRetrievalHandler)),
+    get_version_service: DataVersionHandler = Depends(get_service(DataVersionHandler)),
+    stream_dataset_service: DataStreamHandler = Depends(get_service(DataStreamHandler)),
+    response_cache: ResponseCache = Depends(get_service(ResponseCache)),
+    settings: Settings = Depends(get_service(Settings)),
     _ = Depends(auth_provider),
     logger: Logger = Depends(get_service(Logger))
 ):
@@ -67,22 +164,186 @@ async def get_analytics_dataset(
         start_date=start_date,
         end_date=end_date,
         day_range=day_range,
+        limit=limit,
+        cursor=cursor,
+        since=since,
+        format=format,
     ):
         logger.info("Endpoint called")
 
+        limit = min(limit or settings.DATASET_MAX_ROWS, settings.DATASET_MAX_ROWS)
+        if accepts(accept, NDJSON_MEDIA_TYPE):
+            records = await stream_dataset_service(
+                _id=id_str,
+                start_date=start_date,
+                end_date=end_date,
+                day_range=day_range,
+                limit=limit
+            )
+            if records is None:
+                return JSONResponse(status_code=404, content={"detail": "Dataset not found"})
+            return StreamingResponse(encode_ndjson(records, limit), media_type=NDJSON_MEDIA_TYPE)
+
+        wants_arrow = accepts(accept, ARROW_STREAM_MEDIA_TYPE)
+
+        try:
+            after = map_cursor_to_page_key(cursor)
+        except ValueError:
+            return JSONResponse(status_code=HTTP_400_BAD_REQUEST, content={"detail": "Invalid cursor"})
+        try:
+            since_watermark = map_watermark_to_domain(since)
+        except ValueError:
+            return JSONResponse(status_code=HTTP_400_BAD_REQUEST, content={"detail": "Invalid watermark"})
+
+        version = await get_version_service(_id=id_str)
+        if version is None:
+            return JSONResponse(status_code=404, content={"detail": "Dataset not found"})
+
+        cache_key = response_key(version, start_date, end_date, day_range, limit, after, since_watermark, format, wants_arrow)
+        etag = entity_tag(cache_key)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+        cached = response_cache.get(cache_key, accept_encoding)
+        if cached is not None:
+            return cached
+
         dataset = await get_dataset_service(
             _id=id_str,
             start_date=start_date,
             end_date=end_date,
-            day_range=day_range
+            day_range=day_range,
+            limit=limit,
+            after=after,
+            since=since_watermark
         )
 
         if dataset is None:
             return JSONResponse(status_code=404, content={"detail": "Dataset not found"})
 
-        response = map_dataset_aggregate_to_contract(dataset)
-        return response
-    
+        if wants_arrow:
+            response = Response(
+                content=encode_arrow_stream(dataset.page),
+                media_type=ARROW_STREAM_MEDIA_TYPE,
+                headers={
+                    "X-Next-Cursor": map_key_to_cursor(dataset.page.next_key) or "",
+                    "X-Truncated": str(dataset.page.truncated).lower(),
+                    "X-Watermark": map_key_to_cursor(dataset.page.watermark) or "",
+                    "X-Incremental": str(dataset.page.incremental).lower()
+                }
+            )
+        elif format == "columnar":
+            response = FastJSONResponse(map_dataset_aggregate_to_columnar_contract(dataset))
+        else:
+            response = FastJSONResponse(map_dataset_aggregate_to_contract(dataset))
+
+        response.headers["ETag"] = etag
+        return response_cache.store(cache_key, response, accept_encoding)
+
+@analytics_router.get(
+    "/{dataset_id}/stream",
+    responses={
+        200: {"content": {EVENT_STREAM_MEDIA_TYPE: {}}},
+        HTTP_404_NOT_FOUND: {"description": "Dataset not found"},
+        HTTP_401_UNAUTHORIZED: {"description": "Unauthenticated"},
+        HTTP_403_FORBIDDEN: {"description": "Token invalid"}
+    },
+    summary="Stream dataset updates",
+    description="Server-sent events of the dataset, sent once on connect and again whenever data points are written for its "
+                "statement. Every subscriber to a dataset shares one read per change"
+)
+async def stream_analytics_dataset(
+    dataset_id: UUID = Path(description="dataset configuration id to subscribe to"),
+    start_date: Optional[date] = Query('2025-06-01', description="Start date for filtering"),
+    end_date: Optional[date] = Query('2025-06-30', description="End date for filtering"),
+    day_range: Optional[int] = Query(30, description="Number of days before today"),
+    publisher: DatasetUpdatePublisher = Depends(get_service(DatasetUpdatePublisher)),
+    settings: Settings = Depends(get_service(Settings)),
+    _ = Depends(auth_provider),
+    logger: Logger = Depends(get_service(Logger))
+):
+    id_str = str(dataset_id)
+    with logging_scope(
+        operation=stream_analytics_dataset.__name__,
+        id=id_str,
+        start_date=start_date,
+        end_date=end_date,
+        day_range=day_range,
+    ):
+        logger.info("Endpoint called")
+
+        updates = await publisher.subscribe(
+            _id=id_str,
+            start_date=start_date,
+            end_date=end_date,
+            day_range=day_range,
+            limit=settings.DATASET_MAX_ROWS,
+            keep_alive_seconds=settings.DATASET_STREAM_KEEP_ALIVE_SECONDS
+        )
+        if updates is None:
+            return JSONResponse(status_code=404, content={"detail": "Dataset not found"})
+
+        return StreamingResponse(
+            encode_events(updates, event="dataset", mapper=map_dataset_aggregate_to_contract),
+            media_type=EVENT_STREAM_MEDIA_TYPE,
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+@analytics_router.get(
+    "/{dataset_id}/export",
+    responses={
+        200: {"content": {CSV_EXPORT_MEDIA_TYPE: {}, NDJSON_MEDIA_TYPE: {}}},
+        HTTP_400_BAD_REQUEST: {"description": "after is not a data point of the dataset"},
+        HTTP_404_NOT_FOUND: {"description": "Dataset not found"},
+        HTTP_401_UNAUTHORIZED: {"description": "Unauthenticated"},
+        HTTP_403_FORBIDDEN: {"description": "Token invalid"}
+    },
+    summary="Export data points",
+    description="Stream every raw data point of the dataset in timestamp order, gzip compressed when accepted. "
+                "An interrupted export is resumed by passing the dataset_id of the last row received as after"
+)
+async def export_analytics_dataset(
+    dataset_id: UUID = Path(description="dataset configuration id to export"),
+    format: Literal["csv", "ndjson"] = Query("csv", description="CSV with a header row, or one JSON document per line"),
+    start: Optional[datetime] = Query(None, description="Only data points at or after this time"),
+    end: Optional[datetime] = Query(None, description="Only data points before this time"),
+    after: Optional[UUID] = Query(None, description="dataset_id of the last data point already received"),
+    accept_encoding: Optional[str] = Header(None, include_in_schema=False),
+    export_service: DataExportHandler = Depends(get_service(DataExportHandler)),
+    _ = Depends(auth_provider),
+    logger: Logger = Depends(get_service(Logger))
+):
+    id_str = str(dataset_id)
+    after = None if after is None else str(after)
+    with logging_scope(
+        operation=export_analytics_dataset.__name__,
+        id=id_str,
+        format=format,
+        start=start,
+        end=end,
+        after=after,
+    ):
+        logger.info("Endpoint called")
+
+        try:
+            chunks = await export_service(_id=id_str, format=format, start=start, end=end, after=after)
+        except ValueError:
+            return JSONResponse(status_code=HTTP_400_BAD_REQUEST, content={"detail": "after is not a data point of the dataset"})
+        if chunks is None:
+            return JSONResponse(status_code=404, content={"detail": "Dataset not found"})
+
+        headers = {
+            "Content-Disposition": f'attachment; filename="{id_str}.{format}"',
+            "Accept-Ranges": "none",
+            "Vary": "Accept-Encoding"
+        }
+        if accepts(accept_encoding, "gzip"):
+            chunks = gzip_stream(chunks)
+            headers["Content-Encoding"] = "gzip"
+
+        media_type = CSV_EXPORT_MEDIA_TYPE if format == "csv" else NDJSON_MEDIA_TYPE
+        return StreamingResponse(chunks, media_type=media_type, headers=headers)
+
 @analytics_router.post(
     "/",
     response_model=ResourceCreatedSchema,
@@ -119,11 +380,15 @@ async def create_analytics_configuration(
     "/{dataset_id}/data-points",
     status_code=HTTP_201_CREATED,
     responses={
+        HTTP_202_ACCEPTED: {"description": "Data point queued to be written"},
+        HTTP_404_NOT_FOUND: {"description": "Dataset not found"},
+        HTTP_503_SERVICE_UNAVAILABLE: {"description": "Data point queue is full"},
         HTTP_401_UNAUTHORIZED: {"description": "Unauthenticated"},
         HTTP_403_FORBIDDEN: {"description": "Token invalid"}
     },
     summary="Create data point",
-    description="Create data point for a given dataset type"
+    description="Create data point for a given dataset type. With write-behind enabled the data point is queued and "
+                "written in a later batch, answered with 202, or 503 while the queue is full"
 )
 async def create_analytics_data_point(
     dataset_id: UUID = Path(description="id of the dataset configuration the data will sit under"),
@@ -143,12 +408,116 @@ async def create_analytics_data_point(
     ):
         logger.info("Endpoint called")
 
-        _id = await create_data_point_service(
+        status = await create_data_point_service(
             str_dataset_id,
             map_datapoint_contract_to_domain(create_data_point),
         )
 
+        if status is None:
+            return JSONResponse(status_code=404, content={"detail": "Dataset not found"})
+
+        if status is DataPointWriteStatus.REJECTED:
+            return JSONResponse(
+                status_code=HTTP_503_SERVICE_UNAVAILABLE,
+                content={"detail": "Data point queue is full"},
+                headers={"Retry-After": "1"}
+            )
+
+        if status is DataPointWriteStatus.QUEUED:
+            return Response(status_code=HTTP_202_ACCEPTED)
+
+        return Response(status_code=201)
+
+
+@analytics_router.post(
+    "/{dataset_id}/data-points:batch",
+    status_code=HTTP_201_CREATED,
+    responses={
+        HTTP_400_BAD_REQUEST: {"description": "Body could not be decoded"},
+        HTTP_404_NOT_FOUND: {"description": "Dataset not found"},
+        HTTP_415_UNSUPPORTED_MEDIA_TYPE: {"description": "Content type not supported"},
+        HTTP_401_UNAUTHORIZED: {"description": "Unauthenticated"},
+        HTTP_403_FORBIDDEN: {"description": "Token invalid"}
+    },
+    openapi_extra={"requestBody": {"required": True, "content": {
+        "application/json": {"schema": {
+            "type": "array", "minItems": 1, "maxItems": 10000, "items": DataEntryCreateSchema.model_json_schema()
+        }},
+        CSV_MEDIA_TYPE: {"schema": {"type": "string"}},
+        MSGPACK_MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}},
+    }}},
+    summary="Create data points",
+    description=f"Create many data points for a given dataset type in one transaction. A {CSV_MEDIA_TYPE} body with a header "
+                f"row or a {MSGPACK_MEDIA_TYPE} stream of rows is decoded and written as it is received, without a row limit"
+)
+async def create_analytics_data_points(
+    request: Request,
+    dataset_id: UUID = Path(description="id of the dataset configuration the data will sit under"),
+    content_type: Optional[str] = Header(None, include_in_schema=False),
+    create_data_points_service: DataPointBatchCreationService = Depends(get_service(DataPointBatchCreationService)),
+    _ = Depends(auth_provider),
+    logger: Logger = Depends(get_service(Logger))
+):
+    str_dataset_id = str(dataset_id)
+    media_type = (content_type or JSON_MEDIA_TYPE).split(";")[0].strip().lower()
+    with logging_scope(
+        operation="create_data_points",
+        dataset_id=str_dataset_id,
+        content_type=media_type
+    ):
+        logger.info("Endpoint called")
+
+        if media_type == CSV_MEDIA_TYPE:
+            data_points = decode_data_points(decode_csv(request.stream()))
+        elif media_type == MSGPACK_MEDIA_TYPE:
+            data_points = decode_data_points(decode_msgpack(request.stream()))
+        elif media_type == JSON_MEDIA_TYPE:
+            try:
+                entries = DATA_ENTRIES.validate_json(await request.body())
+            except ValidationError as e:
+                raise RequestValidationError([{**x, "loc": ("body", *x["loc"])} for x in e.errors(include_url=False)])
+            data_points = [map_datapoint_contract_to_domain(x) for x in entries]
+        else:
+            return JSONResponse(status_code=HTTP_415_UNSUPPORTED_MEDIA_TYPE, content={"detail": "Content type not supported"})
+
+        try:
+            _id = await create_data_points_service(str_dataset_id, data_points)
+        except DataDecodeError as e:
+            return JSONResponse(status_code=HTTP_400_BAD_REQUEST, content={"detail": str(e)})
+
         if _id is None:
             return JSONResponse(status_code=404, content={"detail": "Dataset not found"})
 
-        return Response(status_code=201)
\ No newline at end of file
+        return Response(status_code=201)
+
+
+layout_router = APIRouter(
+    prefix="/layouts",
+    tags=["Layouts"]
+)
+
+@layout_router.get(
+    "/{breakpoint}",
+    response_model=list[ElementLayoutSchema],
+    responses={
+        HTTP_401_UNAUTHORIZED: {"description": "Unauthenticated"},
+        HTTP_403_FORBIDDEN: {"description": "Token invalid"}
+    },
+    summary="Get dashboard layout",
+    description="Get the layout of every dataset for a breakpoint"
+)
+async def get_dashboard_layout(
+    breakpoint: str = Path(description="breakpoint to get layouts for, e.g. lg or md"),
+    get_layout_service: LayoutRetrievalHandler = Depends(get_service(LayoutRetrievalHandler)),
+    _ = Depends(auth_provider),
+    logger: Logger = Depends(get_service(Logger))
+):
+    with logging_scope(
+        operation=get_dashboard_layout.__name__,
+        breakpoint=breakpoint
+    ):
+        logger.info("Endpoint called")
+
+        views = await get_layout_service(breakpoint)
+
+        return FastJSONResponse([map_view_to_element_contract(x) for x in views])
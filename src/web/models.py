@@ -10,16 +10,50 @@ class SystemStatusSchema(BaseModel):
     database: bool
 
 
+class IngestionStatusSchema(BaseModel):
+    write_behind: bool
+    queue_depth: int
+    queue_capacity: int
+    flushed: int
+    failed: int
+
+
 class LayoutConfigSchema(BaseModel):
     breakpoint: str
     coordinates: list[int]  # [x, y, w, h]
     static: Optional[bool]
 
+class ElementLayoutSchema(LayoutConfigSchema):
+    id: str  # dataset configuration id
+
 class AnalyticsResponseSchema(BaseModel):
     id: str
     is_mutable: bool
     records: list[dict[str, Any]]
     layouts: list[LayoutConfigSchema]
+    next_cursor: Optional[str] = None  # pass as cursor to read the next page
+    truncated: bool = False  # more records remain than were returned
+    watermark: Optional[str] = None  # pass as since to only read records added after this response
+    incremental: bool = False  # records only cover data added after since, otherwise they are the full result
+
+class AnalyticsColumnarResponseSchema(BaseModel):
+    id: str
+    is_mutable: bool
+    columns: list[str]
+    data: dict[str, list[Any]]  # column name to values, in row order
+    layouts: list[LayoutConfigSchema]
+    next_cursor: Optional[str] = None
+    truncated: bool = False
+    watermark: Optional[str] = None
+    incremental: bool = False
+
+class DatasetErrorSchema(BaseModel):
+    id: str
+    detail: str
+
+class AnalyticsBatchResponseSchema(BaseModel):
+    datasets: list[AnalyticsResponseSchema]
+    errors: list[DatasetErrorSchema]
 
 class ConfigurationCreateSchema(BaseModel):
     is_mutable: bool
@@ -0,0 +1,194 @@
+import gzip
+import hashlib
+import zlib
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from typing import Any, AsyncIterator, Optional, Hashable, Callable
+
+import orjson
+import pyarrow
+import pyarrow.ipc
+from pydantic import BaseModel
+from starlette.responses import JSONResponse, Response
+
+from src.core import RecordPage, DatasetVersion
+from src.crosscutting import Logger
+from src.infrastructure import Settings
+from src.infrastructure.caching import get_cache, MISSING, RESPONSES_CACHE
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+EVENT_STREAM_MEDIA_TYPE = "text/event-stream"
+CSV_EXPORT_MEDIA_TYPE = "text/csv"
+
+NDJSON_CHUNK_ROWS = 500
+GZIP_MIN_BYTES = 1024
+
+
+def accepts(accept: Optional[str], media_type: str) -> bool:
+    if not accept:
+        return False
+    return any(x.split(";")[0].strip() == media_type for x in accept.split(","))
+
+
+def encode_value(value: Any) -> Any:
+    """
+    orjson handles dates, uuids and containers natively, models are passed through field by field without validation
+    """
+    if isinstance(value, BaseModel):
+        return dict(value)
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=encode_value)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    serialises trusted content (e.g. schemas built with model_construct) as is,
+    returning it from an endpoint also skips FastAPI's revalidation against the response_model
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+async def encode_ndjson(records: AsyncIterator[dict], limit: int) -> AsyncIterator[bytes]:
+    """
+    one json document per line, lines are grouped into chunks to keep the number of socket writes down;
+    records past the limit are replaced by a last {"truncated": true} line
+    """
+    lines = []
+    count = 0
+    async for record in records:
+        count += 1
+        if count > limit:
+            lines.append(dumps({"truncated": True}))
+            break
+        lines.append(dumps(record))
+        if len(lines) >= NDJSON_CHUNK_ROWS:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
+
+async def encode_events(events: AsyncIterator[Optional[Any]], event: str, mapper: Callable[[Any], Any]) -> AsyncIterator[bytes]:
+    """
+    server-sent events, one per item mapped to its contract, None items become comments keeping idle connections open
+    """
+    prefix = f"event: {event}\ndata: ".encode()
+    async for item in events:
+        if item is None:
+            yield b": keep-alive\n\n"
+        else:
+            yield prefix + dumps(mapper(item)) + b"\n\n"
+
+
+async def gzip_stream(chunks: AsyncIterator[bytes], min_bytes: int = 64 * 1024) -> AsyncIterator[bytes]:
+    """
+    compresses a stream on the fly, output is flushed every min_bytes of input rather than per chunk
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    pending = 0
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        pending += len(chunk)
+        if pending >= min_bytes:
+            compressed += compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def encode_arrow_stream(page: RecordPage) -> bytes:
+    """
+    the page as a single record batch in the arrow IPC streaming format, column types are inferred from the values
+    """
+    batch = pyarrow.RecordBatch.from_pydict(page.to_columns())
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    media_type: str
+    headers: dict[str, str]
+    encoding: Optional[str] = None  # content encoding of the stored body
+
+    @classmethod
+    def from_response(cls, response: Response) -> "CachedResponse":
+        headers = {k: v for k, v in response.headers.items() if k not in ("content-length", "content-type")}
+        if len(response.body) < GZIP_MIN_BYTES:
+            return cls(body=response.body, media_type=response.media_type, headers=headers)
+        return cls(body=gzip.compress(response.body, compresslevel=6), media_type=response.media_type, headers=headers, encoding="gzip")
+
+    def to_response(self, accept_encoding: Optional[str]) -> Response:
+        headers = {**self.headers, "Vary": "Accept-Encoding"}
+        if self.encoding is None:
+            return Response(content=self.body, media_type=self.media_type, headers=headers)
+        if accepts(accept_encoding, self.encoding):
+            return Response(content=self.body, media_type=self.media_type, headers={**headers, "Content-Encoding": self.encoding})
+        return Response(content=gzip.decompress(self.body), media_type=self.media_type, headers=headers)
+
+
+def response_key(version: DatasetVersion, *request: Hashable) -> Hashable:
+    """
+    statement id first so responses are invalidated along with the statement's records,
+    today's date as date relative statements give a different response each day
+    """
+    return version.statement_id, version.version, version.epoch, version.dataset_id, date.today(), *request
+
+
+def entity_tag(key: Hashable) -> str:
+    """
+    weak as the same representation may be sent with or without a content encoding
+    """
+    return f'W/"{hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    opaque = etag.removeprefix("W/")
+    return any(x.strip() == "*" or x.strip().removeprefix("W/") == opaque for x in if_none_match.split(","))
+
+
+class ResponseCache:
+    """
+    fully encoded response bodies, stored compressed so a hit is written to the socket as is
+    """
+    __slots__ = "settings", "logger", "cache"
+
+    def __init__(self, settings: Settings, logger: Logger):
+        self.logger = logger
+        self.settings = settings
+        self.cache = get_cache(RESPONSES_CACHE)
+
+    def get(self, key: Hashable, accept_encoding: Optional[str]) -> Optional[Response]:
+        if not self.settings.RESPONSE_CACHE_ENABLED:
+            return None
+        cached = self.cache.get(key)
+        if cached is MISSING:
+            self.logger.info("Cache miss", cache=RESPONSES_CACHE)
+            return None
+        self.logger.info("Cache hit", cache=RESPONSES_CACHE)
+        return cached.to_response(accept_encoding)
+
+    def store(self, key: Hashable, response: Response, accept_encoding: Optional[str]) -> Response:
+        """
+        :return: the response to send, encoded the same way as later hits
+        """
+        if not self.settings.RESPONSE_CACHE_ENABLED or response.status_code != 200:
+            return response
+        cached = CachedResponse.from_response(response)
+        self.cache.set(key, cached)
+        return cached.to_response(accept_encoding)
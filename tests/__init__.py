@@ -2,7 +2,7 @@ import asyncio
 import logging
 import threading
 from dataclasses import dataclass
-from typing import Protocol
+from typing import Callable, Protocol
 from unittest import TestCase
 from unittest.mock import patch
 
@@ -11,12 +11,14 @@ from alembic.config import Config
 from fastapi import FastAPI
 from fastapi.security import HTTPAuthorizationCredentials
 from punq import Container, Scope
+from sqlalchemy import text
 from starlette.testclient import TestClient
 from structlog.contextvars import get_contextvars
 from testcontainers.postgres import PostgresContainer
 
 from src.application.services import DataBootstrapper
 from src.bootstrap import bootstrap
+from src.core import UnitOfWork
 from src.crosscutting import Logger
 from src.infrastructure import Settings
 from src.web import Authenticator
@@ -79,7 +81,8 @@ def do_global_setup():
             USER_POOL_CLIENT_ID="test",
             USER_POOL_ID="test",
             AWS_REGION="eu-test",
-            SEED_DATA_JSON="./seed_data.json"
+            SEED_DATA_JSON="./seed_data.json",
+            DATABASE_POOL_ENABLED=False
         )
 
         def override_deps(populated_container: Container):
@@ -106,6 +109,35 @@ class FastApiTestCase(TestCase):
         do_global_setup()
         cls.test_logger = FastApiTestCase.shared_logger
         cls.client = FastApiTestCase.shared_client
+        cls.services = FastApiTestCase.shared_client.app.state.services
+
+    async def persist(self, writer_type: type, records, save: bool = True) -> None:
+        """
+        passes records to the repository registered for writer_type, in a unit of work of their own
+        """
+        async with self.services[UnitOfWork] as uow:
+            writer = uow.persistence_factory(writer_type)
+            await writer(records)
+            if save:
+                await uow.save()
+
+    def write(self, writer_type: type, records, save: bool = True) -> None:
+        asyncio.run(self.persist(writer_type, records, save))
+
+    async def fetch(self, statement: str, **params) -> list[tuple]:
+        async with self.services[UnitOfWork] as uow:
+            result = await uow.session.execute(text(statement), params)
+            return [tuple(x) for x in result.all()]
+
+    def query(self, statement: str, **params) -> list[tuple]:
+        return asyncio.run(self.fetch(statement, **params))
+
+    def execute(self, statement: str, **params) -> None:
+        async def execute():
+            async with self.services[UnitOfWork] as uow:
+                await uow.session.execute(text(statement), params)
+                await uow.save()
+        asyncio.run(execute())
 
     def assert_there_is_log_with(self, test_logger, log_level, message: str, **kwargs):
         logs_with_log_level = [log for log in test_logger.logs if log[0] == log_level]
@@ -187,4 +219,31 @@ class FakeAuthenticator:
     async def __call__(self, credentials: HTTPAuthorizationCredentials) -> dict:
         return {
             "sub": "test"
-        }
\ No newline at end of file
+        }
+
+class FakeLogger:
+
+    def info(self, msg, *args, **kwargs): ...
+    def warning(self, msg, *args, **kwargs): ...
+    def error(self, msg, *args, **kwargs): ...
+
+
+class FakeUnitOfWork:
+    """
+    unit of work handing out the given repositories by their protocol, without a database behind it
+    """
+
+    def __init__(self, repositories: dict[type, Callable]):
+        self.repositories = repositories
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    def persistence_factory(self, cls):
+        return self.repositories[cls]
+
+    async def save(self):
+        pass
@@ -1,10 +1,13 @@
 import datetime
+import json
 import logging
 import uuid
 
 from autofixture import AutoFixture
 
-from src.web.models import AnalyticsResponseSchema, LayoutConfigSchema, ConfigurationCreateSchema, DataEntryCreateSchema
+from src.application.mappers import map_key_to_cursor
+from src.web.models import AnalyticsResponseSchema, LayoutConfigSchema, ConfigurationCreateSchema, DataEntryCreateSchema, \
+    AnalyticsBatchResponseSchema, DatasetErrorSchema, ElementLayoutSchema
 from tests import step, ScenarioContext
 
 DEFAULT_REQUEST_HEADERS = {"Authorization": "Bearer test"}
@@ -42,6 +45,22 @@ class HealthCheckScenario:
             operation="get_system_health")
         return self
 
+    @step
+    def when_the_get_ingestion_status_endpoint_is_called(self):
+        self.response = self.ctx.client.get("/health/ingestion")
+        return self
+
+    @step
+    def then_write_behind_should_be_off_with_an_empty_queue(self):
+        self.ctx.test_case.assertEqual(self.response.json(), {
+            "write_behind": False,
+            "queue_depth": 0,
+            "queue_capacity": 10000,
+            "flushed": 0,
+            "failed": 0
+        })
+        return self
+
 
 class GetDatasetScenario:
 
@@ -75,11 +94,98 @@ class GetDatasetScenario:
         self.response = self.ctx.client.get(f"/data/{self.dataset_id}", params=kwargs, headers=DEFAULT_REQUEST_HEADERS)
         return self
 
+    @step
+    def when_the_get_metrics_endpoint_is_called_accepting_ndjson(self, dataset_id: str, **params):
+        self.dataset_id = dataset_id
+        self.response = self.ctx.client.get(
+            f"/data/{self.dataset_id}",
+            params=params,
+            headers={**DEFAULT_REQUEST_HEADERS, "Accept": "application/x-ndjson"}
+        )
+        return self
+
+    @step
+    def when_the_export_dataset_endpoint_is_called(self, dataset_id: str):
+        self.dataset_id = dataset_id
+        self.response = self.ctx.client.get(f"/data/{self.dataset_id}/export", headers=DEFAULT_REQUEST_HEADERS)
+        return self
+
+    @step
+    def when_the_stream_dataset_endpoint_is_called(self, dataset_id: str):
+        self.dataset_id = dataset_id
+        self.response = self.ctx.client.get(f"/data/{self.dataset_id}/stream", headers=DEFAULT_REQUEST_HEADERS)
+        return self
+
     @step
     def then_the_status_code_should_be(self, status_code: int):
         self.ctx.test_case.assertEqual(self.response.status_code,  status_code)
         return self
 
+    @step
+    def then_the_response_should_stream_one_record_per_line(self):
+        self.ctx.test_case.assertEqual(self.response.headers["content-type"], "application/x-ndjson")
+        records = [json.loads(line) for line in self.response.text.splitlines()]
+        self.ctx.test_case.assertEqual(records, [
+            {"time_point": "2025-06-02", "data_value": 50.0},
+            {"time_point": "2025-06-10", "data_value": 70.5},
+            {"time_point": "2025-06-25", "data_value": 65.0}
+        ])
+        return self
+
+    @step
+    def then_the_stream_should_end_with_a_truncation_line_after(self, count: int):
+        lines = [json.loads(line) for line in self.response.text.splitlines()]
+        self.ctx.test_case.assertEqual(len(lines), count + 1)
+        self.ctx.test_case.assertEqual(lines[-1], {"truncated": True})
+        return self
+
+    @step
+    def then_the_page_should_contain(self, *time_points: str, truncated: bool):
+        body = self.response.json()
+        self.ctx.test_case.assertEqual([x["time_point"] for x in body["records"]], list(time_points))
+        self.ctx.test_case.assertEqual(body["truncated"], truncated)
+        self.ctx.test_case.assertEqual(body["next_cursor"] is not None, truncated)
+        return self
+
+    @step
+    def then_the_response_should_contain_column_arrays(self):
+        self.ctx.test_case.assertEqual(self.response.json()["columns"], ["time_point", "data_value"])
+        self.ctx.test_case.assertEqual(self.response.json()["data"], {
+            "time_point": ["2025-06-02", "2025-06-10", "2025-06-25"],
+            "data_value": [50.0, 70.5, 65.0]
+        })
+        return self
+
+    @step
+    def when_the_get_metrics_endpoint_is_called_accepting_arrow(self, dataset_id: str, **kwargs):
+        self.dataset_id = dataset_id
+        self.response = self.ctx.client.get(
+            f"/data/{self.dataset_id}",
+            params=kwargs,
+            headers={**DEFAULT_REQUEST_HEADERS, "Accept": "application/vnd.apache.arrow.stream"}
+        )
+        return self
+
+    @step
+    def then_the_response_should_be_an_arrow_stream(self, truncated: bool):
+        import pyarrow.ipc
+        table = pyarrow.ipc.open_stream(self.response.content).read_all()
+        self.ctx.test_case.assertEqual(self.response.headers["content-type"], "application/vnd.apache.arrow.stream")
+        self.ctx.test_case.assertEqual(table.column_names, ["time_point", "data_value"])
+        self.ctx.test_case.assertEqual(table.column("data_value").to_pylist()[:2], [50.0, 70.5])
+        self.ctx.test_case.assertEqual(self.response.headers["x-truncated"], str(truncated).lower())
+        return self
+
+    @step
+    def when_the_next_page_is_requested(self, **kwargs):
+        cursor = self.response.json()["next_cursor"]
+        self.response = self.ctx.client.get(
+            f"/data/{self.dataset_id}",
+            params={**kwargs, "cursor": cursor},
+            headers=DEFAULT_REQUEST_HEADERS
+        )
+        return self
+
     @step
     def then_the_response_body_should_match_expected_metric(self):
         expected_response = AnalyticsResponseSchema(
@@ -136,6 +242,8 @@ class GetDatasetScenario:
                 )
             ])
         actual_response = AnalyticsResponseSchema.model_validate(self.response.json())
+        # the statement groups without an ORDER BY, so the row order depends on the plan over the partitions
+        actual_response.records.sort(key=lambda x: x["event_category"])
 
         self.ctx.test_case.assertEqual(expected_response, actual_response)
         return self
@@ -179,7 +287,181 @@ class GetDatasetScenario:
             id=self.dataset_id,
             start_date=self.start_date,
             end_date=self.end_date,
-            day_range=self.day_range)
+            day_range=self.day_range,
+            limit=None,
+            cursor=None,
+            since=None,
+            format="records")
+        return self
+
+
+class GetDatasetBatchScenario:
+
+    def __init__(self, ctx: ScenarioContext) -> None:
+        self.ctx = ctx
+        self.runner = ctx.runner
+        self.missing_id = str(uuid.uuid4())
+
+    @step
+    def given_i_have_an_app_running(self):
+        return self
+
+    @step
+    def when_the_get_datasets_endpoint_is_called_with_ids(self, *ids: str, **params):
+        self.ids = list(ids)
+        self.response = self.ctx.client.get(
+            "/data/",
+            params={"ids": self.ids, **params},
+            headers=DEFAULT_REQUEST_HEADERS
+        )
+        return self
+
+    @step
+    def then_the_status_code_should_be(self, status_code: int):
+        self.ctx.test_case.assertEqual(self.response.status_code, status_code)
+        return self
+
+    @step
+    def then_the_response_body_should_contain_large_breakpoint_datasets_and_missing_error(self):
+        expected_response = AnalyticsBatchResponseSchema(
+            datasets=[
+                AnalyticsResponseSchema(
+                    id="53aaf9d4-04d3-43d3-9f40-6ce4a9282a5c",
+                    is_mutable=True,
+                    records=[
+                        {"time_point": "2025-06-02", "data_value": 50.0},
+                        {"time_point": "2025-06-10", "data_value": 70.5},
+                        {"time_point": "2025-06-25", "data_value": 65.0}
+                    ],
+                    layouts=[
+                        LayoutConfigSchema(
+                            breakpoint="lg",
+                            coordinates=[0, 10, 5, 10],  # [x, y, w, h]
+                            static=False
+                        )
+                    ]
+                ),
+                AnalyticsResponseSchema(
+                    id="1379a764-2543-45fd-a78b-8c5a65827417",
+                    is_mutable=True,
+                    records=[
+                        {"report_date": "2025-06-02", "pending_items": 1},
+                        {"report_date": "2025-06-10", "pending_items": 2},
+                        {"report_date": "2025-06-25", "pending_items": 1}
+                    ],
+                    layouts=[
+                        LayoutConfigSchema(
+                            breakpoint="lg",
+                            coordinates=[5, 0, 6, 12],  # [x, y, w, h]
+                            static=False
+                        )
+                    ]
+                )
+            ],
+            errors=[
+                DatasetErrorSchema(id=self.missing_id, detail="Dataset not found")
+            ]
+        )
+        actual_response = AnalyticsBatchResponseSchema.model_validate(self.response.json())
+        # the watermark is the snapshot the records were read in, only incremental statements have one
+        self.ctx.test_case.assertIsNotNone(actual_response.datasets[0].watermark)
+        actual_response.datasets[0].watermark = None
+
+        self.ctx.test_case.assertEqual(expected_response, actual_response)
+        return self
+
+    @step
+    def then_an_info_log_indicates_endpoint_called(self):
+        self.ctx.test_case.assert_there_is_log_with(self.ctx.logger,
+            log_level=logging.INFO,
+            message="Endpoint called",
+            operation="get_analytics_datasets",
+            ids=self.ids,
+            breakpoint="lg",
+            start_date=datetime.date(2025, 6, 1),
+            end_date=datetime.date(2025, 6, 30),
+            day_range=30)
+        return self
+
+
+class GetDashboardLayoutScenario:
+
+    def __init__(self, ctx: ScenarioContext) -> None:
+        self.ctx = ctx
+        self.runner = ctx.runner
+        self.dataset_config = ConfigurationCreateSchema(
+            is_mutable=True,
+            layouts=[
+                LayoutConfigSchema(
+                    static=True,
+                    coordinates=[3, 3, 2, 2],  # [x, y, w, h]
+                    breakpoint="md"
+                )
+            ],
+            statement_generation_prompt="layout me"
+        )
+
+    @step
+    def given_i_have_an_app_running(self):
+        return self
+
+    @step
+    def when_the_get_layout_endpoint_is_called(self, breakpoint: str):
+        self.breakpoint = breakpoint
+        self.response = self.ctx.client.get(f"/layouts/{breakpoint}", headers=DEFAULT_REQUEST_HEADERS)
+        return self
+
+    @step
+    def and_a_dataset_config_is_created(self):
+        create_response = self.ctx.client.post(
+            "/data",
+            json=self.dataset_config.model_dump(),
+            headers=DEFAULT_REQUEST_HEADERS
+        )
+        self.ctx.test_case.assertEqual(create_response.status_code, 201)
+        self.dataset_config_id = create_response.json()["id"]
+        return self
+
+    @step
+    def then_the_status_code_should_be(self, status_code: int):
+        self.ctx.test_case.assertEqual(self.response.status_code, status_code)
+        return self
+
+    @step
+    def then_the_seeded_medium_layouts_should_be_returned(self):
+        expected_layouts = [
+            ElementLayoutSchema(id="def1fdce-dac9-4c5a-a4a1-d7cbd01f6ed6", breakpoint="md", coordinates=[0, 10, 1, 4], static=None),
+            ElementLayoutSchema(id="c797b618-df12-45f7-bbb2-cc6695a48e46", breakpoint="md", coordinates=[0, 24, 1, 10], static=None),
+            ElementLayoutSchema(id="073ac9db-c16e-4d04-9f25-6fc01d4ac380", breakpoint="md", coordinates=[0, 14, 1, 10], static=None),
+            ElementLayoutSchema(id="53aaf9d4-04d3-43d3-9f40-6ce4a9282a5c", breakpoint="md", coordinates=[0, 34, 1, 10], static=None),
+            ElementLayoutSchema(id="1379a764-2543-45fd-a78b-8c5a65827417", breakpoint="md", coordinates=[0, 9999999, 5, 10], static=None),
+        ]
+        actual_layouts = [ElementLayoutSchema.model_validate(x) for x in self.response.json()]
+
+        for expected_layout in expected_layouts:
+            self.ctx.test_case.assertIn(expected_layout, actual_layouts)
+        return self
+
+    @step
+    def then_the_created_layout_should_be_returned(self):
+        expected_layout = ElementLayoutSchema(id=self.dataset_config_id, breakpoint="md", coordinates=[3, 3, 2, 2], static=True)
+        actual_layouts = [ElementLayoutSchema.model_validate(x) for x in self.response.json()]
+
+        self.ctx.test_case.assertIn(expected_layout, actual_layouts)
+        return self
+
+    @step
+    def then_no_layouts_should_be_returned(self):
+        self.ctx.test_case.assertEqual(self.response.json(), [])
+        return self
+
+    @step
+    def then_an_info_log_indicates_endpoint_called(self):
+        self.ctx.test_case.assert_there_is_log_with(self.ctx.logger,
+            log_level=logging.INFO,
+            message="Endpoint called",
+            operation="get_dashboard_layout",
+            breakpoint=self.breakpoint)
         return self
 
 
@@ -227,6 +509,177 @@ class CreateDatasetConfigScenario:
         self.dataset_config_id = self.create_response.json()["id"]
         return self
 
+    @step
+    def and_the_dataset_is_read_before_it_has_data(self):
+        read_response = self.ctx.client.get(f"/data/{self.dataset_config_id}", headers=DEFAULT_REQUEST_HEADERS)
+        self.ctx.test_case.assertEqual(read_response.json()["records"], [])
+        return self
+
+    @step
+    def and_the_dataset_is_read_with_its_etag(self):
+        read_response = self.ctx.client.get(f"/data/{self.dataset_config_id}", headers=DEFAULT_REQUEST_HEADERS)
+        self.etag = read_response.headers["etag"]
+        self.conditional_response = self.ctx.client.get(
+            f"/data/{self.dataset_config_id}",
+            headers={**DEFAULT_REQUEST_HEADERS, "If-None-Match": self.etag}
+        )
+        return self
+
+    @step
+    def then_the_dataset_should_not_have_been_modified(self):
+        self.ctx.test_case.assertEqual(self.conditional_response.status_code, 304)
+        self.ctx.test_case.assertEqual(self.conditional_response.headers["etag"], self.etag)
+        self.ctx.test_case.assertEqual(self.conditional_response.content, b"")
+        return self
+
+    @step
+    def then_the_old_etag_should_no_longer_match(self):
+        read_response = self.ctx.client.get(
+            f"/data/{self.dataset_config_id}",
+            headers={**DEFAULT_REQUEST_HEADERS, "If-None-Match": self.etag}
+        )
+        self.ctx.test_case.assertEqual(read_response.status_code, 200)
+        self.ctx.test_case.assertNotEqual(read_response.headers["etag"], self.etag)
+        self.ctx.test_case.assertEqual(len(read_response.json()["records"]), 1)
+        return self
+
+    @step
+    def and_the_dataset_is_read_for_its_watermark(self):
+        read_response = self.ctx.client.get(f"/data/{self.dataset_config_id}", headers=DEFAULT_REQUEST_HEADERS)
+        self.watermark = read_response.json()["watermark"]
+        self.ctx.test_case.assertIsNotNone(self.watermark)
+        return self
+
+    @step
+    def then_only_records_added_since_the_watermark_should_be_returned(self, count: int):
+        read_response = self.ctx.client.get(
+            f"/data/{self.dataset_config_id}",
+            params={"since": self.watermark},
+            headers=DEFAULT_REQUEST_HEADERS
+        )
+        body = read_response.json()
+        self.ctx.test_case.assertEqual(read_response.status_code, 200)
+        self.ctx.test_case.assertTrue(body["incremental"])
+        self.ctx.test_case.assertEqual(len(body["records"]), count)
+        self.watermark = body["watermark"]
+        return self
+
+    @step
+    def then_a_statement_that_is_not_incremental_should_return_its_full_result(self):
+        read_response = self.ctx.client.get(
+            "/data/c797b618-df12-45f7-bbb2-cc6695a48e46",
+            params={"since": self.watermark},
+            headers=DEFAULT_REQUEST_HEADERS
+        )
+        body = read_response.json()
+        self.ctx.test_case.assertFalse(body["incremental"])
+        self.ctx.test_case.assertIsNone(body["watermark"])
+        self.ctx.test_case.assertEqual(len(body["records"]), 2)
+        return self
+
+    @step
+    def and_a_batch_of_data_is_created_for_the_dataset(self, count: int):
+        create_data_response = self.ctx.client.post(
+            f"/data/{self.dataset_config_id}/data-points:batch",
+            json=[self.data_point.model_dump()] * count,
+            headers=DEFAULT_REQUEST_HEADERS
+        )
+        self.ctx.test_case.assertEqual(create_data_response.status_code, 201)
+        return self
+
+    @step
+    def and_a_csv_batch_of_data_is_created_for_the_dataset(self, count: int):
+        rows = "".join(
+            f"{self.data_point.decay_value},{self.data_point.decay_rate},{self.data_point.items_flagged},"
+            f"{self.data_point.notification_type},{self.data_point.notification_category}\n"
+            for _ in range(count)
+        )
+        create_data_response = self.ctx.client.post(
+            f"/data/{self.dataset_config_id}/data-points:batch",
+            content="decay_value,decay_rate,items_flagged,notification_type,notification_category\n" + rows,
+            headers={**DEFAULT_REQUEST_HEADERS, "Content-Type": "text/csv"}
+        )
+        self.ctx.test_case.assertEqual(create_data_response.status_code, 201)
+        return self
+
+    @step
+    def then_an_invalid_csv_batch_should_be_rejected_without_writing(self, count: int):
+        create_data_response = self.ctx.client.post(
+            f"/data/{self.dataset_config_id}/data-points:batch",
+            content="items_flagged\n" + "1\n" * 1500 + "many\n",
+            headers={**DEFAULT_REQUEST_HEADERS, "Content-Type": "text/csv"}
+        )
+        self.ctx.test_case.assertEqual(create_data_response.status_code, 400)
+        self.ctx.test_case.assertEqual(create_data_response.json(), {"detail": "Invalid items_flagged in row 1501"})
+        return self.then_the_dataset_should_have_records(count)
+
+    @step
+    def then_an_unsupported_content_type_should_be_rejected(self):
+        create_data_response = self.ctx.client.post(
+            f"/data/{self.dataset_config_id}/data-points:batch",
+            content=b"<points/>",
+            headers={**DEFAULT_REQUEST_HEADERS, "Content-Type": "application/xml"}
+        )
+        self.ctx.test_case.assertEqual(create_data_response.status_code, 415)
+        return self
+
+    @step
+    def then_the_data_points_should_export_as_csv(self, count: int):
+        export_response = self.ctx.client.get(f"/data/{self.dataset_config_id}/export", headers=DEFAULT_REQUEST_HEADERS)
+        lines = export_response.text.splitlines()
+        self.ctx.test_case.assertEqual(export_response.status_code, 200)
+        self.ctx.test_case.assertEqual(export_response.headers["content-encoding"], "gzip")
+        self.ctx.test_case.assertEqual(
+            lines[0],
+            "dataset_id,timestamp,decay_value,decay_rate,items_flagged,notification_type,notification_category"
+        )
+        self.ctx.test_case.assertEqual(len(lines), count + 1)
+        self.exported_ids = [line.split(",")[0] for line in lines[1:]]
+        return self
+
+    @step
+    def then_the_data_points_should_export_as_ndjson(self, count: int):
+        export_response = self.ctx.client.get(
+            f"/data/{self.dataset_config_id}/export",
+            params={"format": "ndjson"},
+            headers={**DEFAULT_REQUEST_HEADERS, "Accept-Encoding": "identity"}
+        )
+        records = [json.loads(line) for line in export_response.text.splitlines()]
+        self.ctx.test_case.assertNotIn("content-encoding", export_response.headers)
+        self.ctx.test_case.assertEqual(len(records), count)
+        self.ctx.test_case.assertEqual(records[0]["notification_type"], self.data_point.notification_type)
+        self.ctx.test_case.assertEqual([x["dataset_id"] for x in records], self.exported_ids)
+        return self
+
+    @step
+    def then_an_interrupted_export_should_resume_after_the_last_row(self, received: int):
+        export_response = self.ctx.client.get(
+            f"/data/{self.dataset_config_id}/export",
+            params={"after": self.exported_ids[received - 1]},
+            headers=DEFAULT_REQUEST_HEADERS
+        )
+        resumed_ids = [line.split(",")[0] for line in export_response.text.splitlines()[1:]]
+        self.ctx.test_case.assertEqual(resumed_ids, self.exported_ids[received:])
+        return self
+
+    @step
+    def then_an_export_resuming_after_a_point_of_another_dataset_should_be_rejected(self, other_dataset_id: str):
+        other_export = self.ctx.client.get(f"/data/{other_dataset_id}/export", headers=DEFAULT_REQUEST_HEADERS)
+        for after in (other_export.text.splitlines()[1].split(",")[0], str(uuid.uuid4())):
+            export_response = self.ctx.client.get(
+                f"/data/{self.dataset_config_id}/export",
+                params={"after": after},
+                headers=DEFAULT_REQUEST_HEADERS
+            )
+            self.ctx.test_case.assertEqual(export_response.status_code, 400)
+        return self
+
+    @step
+    def then_the_dataset_should_have_records(self, count: int):
+        read_response = self.ctx.client.get(f"/data/{self.dataset_config_id}", headers=DEFAULT_REQUEST_HEADERS)
+        self.ctx.test_case.assertEqual(len(read_response.json()["records"]), count)
+        return self
+
     @step
     def and_data_is_created_for_the_dataset(self):
         create_data_response = self.ctx.client.post(
@@ -277,7 +730,8 @@ class CreateDatasetConfigScenario:
         dataset_config_id = self.create_response.json()["id"]
         read_response = self.ctx.client.get(f"/data/{dataset_config_id}", headers=DEFAULT_REQUEST_HEADERS)
         actual_data_aggregate = AnalyticsResponseSchema.model_validate(read_response.json())
-        self.ctx.test_case.assertEqual(expected_data_response, actual_data_aggregate)
+        self.ctx.test_case.assertIsNotNone(actual_data_aggregate.watermark)
+        self.ctx.test_case.assertEqual(expected_data_response, actual_data_aggregate.model_copy(update={"watermark": None}))
         return self
 
 
@@ -309,6 +763,16 @@ class CreateDataPointScenario:
         )
         return self
 
+    @step
+    def when_the_create_data_points_endpoint_is_called(self, config_id: str):
+        self.config_id = config_id
+        self.response = self.ctx.client.post(
+            f"/data/{config_id}/data-points:batch",
+            json=[self.data_point.model_dump()] * 2,
+            headers=DEFAULT_REQUEST_HEADERS
+        )
+        return self
+
     @step
     def then_an_info_log_indicates_endpoint_called(self):
         self.ctx.test_case.assert_there_is_log_with(self.ctx.logger,
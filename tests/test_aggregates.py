@@ -0,0 +1,50 @@
+import asyncio
+import uuid
+
+from sqlalchemy import inspect
+
+from src.core import DatasetConfigAggregate, DatasetAggregateWriter, SqlStatement, ViewConfig, UnitOfWork
+from src.infrastructure.data_access import load_dataset_aggregates
+from tests import FastApiTestCase
+
+
+class TestLoadDatasetAggregates(FastApiTestCase):
+
+    async def load(self, ids: list[str]) -> list[DatasetConfigAggregate]:
+        async with self.services[UnitOfWork] as uow:
+            aggregates = await load_dataset_aggregates(uow.session, ids)
+            self.assertEqual(len(uow.session.identity_map), 0)
+            return aggregates
+
+    def test_configurations_are_loaded_with_their_statement_and_layouts(self):
+        # arrange
+        dataset_id = str(uuid.uuid4())
+        statement_id = str(uuid.uuid4())
+        layouts = [
+            ViewConfig(id=str(uuid.uuid4()), breakpoint=breakpoint, coordinates=[0, 1, 4, 3], static=False)
+            for breakpoint in ("lg", "sm")
+        ]
+        self.write(DatasetAggregateWriter, DatasetConfigAggregate(
+            id=dataset_id,
+            is_mutable=True,
+            statement=SqlStatement(id=statement_id, statement="SELECT 1 AS value"),
+            layouts=layouts
+        ))
+        bare_id = str(uuid.uuid4())
+        self.write(DatasetAggregateWriter, DatasetConfigAggregate(id=bare_id, is_mutable=False, layouts=[]))
+
+        # act
+        aggregates = {x.id: x for x in asyncio.run(self.load([dataset_id, bare_id, str(uuid.uuid4())]))}
+
+        # assert
+        self.assertEqual(set(aggregates), {dataset_id, bare_id})
+        aggregate = aggregates[dataset_id]
+        self.assertEqual(aggregate.statement, SqlStatement(id=statement_id, statement="SELECT 1 AS value"))
+        self.assertTrue(aggregate.is_mutable)
+        self.assertEqual(
+            sorted((x.id, x.element_id, x.breakpoint, x.coordinates, x.static) for x in aggregate.layouts),
+            sorted((x.id, dataset_id, x.breakpoint, [0, 1, 4, 3], False) for x in layouts)
+        )
+        self.assertTrue(inspect(aggregate).transient)
+        self.assertIsNone(aggregates[bare_id].statement)
+        self.assertEqual(aggregates[bare_id].layouts, [])
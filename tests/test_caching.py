@@ -0,0 +1,328 @@
+import asyncio
+from datetime import date, timedelta
+from unittest import TestCase, IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+from src.application.services import DataRetrievalHandler
+from src.core import SqlStatement, DatasetConfigAggregate, DatasetAggregateReader, DataPointReader, RecordPage
+from src.infrastructure.caching import BoundedCache, async_cache, get_cache, id_key, MISSING, statement_key, \
+    RecordCacheInvalidator, RECORDS_CACHE, FINAL_RECORDS_CACHE, approximate_size, CacheSweeper, CACHE_REGISTRY
+from src.infrastructure.data_access import SqlAlchemyDataPointReader
+from tests import FakeLogger, FakeUnitOfWork
+
+
+class TestBoundedCache(TestCase):
+
+    def test_least_recently_used_entry_is_evicted_when_entry_limit_is_hit(self):
+        # arrange
+        cache = BoundedCache(name="test", max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+
+        # act
+        cache.set("c", 3)
+
+        # assert
+        self.assertIs(cache.get("b"), MISSING)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.statistics().evictions, 1)
+
+    def test_entries_are_evicted_when_byte_limit_is_hit(self):
+        # arrange
+        cache = BoundedCache(name="test", max_entries=100, max_bytes=1000)
+
+        # act
+        for i in range(10):
+            cache.set(i, "x" * 200)
+
+        # assert
+        statistics = cache.statistics()
+        self.assertLessEqual(statistics.size_bytes, 1000)
+        self.assertGreater(statistics.evictions, 0)
+        self.assertEqual(cache.get(9), "x" * 200)
+
+    def test_expired_entries_are_swept(self):
+        # arrange
+        cache = BoundedCache(name="test", ttl_seconds=10)
+        with patch("src.infrastructure.caching.time.monotonic", return_value=0):
+            cache.set("a", 1)
+
+        # act
+        with patch("src.infrastructure.caching.time.monotonic", return_value=11):
+            removed = cache.sweep()
+
+        # assert
+        self.assertEqual(removed, 1)
+        self.assertEqual(cache.statistics().entries, 0)
+        self.assertEqual(cache.statistics().size_bytes, 0)
+
+    def test_entries_without_ttl_are_never_swept(self):
+        # arrange
+        cache = BoundedCache(name="test", ttl_seconds=None)
+        cache.set("a", 1)
+
+        # act
+        removed = cache.sweep()
+
+        # assert
+        self.assertEqual(removed, 0)
+        self.assertEqual(cache.get("a"), 1)
+
+    def test_hits_and_misses_are_counted(self):
+        # arrange
+        cache = BoundedCache(name="test")
+        cache.set("a", 1)
+
+        # act
+        cache.get("a")
+        cache.get("b")
+
+        # assert
+        statistics = cache.statistics()
+        self.assertEqual(statistics.hits, 1)
+        self.assertEqual(statistics.misses, 1)
+
+
+class TestBoundedCacheLoading(IsolatedAsyncioTestCase):
+
+    async def test_concurrent_loads_of_one_key_share_a_single_call(self):
+        # arrange
+        cache = BoundedCache(name="test")
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "value"
+
+        # act
+        results = await asyncio.gather(*(cache.load("a", loader) for _ in range(5)))
+
+        # assert
+        self.assertEqual(results, ["value"] * 5)
+        self.assertEqual(len(calls), 1)
+
+    async def test_failed_load_is_raised_to_every_waiter_and_not_cached(self):
+        # arrange
+        cache = BoundedCache(name="test")
+
+        async def loader():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        # act
+        results = await asyncio.gather(*(cache.load("a", loader) for _ in range(3)), return_exceptions=True)
+
+        # assert
+        self.assertTrue(all(isinstance(x, ValueError) for x in results))
+        self.assertIs(cache.get("a"), MISSING)
+
+    async def test_result_is_not_cached_when_invalidated_during_load(self):
+        # arrange
+        cache = BoundedCache(name="test")
+
+        async def loader():
+            cache.invalidate(lambda key: True)
+            return "stale"
+
+        # act
+        result = await cache.load("a", loader)
+
+        # assert
+        self.assertEqual(result, "stale")
+        self.assertIs(cache.get("a"), MISSING)
+
+    async def test_cheap_results_are_not_admitted(self):
+        # arrange
+        cache = BoundedCache(name="test")
+
+        async def loader():
+            return "cheap"
+
+        # act
+        await cache.load("a", loader, min_cost_seconds=60)
+
+        # assert
+        self.assertIs(cache.get("a"), MISSING)
+
+
+class TestStatementKey(TestCase):
+
+    def test_key_only_includes_parameters_bound_by_the_statement(self):
+        # arrange
+        statement = SqlStatement(id="s1", statement="SELECT 1 FROM data_points WHERE timestamp BETWEEN :start_date AND :end_date")
+        arguments = dict(statement=statement, start_date=date(2025, 6, 1), end_date=date(2025, 6, 30), day_range=30)
+
+        # act
+        key = statement_key(arguments)
+        other_day_range_key = statement_key({**arguments, "day_range": 7})
+
+        # assert
+        self.assertEqual(key, ("s1", (date(2025, 6, 1), date(2025, 6, 30)), None))
+        self.assertEqual(key, other_day_range_key)
+
+    def test_key_includes_todays_date_for_date_relative_statements(self):
+        # arrange
+        statement = SqlStatement(id="s1", statement="SELECT 1 WHERE timestamp >= CURRENT_DATE - make_interval(days => :day_range)")
+        arguments = dict(statement=statement, start_date=None, end_date=None, day_range=30)
+
+        # act
+        key = statement_key(arguments)
+
+        # assert
+        self.assertEqual(key, ("s1", (30,), date.today()))
+
+
+class TestFinalResults(TestCase):
+
+    def setUp(self):
+        self.bounded_statement = SqlStatement(id="s1", statement="SELECT 1 WHERE DATE(timestamp) BETWEEN :start_date AND :end_date")
+        self.relative_statement = SqlStatement(id="s2", statement="SELECT 1 WHERE timestamp >= CURRENT_DATE - make_interval(days => :day_range)")
+
+    def test_immutable_dataset_results_are_final(self):
+        # arrange
+        dataset = DatasetConfigAggregate(id="d1", is_mutable=False, statement=self.relative_statement)
+
+        # act
+        final = dataset.has_final_results(date.today())
+
+        # assert
+        self.assertTrue(final)
+
+    def test_results_bounded_by_a_past_end_date_are_final(self):
+        # arrange
+        dataset = DatasetConfigAggregate(id="d1", is_mutable=True, statement=self.bounded_statement)
+
+        # act
+        final = dataset.has_final_results(date.today() - timedelta(days=1))
+        current = dataset.has_final_results(date.today())
+
+        # assert
+        self.assertTrue(final)
+        self.assertFalse(current)
+
+    def test_date_relative_results_of_mutable_datasets_are_not_final(self):
+        # arrange
+        dataset = DatasetConfigAggregate(id="d1", is_mutable=True, statement=self.relative_statement)
+
+        # act
+        final = dataset.has_final_results(date.today() - timedelta(days=30))
+
+        # assert
+        self.assertFalse(final)
+
+
+class TestDataRetrievalHandler(IsolatedAsyncioTestCase):
+
+    async def test_cached_aggregates_are_not_changed_by_a_read(self):
+        # arrange
+        aggregate = DatasetConfigAggregate(id="d1", is_mutable=True, statement=SqlStatement(id="s1", statement="SELECT 1"))
+        size = approximate_size(aggregate)
+
+        async def read_aggregate(_id):
+            return aggregate  # the same cached instance, as the cached configuration reader would
+
+        async def read_records(**kwargs):
+            return RecordPage(columns=["value"], rows=[(x,) for x in range(1000)])
+
+        handler = DataRetrievalHandler(
+            unit_of_work=FakeUnitOfWork({DatasetAggregateReader: read_aggregate, DataPointReader: read_records})
+        )
+
+        # act
+        result = await handler(_id="d1", start_date=date(2025, 6, 1), end_date=date(2025, 6, 30), day_range=30, limit=1000)
+
+        # assert
+        self.assertIs(result.dataset, aggregate)
+        self.assertEqual(len(result.records), 1000)
+        self.assertEqual(approximate_size(aggregate), size)
+
+
+class FakeReader:
+
+    def __init__(self):
+        self.logger = FakeLogger()
+        self.calls = 0
+
+    @async_cache(name="test_fake_reader", key_builder=id_key)
+    async def __call__(self, _id: str):
+        self.calls += 1
+        return _id.upper()
+
+
+class TestAsyncCacheDecorator(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        get_cache("test_fake_reader").clear()
+
+    async def test_positional_and_keyword_calls_share_a_key(self):
+        # arrange
+        reader = FakeReader()
+
+        # act
+        first = await reader("a")
+        second = await reader(_id="a")
+
+        # assert
+        self.assertEqual(first, "A")
+        self.assertEqual(second, "A")
+        self.assertEqual(reader.calls, 1)
+
+    async def test_decorated_function_exposes_its_cache(self):
+        # arrange
+        reader = FakeReader()
+
+        # act
+        await reader("a")
+
+        # assert
+        self.assertIs(FakeReader.__call__.cache, get_cache("test_fake_reader"))
+        self.assertEqual(FakeReader.__call__.cache.statistics().entries, 1)
+
+
+class TestRecordCacheInvalidator(IsolatedAsyncioTestCase):
+
+    async def test_only_entries_for_the_written_statement_are_removed(self):
+        # arrange
+        cache = get_cache(RECORDS_CACHE)
+        final_cache = get_cache(FINAL_RECORDS_CACHE)
+        self.assertIs(SqlAlchemyDataPointReader.read_recent.cache, cache)
+        self.assertIs(SqlAlchemyDataPointReader.read_final.cache, final_cache)
+        cache.clear()
+        final_cache.clear()
+        cache.set(("s1", (), None), [{"a": 1}])
+        cache.set(("s2", (), None), [{"a": 2}])
+        final_cache.set(("s1", (), None), [{"a": 1}])
+        invalidator = RecordCacheInvalidator(logger=FakeLogger())
+
+        # act
+        await invalidator("s1")
+
+        # assert
+        self.assertIs(cache.get(("s1", (), None)), MISSING)
+        self.assertIs(final_cache.get(("s1", (), None)), MISSING)
+        self.assertEqual(cache.get(("s2", (), None)), [{"a": 2}])
+
+
+class TestCacheSweeper(TestCase):
+
+    def test_only_sweeps_that_removed_entries_are_logged(self):
+        # arrange
+        logger = FakeLogger()
+        sweeper = CacheSweeper(settings=None, logger=logger)
+        cache = BoundedCache(name="test_sweeper", ttl_seconds=10)
+        with patch.dict(CACHE_REGISTRY, {cache.name: cache}, clear=True), patch.object(logger, "info") as info:
+            with patch("src.infrastructure.caching.time.monotonic", return_value=0):
+                cache.set("a", 1)
+
+            # act
+            with patch("src.infrastructure.caching.time.monotonic", return_value=5):
+                sweeper.sweep()
+            with patch("src.infrastructure.caching.time.monotonic", return_value=11):
+                sweeper.sweep()
+
+        # assert
+        info.assert_called_once()
+        self.assertEqual((info.call_args.args, info.call_args.kwargs["removed"]), (("Cache swept",), 1))
@@ -0,0 +1,48 @@
+import asyncio
+
+from sqlalchemy import text
+
+from src.infrastructure import Settings, SqlAlchemyConnectionPool, SqlAlchemyUnitOfWork
+from tests import FastApiTestCase
+
+
+class TestPooledConnections(FastApiTestCase):
+    """
+    the shared client runs without a pool, these run one of their own on a single event loop as the app's lifespan would
+    """
+
+    def setUp(self):
+        self.settings = self.services[Settings].copy(update=dict(
+            DATABASE_POOL_ENABLED=True,
+            DATABASE_POOL_SIZE=3,
+            DATABASE_MAX_OVERFLOW=0,
+            DATABASE_POOL_WARM_CONNECTIONS=3
+        ))
+
+    async def backend_pid(self, pool: SqlAlchemyConnectionPool) -> int:
+        async with SqlAlchemyUnitOfWork(pool, self.test_logger) as uow:
+            result = await uow.session.execute(text("SELECT pg_backend_pid()"))
+            return result.scalar_one()
+
+    async def run_pool(self) -> tuple[int, set[int], int, bool]:
+        pool = SqlAlchemyConnectionPool(self.settings, self.test_logger)
+        await pool.start()
+        try:
+            warmed = pool.engine.pool.checkedin()
+            pids = {await self.backend_pid(pool) for _ in range(10)}
+            idle = pool.engine.pool.checkedin()
+        finally:
+            await pool.dispose()
+        return warmed, pids, idle, pool.engine is None
+
+    def test_the_pool_is_warmed_reused_and_disposed(self):
+        # act
+        warmed, pids, idle, disposed = asyncio.run(self.run_pool())
+
+        # assert
+        self.assertEqual(warmed, 3)
+        self.assertLessEqual(len(pids), 3)
+        self.assertEqual(idle, 3)
+        self.assertTrue(disposed)
+        remaining = self.query("SELECT count(*) FROM pg_stat_activity WHERE pid = ANY(:pids)", pids=list(pids))
+        self.assertEqual(remaining, [(0,)])
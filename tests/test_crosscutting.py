@@ -0,0 +1,26 @@
+import time
+from unittest import TestCase
+
+from src.crosscutting import uuid7
+
+
+class TestUuid7(TestCase):
+
+    def test_ids_are_version_7_and_carry_the_current_time(self):
+        # act
+        before = time.time_ns() // 1_000_000
+        _id = uuid7()
+        after = time.time_ns() // 1_000_000
+
+        # assert
+        self.assertEqual(_id.version, 7)
+        self.assertEqual(_id.variant, "specified in RFC 4122")
+        self.assertTrue(before <= _id.int >> 80 <= after + 1)
+
+    def test_ids_generated_in_sequence_are_unique_and_ordered_as_text(self):
+        # act
+        ids = [str(uuid7()) for _ in range(10_000)]
+
+        # assert
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertEqual(ids, sorted(ids))
@@ -0,0 +1,126 @@
+from unittest import IsolatedAsyncioTestCase
+
+import msgpack
+
+from src.web.decoders import decode_csv, decode_msgpack, DataDecodeError, INGEST_CHUNK_ROWS
+
+
+async def chunked(body: bytes, size: int = 7):
+    for i in range(0, len(body), size):
+        yield body[i:i + size]
+
+
+async def collect(columns) -> list[dict[str, list]]:
+    return [x async for x in columns]
+
+
+class TestDecodeCsv(IsolatedAsyncioTestCase):
+
+    async def test_rows_split_across_chunks_are_decoded_into_typed_columns(self):
+        # arrange
+        body = "decay_value,items_flagged,notification_type\r\n1.5,3,Wärning\r\n,4,\"Critical, high\"\r\n".encode()
+
+        # act
+        chunks = await collect(decode_csv(chunked(body)))
+
+        # assert
+        self.assertEqual(chunks, [{
+            "decay_value": [1.5, None],
+            "items_flagged": [3, 4],
+            "notification_type": ["Wärning", "Critical, high"]
+        }])
+
+    async def test_empty_cells_are_missing_values_in_every_column(self):
+        # arrange
+        body = b"items_flagged,notification_type,notification_category\n1,,\n2,Critical,\n"
+
+        # act
+        chunks = await collect(decode_csv(chunked(body)))
+
+        # assert
+        self.assertEqual(chunks, [{
+            "items_flagged": [1, 2],
+            "notification_type": [None, "Critical"],
+            "notification_category": [None, None]
+        }])
+
+    async def test_quoted_fields_may_span_lines(self):
+        # arrange
+        body = b'items_flagged,notification_type\r\n1,"Critical\r\nhigh ""now"""\r\n2,Warning\r\n'
+
+        # act
+        chunks = await collect(decode_csv(chunked(body, 5)))
+
+        # assert
+        self.assertEqual(chunks, [{"items_flagged": [1, 2], "notification_type": ['Critical\r\nhigh "now"', "Warning"]}])
+
+    async def test_unterminated_quoted_fields_are_rejected(self):
+        # arrange
+        body = b'items_flagged,notification_type\n1,"Critical\n'
+
+        # act / assert
+        with self.assertRaisesRegex(DataDecodeError, "Unterminated quoted field in row 1"):
+            await collect(decode_csv(chunked(body)))
+
+    async def test_rows_are_yielded_in_chunks(self):
+        # arrange
+        body = ("items_flagged\n" + "1\n" * (INGEST_CHUNK_ROWS + 5)).encode()
+
+        # act
+        chunks = await collect(decode_csv(chunked(body, 4096)))
+
+        # assert
+        self.assertEqual([len(x["items_flagged"]) for x in chunks], [INGEST_CHUNK_ROWS, 5])
+
+    async def test_invalid_values_are_reported_with_their_row(self):
+        # arrange
+        body = b"decay_value,items_flagged\n1.5,3\n2.5,three\n"
+
+        # act / assert
+        with self.assertRaisesRegex(DataDecodeError, "Invalid items_flagged in row 2"):
+            await collect(decode_csv(chunked(body)))
+
+    async def test_unknown_columns_are_rejected(self):
+        # arrange
+        body = b"decay_value,colour\n1.5,red\n"
+
+        # act / assert
+        with self.assertRaisesRegex(DataDecodeError, "Unknown column colour"):
+            await collect(decode_csv(chunked(body)))
+
+
+class TestDecodeMsgpack(IsolatedAsyncioTestCase):
+
+    async def test_maps_and_arrays_are_decoded_into_typed_columns(self):
+        # arrange
+        body = msgpack.packb({"decay_value": 1.5, "items_flagged": 3}) + msgpack.packb([2.5, 1.0, 4, "Critical", "System"])
+
+        # act
+        chunks = await collect(decode_msgpack(chunked(body, 3)))
+
+        # assert
+        self.assertEqual(chunks, [{
+            "decay_value": [1.5, 2.5],
+            "decay_rate": [None, 1.0],
+            "items_flagged": [3, 4],
+            "notification_type": [None, "Critical"],
+            "notification_category": [None, "System"]
+        }])
+
+    async def test_a_single_array_of_rows_is_accepted(self):
+        # arrange
+        body = msgpack.packb([{"items_flagged": 1}, {"items_flagged": 2}])
+
+        # act
+        chunks = await collect(decode_msgpack(chunked(body)))
+
+        # assert
+        self.assertEqual(chunks[0]["items_flagged"], [1, 2])
+
+    async def test_invalid_values_are_reported_with_their_row(self):
+        # arrange
+        body = msgpack.packb({"items_flagged": 1}) + msgpack.packb({"items_flagged": "many"})
+
+        # act / assert
+        with self.assertRaisesRegex(DataDecodeError, "Invalid items_flagged in row 2"):
+            await collect(decode_msgpack(chunked(body)))
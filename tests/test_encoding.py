@@ -0,0 +1,73 @@
+import asyncio
+import uuid
+from datetime import datetime
+
+from src.core import DataPoint, DataPointWriter, DataPointBatchWriter, UnitOfWork
+from src.infrastructure.encoding import NOTIFICATION_TYPES
+from tests import FastApiTestCase
+
+
+class TestNotificationLabelEncoding(FastApiTestCase):
+
+    def setUp(self):
+        self.statement_id = str(uuid.uuid4())
+        self.label = f"Label {uuid.uuid4()}"
+
+    def point(self, notification_type: str) -> DataPoint:
+        return DataPoint(
+            dataset_id=str(uuid.uuid4()),
+            id=self.statement_id,
+            timestamp=datetime(2025, 6, 1, 12),
+            items_flagged=1,
+            notification_type=notification_type,
+            notification_category="Need approval"
+        )
+
+    async def write_twice_and_roll_back(self):
+        async with self.services[UnitOfWork] as uow:
+            writer = uow.persistence_factory(DataPointWriter)
+            await writer(self.point(self.label))
+            await writer(self.point(self.label))
+
+    def scoped_query(self, statement: str) -> list[tuple]:
+        return self.query(statement, statement_id=self.statement_id, label=self.label)
+
+    def test_labels_are_stored_as_codes_and_decoded_on_read(self):
+        # act
+        self.write(DataPointWriter, self.point(self.label))
+        self.write(DataPointBatchWriter, [self.point(self.label), self.point(None)])
+
+        # assert
+        codes = self.scoped_query(
+            "SELECT points.notification_type_code, types.code FROM data_points AS points "
+            "LEFT JOIN notification_types AS types ON types.name = :label "
+            "WHERE points.id = :statement_id ORDER BY 1"
+        )
+        decoded = self.scoped_query(
+            "SELECT notification_type, notification_category FROM data_points_decoded "
+            "WHERE id = :statement_id ORDER BY 1"
+        )
+        code = NOTIFICATION_TYPES.codes[self.label]
+        self.assertEqual(codes, [(code, code), (code, code), (None, code)])
+        self.assertEqual(decoded, [(self.label, "Need approval"), (self.label, "Need approval"), (None, "Need approval")])
+
+    def test_codes_of_labels_added_by_a_rolled_back_write_are_not_cached(self):
+        # act
+        self.write(DataPointWriter, self.point(self.label), save=False)
+
+        # assert
+        self.assertEqual(self.scoped_query("SELECT count(*) FROM notification_types WHERE name = :label"), [(0,)])
+        self.assertNotIn(self.label, NOTIFICATION_TYPES.codes)
+        self.write(DataPointWriter, self.point(self.label))
+        self.assertEqual(
+            self.scoped_query("SELECT notification_type FROM data_points_decoded WHERE id = :statement_id"),
+            [(self.label,)]
+        )
+
+    def test_labels_added_earlier_in_a_rolled_back_transaction_are_not_cached(self):
+        # act
+        asyncio.run(self.write_twice_and_roll_back())
+
+        # assert
+        self.assertNotIn(self.label, NOTIFICATION_TYPES.codes)
+        self.assertEqual(self.scoped_query("SELECT count(*) FROM notification_types WHERE name = :label"), [(0,)])
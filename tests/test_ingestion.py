@@ -0,0 +1,194 @@
+import asyncio
+from types import SimpleNamespace
+from unittest import IsolatedAsyncioTestCase
+
+from src.application.services import StatementLookupHandler
+from src.core import DataPoint, DataPointBatchWriter, StatementIdReader
+from src.infrastructure.indexes import InMemoryStatementIndex
+from src.infrastructure.ingestion import WriteBehindDataPointQueue
+from tests import FakeLogger, FakeUnitOfWork
+
+
+def settings(**overrides):
+    return SimpleNamespace(**{
+        "WRITE_BEHIND_ENABLED": True,
+        "WRITE_BEHIND_MAX_QUEUE": 100,
+        "WRITE_BEHIND_BATCH_SIZE": 10,
+        "WRITE_BEHIND_FLUSH_INTERVAL_SECONDS": 0.05,
+        "WRITE_BEHIND_MAX_RETRIES": 2,
+        "WRITE_BEHIND_RETRY_BACKOFF_SECONDS": 0,
+        **overrides
+    })
+
+
+class TestWriteBehindDataPointQueue(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.batches = []
+        self.failures = []
+        self.changed = []
+
+        async def listener(statement_id: str):
+            self.changed.append(statement_id)
+
+        self.listener = listener
+
+    async def write(self, records):
+        if self.failures:
+            raise self.failures.pop()
+        self.batches.append(list(records))
+
+    def create_queue(self, **overrides) -> WriteBehindDataPointQueue:
+        return WriteBehindDataPointQueue(
+            unit_of_work_factory=lambda: FakeUnitOfWork({DataPointBatchWriter: self.write}),
+            change_listeners=[self.listener],
+            settings=settings(**overrides),
+            logger=FakeLogger()
+        )
+
+    async def test_queued_points_are_written_in_batches_of_the_batch_size(self):
+        # arrange
+        queue = self.create_queue(WRITE_BEHIND_FLUSH_INTERVAL_SECONDS=10)
+        await queue.start()
+
+        # act
+        for i in range(25):
+            queue.put(DataPoint(dataset_id=str(i), id="s1"))
+        await asyncio.sleep(0.01)
+
+        # assert
+        self.assertEqual([len(x) for x in self.batches], [10, 10])
+        self.assertEqual(queue.depth, 5)
+        await queue.stop()
+
+    async def test_partial_batches_are_written_after_the_flush_interval(self):
+        # arrange
+        queue = self.create_queue()
+        await queue.start()
+
+        # act
+        queue.put(DataPoint(dataset_id="1", id="s1"))
+        queue.put(DataPoint(dataset_id="2", id="s2"))
+        await asyncio.sleep(0.1)
+
+        # assert
+        self.assertEqual([len(x) for x in self.batches], [2])
+        self.assertEqual(self.changed, ["s1", "s2"])
+        self.assertEqual(queue.flushed, 2)
+        await queue.stop()
+
+    async def test_everything_queued_is_written_on_stop(self):
+        # arrange
+        queue = self.create_queue(WRITE_BEHIND_FLUSH_INTERVAL_SECONDS=10)
+        await queue.start()
+        for i in range(15):
+            queue.put(DataPoint(dataset_id=str(i), id="s1"))
+        await asyncio.sleep(0)
+
+        # act
+        await queue.stop()
+
+        # assert
+        self.assertEqual(sum(len(x) for x in self.batches), 15)
+        self.assertEqual(queue.depth, 0)
+
+    async def test_failed_batches_are_retried(self):
+        # arrange
+        self.failures.append(ConnectionError("gone"))
+        queue = self.create_queue()
+        await queue.start()
+
+        # act
+        queue.put(DataPoint(dataset_id="1", id="s1"))
+        await asyncio.sleep(0.1)
+
+        # assert
+        self.assertEqual(len(self.batches), 1)
+        self.assertEqual(queue.failed, 0)
+        await queue.stop()
+
+    async def test_batches_are_dropped_once_retries_are_exhausted(self):
+        # arrange
+        self.failures.extend(ConnectionError("gone") for _ in range(3))
+        queue = self.create_queue()
+        await queue.start()
+
+        # act
+        queue.put(DataPoint(dataset_id="1", id="s1"))
+        await asyncio.sleep(0.1)
+
+        # assert
+        self.assertEqual(self.batches, [])
+        self.assertEqual(queue.failed, 1)
+        self.assertEqual(self.changed, [])
+        await queue.stop()
+
+    async def test_points_are_rejected_once_the_queue_is_full(self):
+        # arrange
+        queue = self.create_queue(WRITE_BEHIND_MAX_QUEUE=2)
+
+        # act
+        accepted = [queue.put(DataPoint(dataset_id=str(i), id="s1")) for i in range(3)]
+
+        # assert
+        self.assertEqual(accepted, [True, True, False])
+        self.assertEqual(queue.depth, 2)
+        self.assertEqual(queue.capacity, 2)
+
+
+class TestStatementLookupHandler(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.reads = []
+        self.statement_ids = {"d1": "s1"}
+        self.index = InMemoryStatementIndex()
+        self.lookup = StatementLookupHandler(
+            unit_of_work=FakeUnitOfWork({StatementIdReader: self.read}),
+            statement_index=self.index
+        )
+
+    async def read(self, ids=None):
+        self.reads.append(ids)
+        return {k: v for k, v in self.statement_ids.items() if ids is None or k in ids}
+
+    async def test_loaded_datasets_are_looked_up_without_a_read(self):
+        # arrange
+        await self.lookup.load()
+
+        # act
+        statement_ids = [await self.lookup("d1") for _ in range(3)]
+
+        # assert
+        self.assertEqual(statement_ids, ["s1"] * 3)
+        self.assertEqual(self.reads, [None])
+
+    async def test_datasets_created_elsewhere_are_read_once(self):
+        # arrange
+        await self.lookup.load()
+        self.statement_ids["d2"] = "s2"
+
+        # act
+        first = await self.lookup("d2")
+        second = await self.lookup("d2")
+
+        # assert
+        self.assertEqual((first, second), ("s2", "s2"))
+        self.assertEqual(self.reads, [None, ["d2"]])
+
+    async def test_missing_datasets_have_no_statement(self):
+        # act
+        statement_id = await self.lookup("missing")
+
+        # assert
+        self.assertIsNone(statement_id)
+
+    async def test_datasets_added_before_the_load_are_kept(self):
+        # arrange
+        self.index.add("d3", "s3")
+
+        # act
+        await self.lookup.load()
+
+        # assert
+        self.assertEqual(self.index.get("d3"), "s3")
+        self.assertEqual(self.index.get("d1"), "s1")
@@ -6,7 +6,7 @@ from uuid import UUID
 
 from src.application.mappers import map_dataset_aggregate_to_contract, map_view_to_contract, \
     map_contract_view_to_domain, map_datapoint_contract_to_domain, map_dataset_config_contract_to_domain
-from src.core import ViewConfig, DatasetConfigAggregate
+from src.core import ViewConfig, DatasetConfigAggregate, DatasetResult, RecordPage
 from autofixture import AutoFixture
 
 from src.web.models import LayoutConfigSchema, DataEntryCreateSchema, ConfigurationCreateSchema
@@ -23,13 +23,14 @@ class TestMetricsMappers(TestCase):
     def test_map_to_response(self):
         # arrange
         metric_aggregate = self.fixture.create(DatasetConfigAggregate)
+        page = RecordPage(columns=["time_point", "data_value"], rows=[("2025-06-01", 1.5), ("2025-06-02", 2.5)])
 
         # act
-        response = map_dataset_aggregate_to_contract(metric_aggregate)
+        response = map_dataset_aggregate_to_contract(DatasetResult(dataset=metric_aggregate, page=page))
 
         # assert
         self.assertEqual(response.id, metric_aggregate.id)
-        self.assertEqual(response.records, metric_aggregate.records)
+        self.assertEqual(response.records, page.records)
         self.assertEqual(response.is_mutable, metric_aggregate.is_mutable)
         self.assertEqual([layout.breakpoint for layout in response.layouts], [layout.breakpoint for layout in metric_aggregate.layouts])
 
@@ -114,7 +115,7 @@ class TestDataPointMappers(TestCase):
     def setUp(self):
         self.fixture = AutoFixture()
 
-    @patch("uuid.uuid4", return_value=UUID(DEFAULT_UUID))
+    @patch("src.application.mappers.uuid7", return_value=UUID(DEFAULT_UUID))
     def test_map_datapoint_contract_to_domain(self, _):
         # arrange
         create_request = self.fixture.create(DataEntryCreateSchema)
@@ -0,0 +1,381 @@
+import asyncio
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from unittest import TestCase
+
+from src.application.mappers import map_key_to_cursor, map_cursor_to_key, map_cursor_to_page_key
+from src.core import SqlStatement, RecordPage, DataPoint, DataPointBatchWriter, DataPointWriter, DataPointReader, \
+    DatasetAggregateWriter, DatasetConfigAggregate, UnitOfWork
+from src.infrastructure.data_access import paginate, bound_by_watermarks, shadow_data_points, SHADOWED_COLUMNS
+from tests import FastApiTestCase
+
+
+class TestStatementOrdering(TestCase):
+
+    def test_first_column_of_the_outermost_order_by_is_used(self):
+        # arrange
+        statement = SqlStatement(statement="SELECT DATE(timestamp) AS time_point, decay_value FROM data_points "
+                                           "WHERE id IN (SELECT id FROM x ORDER BY id) ORDER BY time_point DESC, decay_value;")
+
+        # act
+        ordering = statement.ordering
+
+        # assert
+        self.assertEqual(ordering, ("time_point", True, True))
+
+    def test_statements_ordered_by_an_expression_have_no_ordering(self):
+        # arrange
+        statement = SqlStatement(statement="SELECT DATE(timestamp) AS d FROM data_points ORDER BY DATE(timestamp)")
+
+        # act
+        ordering = statement.ordering
+
+        # assert
+        self.assertIsNone(ordering)
+
+    def test_statements_ordered_by_a_column_they_do_not_select_have_no_ordering(self):
+        # arrange
+        statement = SqlStatement(statement="SELECT DATE(timestamp) AS day, decay_value FROM data_points "
+                                           "WHERE id = 'x' ORDER BY timestamp DESC")
+
+        # act
+        ordering = statement.ordering
+
+        # assert
+        self.assertIsNone(ordering)
+
+    def test_statements_selecting_every_column_are_ordered_by_any_of_them(self):
+        # arrange
+        statement = SqlStatement(statement="SELECT * FROM data_points ORDER BY timestamp NULLS FIRST")
+
+        # act
+        ordering = statement.ordering
+
+        # assert
+        self.assertEqual(ordering, ("timestamp", False, True))
+
+    def test_unordered_statements_have_no_ordering(self):
+        # arrange
+        statement = SqlStatement(statement="SELECT notification_type, COUNT(*) FROM data_points GROUP BY notification_type")
+
+        # act
+        ordering = statement.ordering
+
+        # assert
+        self.assertIsNone(ordering)
+
+
+class TestIncrementalStatements(TestCase):
+
+    def test_row_per_data_point_statements_are_incremental(self):
+        # arrange
+        statement = SqlStatement(statement="SELECT DATE(timestamp) AS time_point, decay_value FROM data_points ORDER BY time_point")
+
+        # act / assert
+        self.assertTrue(statement.is_incremental)
+
+    def test_aggregating_statements_are_not_incremental(self):
+        for sql in (
+            "SELECT notification_type, COUNT(*) FROM data_points GROUP BY notification_type",
+            "SELECT SUM(items_flagged) AS total FROM data_points",
+            "SELECT DISTINCT notification_type FROM data_points",
+            "SELECT decay_value, LAG(decay_value) OVER (ORDER BY timestamp) FROM data_points",
+        ):
+            with self.subTest(sql=sql):
+                # act / assert
+                self.assertFalse(SqlStatement(statement=sql).is_incremental)
+
+    def test_data_points_are_shadowed_by_the_watermark_bounds(self):
+        # arrange
+        statement = SqlStatement(statement="SELECT decay_value FROM data_points;")
+
+        # act
+        sql = bound_by_watermarks(statement, since="745:749:746")
+
+        # assert
+        self.assertEqual(
+            sql,
+            f"WITH data_points AS NOT MATERIALIZED (SELECT {SHADOWED_COLUMNS} FROM data_points_decoded "
+            "WHERE pg_visible_in_snapshot(write_xid, CAST(CAST(:until_watermark AS TEXT) AS pg_snapshot)) "
+            "AND write_xid >= pg_snapshot_xmin(CAST(CAST(:since_watermark AS TEXT) AS pg_snapshot)) "
+            "AND NOT pg_visible_in_snapshot(write_xid, CAST(CAST(:since_watermark AS TEXT) AS pg_snapshot)))\n"
+            "SELECT decay_value FROM data_points"
+        )
+
+    def test_statements_with_their_own_ctes_are_extended(self):
+        # arrange
+        statement = SqlStatement(statement="WITH p AS (SELECT * FROM data_points) SELECT * FROM p")
+
+        # act
+        sql = bound_by_watermarks(statement, since=None)
+
+        # assert
+        self.assertEqual(
+            sql,
+            f"WITH data_points AS NOT MATERIALIZED (SELECT {SHADOWED_COLUMNS} FROM data_points_decoded "
+            "WHERE pg_visible_in_snapshot(write_xid, CAST(CAST(:until_watermark AS TEXT) AS pg_snapshot))), "
+            "p AS (SELECT * FROM data_points) SELECT * FROM p"
+        )
+
+    def test_data_points_are_shadowed_by_the_decoded_view(self):
+        # act
+        sql = shadow_data_points("WITH RECURSIVE p AS (SELECT * FROM data_points) SELECT * FROM p;")
+
+        # assert
+        self.assertEqual(
+            sql,
+            f"WITH RECURSIVE data_points AS NOT MATERIALIZED (SELECT {SHADOWED_COLUMNS} FROM data_points_decoded), "
+            "p AS (SELECT * FROM data_points) SELECT * FROM p"
+        )
+
+    def test_statements_not_reading_data_points_are_left_unchanged(self):
+        # act
+        sql = shadow_data_points("SELECT day, point_count FROM data_point_daily_rollups;")
+
+        # assert
+        self.assertEqual(sql, "SELECT day, point_count FROM data_point_daily_rollups")
+
+
+class TestPaginate(TestCase):
+
+    def test_ordered_statements_get_a_keyset_predicate(self):
+        # arrange
+        statement = SqlStatement(statement="SELECT DATE(timestamp) AS time_point FROM data_points ORDER BY time_point;")
+
+        # act
+        sql = paginate(statement, after=(date(2025, 6, 2), 3))
+
+        # assert
+        self.assertEqual(
+            sql,
+            "SELECT * FROM (SELECT page.*, row_number() OVER (PARTITION BY page.time_point ORDER BY page::text) AS page_tie "
+            "FROM (\nSELECT DATE(timestamp) AS time_point FROM data_points ORDER BY time_point\n) AS page) AS page "
+            "WHERE (page.time_point >= :page_after OR page.time_point IS NULL) "
+            "AND (page.time_point > :page_after OR page.time_point IS NULL OR page.page_tie > :page_after_tie) "
+            "ORDER BY page.time_point ASC NULLS LAST, page.page_tie LIMIT :page_limit"
+        )
+
+    def test_pages_ending_on_a_null_continue_with_the_remaining_nulls(self):
+        # arrange
+        statement = SqlStatement(statement="SELECT decay_value FROM data_points ORDER BY decay_value DESC")
+
+        # act
+        sql = paginate(statement, after=(None, 2))
+
+        # assert
+        self.assertTrue(sql.endswith(
+            "WHERE (page.decay_value IS NOT NULL OR page.page_tie > :page_after_tie) "
+            "ORDER BY page.decay_value DESC NULLS FIRST, page.page_tie LIMIT :page_limit"
+        ))
+
+    def test_statements_ordered_by_a_column_they_do_not_select_are_only_limited(self):
+        # arrange
+        statement = SqlStatement(statement="SELECT DATE(timestamp) AS day FROM data_points ORDER BY timestamp DESC")
+
+        # act
+        sql = paginate(statement, after=None)
+
+        # assert
+        self.assertEqual(
+            sql,
+            "SELECT * FROM (\nSELECT DATE(timestamp) AS day FROM data_points ORDER BY timestamp DESC\n) AS page LIMIT :page_limit"
+        )
+
+    def test_unordered_statements_are_only_limited(self):
+        # arrange
+        statement = SqlStatement(statement="SELECT 1")
+
+        # act
+        sql = paginate(statement, after=None)
+
+        # assert
+        self.assertEqual(sql, "SELECT * FROM (\nSELECT 1\n) AS page LIMIT :page_limit")
+
+
+class TestCursor(TestCase):
+
+    def test_keys_round_trip_with_their_type(self):
+        for key in (date(2025, 6, 2), datetime(2025, 6, 2, 10, 30), Decimal("1.50"), 3, 2.5, "Critical"):
+            with self.subTest(key=key):
+                # act
+                result = map_cursor_to_key(map_key_to_cursor(key))
+
+                # assert
+                self.assertEqual(result, key)
+                self.assertIs(type(result), type(key))
+
+    def test_invalid_cursor_is_rejected(self):
+        # act / assert
+        with self.assertRaises(ValueError):
+            map_cursor_to_key("not-a-cursor")
+
+    def test_page_keys_round_trip_with_their_tie_number(self):
+        # act
+        key = map_cursor_to_page_key(map_key_to_cursor((date(2025, 6, 2), 3)))
+
+        # assert
+        self.assertEqual(key, (date(2025, 6, 2), 3))
+
+    def test_null_page_keys_round_trip(self):
+        # act
+        key = map_cursor_to_page_key(map_key_to_cursor((None, 3)))
+
+        # assert
+        self.assertEqual(key, (None, 3))
+
+    def test_cursors_without_a_tie_number_are_rejected(self):
+        # act / assert
+        with self.assertRaises(ValueError):
+            map_cursor_to_page_key(map_key_to_cursor(date(2025, 6, 2)))
+
+
+class TestRecordPage(TestCase):
+
+    def test_rows_are_transposed_into_columns(self):
+        # arrange
+        page = RecordPage(columns=["time_point", "data_value"], rows=[(date(2025, 6, 2), 50.0), (date(2025, 6, 10), 70.5)])
+
+        # act
+        columns = page.to_columns()
+
+        # assert
+        self.assertEqual(columns, {"time_point": [date(2025, 6, 2), date(2025, 6, 10)], "data_value": [50.0, 70.5]})
+        self.assertEqual(page.records[1], {"time_point": date(2025, 6, 10), "data_value": 70.5})
+
+    def test_empty_pages_keep_their_columns(self):
+        # arrange
+        page = RecordPage(columns=["time_point", "data_value"])
+
+        # act
+        columns = page.to_columns()
+
+        # assert
+        self.assertEqual(columns, {"time_point": [], "data_value": []})
+
+
+class TestTiedPages(FastApiTestCase):
+
+    def read_pages(self, dataset_id: str, limit: int) -> list[dict]:
+        pages = []
+        cursor = None
+        while True:
+            params = {"limit": limit, "start_date": "2025-06-01", "end_date": "2025-06-30"}
+            if cursor is not None:
+                params["cursor"] = cursor
+            response = self.client.get(f"/data/{dataset_id}", params=params, headers={"Authorization": "Bearer test"})
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.json())
+            cursor = response.json()["next_cursor"]
+            if cursor is None:
+                return pages
+
+    def test_rows_tied_on_the_ordering_value_span_page_boundaries(self):
+        # arrange
+        statement_id = str(uuid.uuid4())
+        self.write(DataPointBatchWriter, [
+            DataPoint(dataset_id=str(uuid.uuid4()), id=statement_id, timestamp=datetime(2025, 6, 3, i), items_flagged=i)
+            for i in range(5)
+        ])
+        dataset_id = str(uuid.uuid4())
+        self.write(DatasetAggregateWriter, DatasetConfigAggregate(
+            id=dataset_id,
+            is_mutable=True,
+            statement=SqlStatement(id=statement_id, statement=f"""
+                SELECT DATE(timestamp) AS time_point, items_flagged AS data_value
+                FROM data_points
+                WHERE id = '{statement_id}'
+                ORDER BY time_point
+            """),
+            layouts=[]
+        ))
+
+        # act
+        pages = self.read_pages(dataset_id, limit=2)
+
+        # assert
+        self.assertEqual([len(x["records"]) for x in pages], [2, 2, 1])
+        self.assertEqual([x["truncated"] for x in pages], [True, True, False])
+        self.assertEqual(sorted(r["data_value"] for x in pages for r in x["records"]), [0, 1, 2, 3, 4])
+
+    def test_pages_ending_on_null_ordering_values_continue_with_the_remaining_rows(self):
+        # arrange
+        datasets = {}
+        for direction in ("ASC", "DESC"):
+            statement_id = str(uuid.uuid4())
+            self.write(DataPointBatchWriter, [
+                DataPoint(
+                    dataset_id=str(uuid.uuid4()),
+                    id=statement_id,
+                    timestamp=datetime(2025, 6, 3, i),
+                    decay_value=[1.0, 2.0, None, None, None][i],
+                    items_flagged=i
+                )
+                for i in range(5)
+            ])
+            datasets[direction] = str(uuid.uuid4())
+            self.write(DatasetAggregateWriter, DatasetConfigAggregate(
+                id=datasets[direction],
+                is_mutable=True,
+                statement=SqlStatement(id=statement_id, statement=f"""
+                    SELECT items_flagged AS data_value, decay_value
+                    FROM data_points
+                    WHERE id = '{statement_id}'
+                    ORDER BY decay_value {direction}
+                """),
+                layouts=[]
+            ))
+
+        # act
+        pages = {direction: self.read_pages(dataset_id, limit=2) for direction, dataset_id in datasets.items()}
+
+        # assert
+        self.assertEqual(
+            [[r["decay_value"] for r in x["records"]] for x in pages["ASC"]],
+            [[1.0, 2.0], [None, None], [None]]
+        )
+        self.assertEqual(
+            [[r["decay_value"] for r in x["records"]] for x in pages["DESC"]],
+            [[None, None], [None, 2.0], [1.0]]
+        )
+        for direction in datasets:
+            self.assertEqual(sorted(r["data_value"] for x in pages[direction] for r in x["records"]), [0, 1, 2, 3, 4])
+
+
+class TestOutOfOrderCommits(FastApiTestCase):
+
+    def setUp(self):
+        self.statement_id = str(uuid.uuid4())
+        self.statement = SqlStatement(id=self.statement_id, statement=f"""
+            SELECT timestamp AS time_point, items_flagged AS data_value
+            FROM data_points
+            WHERE id = '{self.statement_id}'
+            ORDER BY time_point
+        """)
+
+    def point(self, timestamp: datetime, items_flagged: int) -> DataPoint:
+        return DataPoint(dataset_id=str(uuid.uuid4()), id=self.statement_id, timestamp=timestamp, items_flagged=items_flagged)
+
+    async def read(self, since: str = None) -> RecordPage:
+        async with self.services[UnitOfWork] as uow:
+            reader = uow.persistence_factory(DataPointReader)
+            return await reader(self.statement, date(2025, 6, 1), date(2025, 6, 30), 1, 100, since=since)
+
+    async def poll_while_an_earlier_point_commits_late(self) -> tuple[RecordPage, RecordPage]:
+        async with self.services[UnitOfWork] as late:
+            await late.persistence_factory(DataPointWriter)(self.point(datetime(2025, 6, 2), 1))
+            await self.persist(DataPointWriter, self.point(datetime(2025, 6, 3), 2))
+            first = await self.read()
+            await late.save()
+        return first, await self.read(since=first.watermark)
+
+    def test_points_committed_after_a_later_timestamp_are_returned_by_the_next_poll(self):
+        # act
+        first, second = asyncio.run(self.poll_while_an_earlier_point_commits_late())
+
+        # assert
+        self.assertEqual([x["data_value"] for x in first.records], [2])
+        self.assertFalse(first.incremental)
+        self.assertEqual([x["data_value"] for x in second.records], [1])
+        self.assertTrue(second.incremental)
+        self.assertEqual(asyncio.run(self.read(since=second.watermark)).records, [])
@@ -0,0 +1,68 @@
+import asyncio
+import uuid
+from datetime import date, datetime
+from unittest import TestCase
+
+from src.core import DataPoint, DataPointWriter, UnitOfWork
+from src.infrastructure import Settings
+from src.infrastructure.partitioning import DataPointPartitionMaintainer, add_months, partition_name
+from tests import FastApiTestCase
+
+
+class TestMonths(TestCase):
+
+    def test_months_are_added_across_years(self):
+        # act
+        months = [add_months(date(2025, 11, 17), x) for x in (0, 1, 2, 14, -11)]
+
+        # assert
+        self.assertEqual(months, [date(2025, 11, 1), date(2025, 12, 1), date(2026, 1, 1), date(2027, 1, 1), date(2024, 12, 1)])
+
+    def test_partitions_are_named_by_month(self):
+        # act
+        name = partition_name(date(2025, 6, 1))
+
+        # assert
+        self.assertEqual(name, "data_points_2025_06")
+
+
+class TestDataPointPartitionMaintainer(FastApiTestCase):
+
+    def setUp(self):
+        self.maintainer = DataPointPartitionMaintainer(
+            unit_of_work_factory=lambda: self.services[UnitOfWork],
+            settings=self.services[Settings],
+            logger=self.test_logger
+        )
+
+    def write_point(self, timestamp: datetime) -> str:
+        dataset_id = str(uuid.uuid4())
+        self.write(DataPointWriter, DataPoint(dataset_id=dataset_id, id="partitioning", timestamp=timestamp, items_flagged=1))
+        return dataset_id
+
+    def partition_of(self, dataset_id: str) -> str:
+        [(partition,)] = self.query(
+            "SELECT tableoid::regclass::text FROM data_points WHERE dataset_id = :dataset_id", dataset_id=dataset_id
+        )
+        return partition
+
+    def test_partitions_are_created_for_the_current_and_coming_months_once(self):
+        # act
+        created = asyncio.run(self.maintainer.maintain(date(2031, 1, 15)))
+        created_again = asyncio.run(self.maintainer.maintain(date(2031, 1, 16)))
+
+        # assert
+        self.assertEqual(created, ["data_points_2031_01", "data_points_2031_02", "data_points_2031_03", "data_points_2031_04"])
+        self.assertEqual(created_again, [])
+
+    def test_points_written_before_their_partition_exists_are_moved_into_it(self):
+        # arrange
+        dataset_id = self.write_point(datetime(2032, 3, 10, 12, 30))
+        before = self.partition_of(dataset_id)
+
+        # act
+        asyncio.run(self.maintainer.maintain(date(2032, 1, 1)))
+
+        # assert
+        self.assertEqual(before, "data_points_default")
+        self.assertEqual(self.partition_of(dataset_id), "data_points_2032_03")
@@ -0,0 +1,116 @@
+import gzip
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import TestCase
+
+from src.core import DatasetVersion
+from src.web.models import AnalyticsResponseSchema, LayoutConfigSchema
+from src.web.responses import FastJSONResponse, accepts, CachedResponse, ResponseCache, response_key, entity_tag, \
+    etag_matches
+from tests import FakeLogger
+
+
+class TestFastJSONResponse(TestCase):
+
+    def test_constructed_schemas_render_like_pydantic(self):
+        # arrange
+        schema = AnalyticsResponseSchema.model_construct(
+            id="d1",
+            is_mutable=True,
+            records=[{"time_point": date(2025, 6, 2), "at": datetime(2025, 6, 2, 10, 30), "value": Decimal("1.50")}],
+            layouts=[LayoutConfigSchema.model_construct(breakpoint="lg", coordinates=[0, 1, 2, 3], static=None)],
+            next_cursor=None,
+            truncated=False
+        )
+
+        # act
+        body = FastJSONResponse(schema).body
+
+        # assert
+        self.assertEqual(json.loads(body), json.loads(schema.model_dump_json()))
+
+
+class TestAccepts(TestCase):
+
+    def test_media_type_is_matched_among_parameters_and_alternatives(self):
+        # act / assert
+        self.assertTrue(accepts("text/html, application/x-ndjson;q=0.9", "application/x-ndjson"))
+        self.assertFalse(accepts("application/json", "application/x-ndjson"))
+        self.assertFalse(accepts(None, "application/x-ndjson"))
+
+
+class TestResponseCache(TestCase):
+
+    def setUp(self):
+        self.body = {"records": [{"value": i} for i in range(200)]}
+        self.version = DatasetVersion(dataset_id="d1", statement_id="s1", version=3)
+
+    def test_large_bodies_are_stored_compressed_and_sent_as_is_to_gzip_clients(self):
+        # arrange
+        cached = CachedResponse.from_response(FastJSONResponse(self.body))
+
+        # act
+        compressed = cached.to_response("gzip, br")
+        identity = cached.to_response(None)
+
+        # assert
+        self.assertEqual(cached.encoding, "gzip")
+        self.assertEqual(compressed.headers["content-encoding"], "gzip")
+        self.assertEqual(json.loads(gzip.decompress(compressed.body)), self.body)
+        self.assertNotIn("content-encoding", identity.headers)
+        self.assertEqual(json.loads(identity.body), self.body)
+
+    def test_stored_responses_are_served_for_the_same_key(self):
+        # arrange
+        cache = ResponseCache(settings=SimpleNamespace(RESPONSE_CACHE_ENABLED=True), logger=FakeLogger())
+        cache.cache.clear()
+        key = response_key(self.version, "records")
+
+        # act
+        cache.store(key, FastJSONResponse(self.body), None)
+        hit = cache.get(key, None)
+        other_version = cache.get(response_key(DatasetVersion("d1", "s1", 4), "records"), None)
+
+        # assert
+        self.assertEqual(json.loads(hit.body), self.body)
+        self.assertIsNone(other_version)
+
+    def test_nothing_is_cached_when_disabled(self):
+        # arrange
+        cache = ResponseCache(settings=SimpleNamespace(RESPONSE_CACHE_ENABLED=False), logger=FakeLogger())
+        cache.cache.clear()
+        key = response_key(self.version, "records")
+
+        # act
+        cache.store(key, FastJSONResponse(self.body), None)
+
+        # assert
+        self.assertIsNone(cache.get(key, None))
+        self.assertEqual(cache.cache.statistics().entries, 0)
+
+
+class TestEntityTag(TestCase):
+
+    def test_tags_differ_per_version_and_request(self):
+        # arrange
+        version = DatasetVersion(dataset_id="d1", statement_id="s1", version=1, epoch="e")
+
+        # act
+        tag = entity_tag(response_key(version, "records"))
+        same = entity_tag(response_key(version, "records"))
+        bumped = entity_tag(response_key(DatasetVersion("d1", "s1", 2, "e"), "records"))
+        columnar = entity_tag(response_key(version, "columnar"))
+
+        # assert
+        self.assertEqual(tag, same)
+        self.assertEqual(len({tag, bumped, columnar}), 3)
+
+    def test_if_none_match_uses_weak_comparison(self):
+        # act / assert
+        self.assertTrue(etag_matches('"abc"', 'W/"abc"'))
+        self.assertTrue(etag_matches('W/"x", W/"abc"', 'W/"abc"'))
+        self.assertTrue(etag_matches("*", 'W/"abc"'))
+        self.assertFalse(etag_matches('W/"x"', 'W/"abc"'))
+        self.assertFalse(etag_matches(None, 'W/"abc"'))
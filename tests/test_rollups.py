@@ -0,0 +1,116 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+from src.application.services import DailyRollupBackfillService
+from src.core import DataPoint, DataPointWriter, DataPointBatchWriter, DatasetAggregateWriter, \
+    DatasetConfigAggregate, SqlStatement
+from tests import FastApiTestCase
+
+ROLLUP_COLUMNS = "day, notification_type, notification_category, point_count, decay_value_count, " \
+    "round(decay_value_sum::NUMERIC, 6), round(decay_value_sum_squares::NUMERIC, 6), items_flagged_count, " \
+    "items_flagged_sum, round(items_flagged_sum_squares::NUMERIC, 6)"
+
+RAW_ROLLUP_COLUMNS = "DATE(timestamp), notification_type, notification_category, count(*), count(decay_value), " \
+    "round(coalesce(sum(decay_value), 0)::NUMERIC, 6), round(coalesce(sum(decay_value * decay_value), 0)::NUMERIC, 6), " \
+    "count(items_flagged), coalesce(sum(items_flagged), 0), " \
+    "round(coalesce(sum(items_flagged::FLOAT * items_flagged), 0)::NUMERIC, 6)"
+
+
+def make_points(statement_id: str, count: int, start: datetime) -> list[DataPoint]:
+    return [
+        DataPoint(
+            dataset_id=str(uuid.uuid4()),
+            id=statement_id,
+            timestamp=start + timedelta(hours=7 * i),
+            decay_value=None if i % 4 == 0 else i * 0.5,
+            items_flagged=i % 5,
+            notification_type=["Critical", "Warning", None][i % 3],
+            notification_category="System"
+        )
+        for i in range(count)
+    ]
+
+
+class TestDailyRollups(FastApiTestCase):
+
+    def setUp(self):
+        self.statement_id = str(uuid.uuid4())
+
+    def write_each(self, records: list[DataPoint]):
+        for record in records:
+            self.write(DataPointWriter, record)
+
+    def rollups(self) -> list[tuple]:
+        return self.query(
+            f"SELECT {ROLLUP_COLUMNS} FROM data_point_daily_rollups WHERE id = :statement_id ORDER BY 1, 2, 3",
+            statement_id=self.statement_id
+        )
+
+    def raw_rollups(self) -> list[tuple]:
+        return self.query(
+            f"SELECT {RAW_ROLLUP_COLUMNS} FROM data_points_decoded WHERE id = :statement_id GROUP BY 1, 2, 3 ORDER BY 1, 2, 3",
+            statement_id=self.statement_id
+        )
+
+    def test_rollups_match_the_raw_points_after_single_and_batch_writes(self):
+        # arrange
+        start = datetime(2025, 5, 30, 9)
+
+        # act
+        self.write_each(make_points(self.statement_id, 12, start))
+        self.write(DataPointBatchWriter, make_points(self.statement_id, 40, start))
+        self.write(DataPointBatchWriter, make_points(self.statement_id, 1200, start))
+
+        # assert
+        rollups = self.rollups()
+        self.assertEqual(rollups, self.raw_rollups())
+        self.assertEqual(sum(x[3] for x in rollups), 1252)
+
+    def test_backfill_rebuilds_rollups_from_the_raw_points(self):
+        # arrange
+        self.write(DataPointBatchWriter, make_points(self.statement_id, 30, datetime(2025, 6, 1)))
+        self.execute(
+            "UPDATE data_point_daily_rollups SET point_count = 0, decay_value_sum = 0 WHERE id = :statement_id",
+            statement_id=self.statement_id
+        )
+        backfill = self.services[DailyRollupBackfillService]
+
+        # act
+        rows = asyncio.run(backfill(statement_id=self.statement_id))
+
+        # assert
+        self.assertEqual(self.rollups(), self.raw_rollups())
+        self.assertEqual(rows, len(self.raw_rollups()))
+
+    def test_a_dataset_statement_can_read_the_rollups(self):
+        # arrange
+        start = datetime(2025, 6, 1, 1)
+        self.write(DataPointBatchWriter, make_points(self.statement_id, 20, start))
+        dataset_id = str(uuid.uuid4())
+        aggregate = DatasetConfigAggregate(
+            id=dataset_id,
+            is_mutable=True,
+            statement=SqlStatement(id=self.statement_id, statement=f"""
+                SELECT day AS date_period, SUM(items_flagged_sum)::INTEGER AS total_count
+                FROM data_point_daily_rollups
+                WHERE id = '{self.statement_id}'
+                AND day BETWEEN :start_date AND :end_date
+                GROUP BY day
+                ORDER BY date_period
+            """),
+            layouts=[]
+        )
+        self.write(DatasetAggregateWriter, aggregate)
+
+        # act
+        response = self.client.get(f"/data/{dataset_id}", headers={"Authorization": "Bearer test"})
+
+        # assert
+        expected = self.query(
+            "SELECT DATE(timestamp)::TEXT, SUM(items_flagged)::INTEGER FROM data_points WHERE id = :statement_id "
+            "AND timestamp >= '2025-06-01' AND timestamp < '2025-07-01' GROUP BY 1 ORDER BY 1",
+            statement_id=self.statement_id
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(x["date_period"], x["total_count"]) for x in response.json()["records"]], expected)
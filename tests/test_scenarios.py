@@ -3,7 +3,7 @@ import uuid
 
 from tests import FastApiTestCase, ScenarioContext, ScenarioRunner
 from tests.steps import HealthCheckScenario, GetDatasetScenario, CreateDatasetConfigScenario, \
-    CreateDataPointScenario
+    CreateDataPointScenario, GetDatasetBatchScenario, GetDashboardLayoutScenario
 
 
 class TestHealthCheckScenarios(FastApiTestCase):
@@ -30,6 +30,14 @@ class TestHealthCheckScenarios(FastApiTestCase):
             .then_the_response_should_be_healthy() \
             .then_an_info_log_indicates_the_endpoint_was_called()
 
+    def test_get_ingestion_status(self):
+        scenario = HealthCheckScenario(self.context)
+        scenario \
+            .given_i_have_an_app_running() \
+            .when_the_get_ingestion_status_endpoint_is_called() \
+            .then_the_status_code_should_be_ok() \
+            .then_write_behind_should_be_off_with_an_empty_queue()
+
 
 class TestGetDatasetScenarios(FastApiTestCase):
 
@@ -96,6 +104,166 @@ class TestGetDatasetScenarios(FastApiTestCase):
             .then_the_response_body_should_match_expected_day_range_filtered_metric() \
             .then_an_info_log_indicates_endpoint_called()
 
+    def test_get_dataset_when_paging_through_records(self):
+        scenario = GetDatasetScenario(self.context)
+        scenario \
+            .given_i_have_an_app_running() \
+            .when_the_get_metrics_endpoint_is_called_with_dataset_config_id_and_params(
+                "53aaf9d4-04d3-43d3-9f40-6ce4a9282a5c",
+                limit=2
+            ) \
+            .then_the_status_code_should_be(200) \
+            .then_the_page_should_contain("2025-06-02", "2025-06-10", truncated=True) \
+            .when_the_next_page_is_requested(limit=2) \
+            .then_the_status_code_should_be(200) \
+            .then_the_page_should_contain("2025-06-25", truncated=False)
+
+    def test_get_dataset_when_cursor_is_invalid(self):
+        scenario = GetDatasetScenario(self.context)
+        scenario \
+            .given_i_have_an_app_running() \
+            .when_the_get_metrics_endpoint_is_called_with_dataset_config_id_and_params(
+                "53aaf9d4-04d3-43d3-9f40-6ce4a9282a5c",
+                cursor="not-a-cursor"
+            ) \
+            .then_the_status_code_should_be(400)
+
+    def test_get_dataset_when_columnar_format_is_requested(self):
+        scenario = GetDatasetScenario(self.context)
+        scenario \
+            .given_i_have_an_app_running() \
+            .when_the_get_metrics_endpoint_is_called_with_dataset_config_id_and_params(
+                "53aaf9d4-04d3-43d3-9f40-6ce4a9282a5c",
+                format="columnar"
+            ) \
+            .then_the_status_code_should_be(200) \
+            .then_the_response_should_contain_column_arrays()
+
+    def test_get_dataset_when_arrow_is_accepted(self):
+        scenario = GetDatasetScenario(self.context)
+        scenario \
+            .given_i_have_an_app_running() \
+            .when_the_get_metrics_endpoint_is_called_accepting_arrow("53aaf9d4-04d3-43d3-9f40-6ce4a9282a5c", limit=2) \
+            .then_the_status_code_should_be(200) \
+            .then_the_response_should_be_an_arrow_stream(truncated=True)
+
+    def test_get_dataset_when_ndjson_is_accepted(self):
+        scenario = GetDatasetScenario(self.context)
+        scenario \
+            .given_i_have_an_app_running() \
+            .when_the_get_metrics_endpoint_is_called_accepting_ndjson("53aaf9d4-04d3-43d3-9f40-6ce4a9282a5c") \
+            .then_the_status_code_should_be(200) \
+            .then_the_response_should_stream_one_record_per_line() \
+            .then_an_info_log_indicates_endpoint_called()
+
+    def test_get_dataset_when_ndjson_is_accepted_with_a_limit(self):
+        scenario = GetDatasetScenario(self.context)
+        scenario \
+            .given_i_have_an_app_running() \
+            .when_the_get_metrics_endpoint_is_called_accepting_ndjson("53aaf9d4-04d3-43d3-9f40-6ce4a9282a5c", limit=2) \
+            .then_the_status_code_should_be(200) \
+            .then_the_stream_should_end_with_a_truncation_line_after(2)
+
+    def test_get_dataset_when_ndjson_is_accepted_and_dataset_not_found(self):
+        scenario = GetDatasetScenario(self.context)
+        scenario \
+            .given_i_have_an_app_running() \
+            .when_the_get_metrics_endpoint_is_called_accepting_ndjson(str(uuid.uuid4())) \
+            .then_the_status_code_should_be(404)
+
+    def test_export_dataset_when_dataset_not_found(self):
+        scenario = GetDatasetScenario(self.context)
+        scenario \
+            .given_i_have_an_app_running() \
+            .when_the_export_dataset_endpoint_is_called(str(uuid.uuid4())) \
+            .then_the_status_code_should_be(404)
+
+    def test_stream_dataset_when_dataset_not_found(self):
+        scenario = GetDatasetScenario(self.context)
+        scenario \
+            .given_i_have_an_app_running() \
+            .when_the_stream_dataset_endpoint_is_called(str(uuid.uuid4())) \
+            .then_the_status_code_should_be(404)
+
+
+class TestGetDatasetBatchScenarios(FastApiTestCase):
+
+    def setUp(self) -> None:
+        self.context = ScenarioContext(
+            client=self.client,
+            test_case=self,
+            logger=self.test_logger,
+            runner=ScenarioRunner()
+        )
+
+    def tearDown(self) -> None:
+        self.context \
+            .runner \
+            .assert_all()
+
+    def test_get_datasets_when_some_are_missing(self):
+        scenario = GetDatasetBatchScenario(self.context)
+        scenario \
+            .given_i_have_an_app_running() \
+            .when_the_get_datasets_endpoint_is_called_with_ids(
+                "53aaf9d4-04d3-43d3-9f40-6ce4a9282a5c",
+                "1379a764-2543-45fd-a78b-8c5a65827417",
+                scenario.missing_id,
+                breakpoint="lg") \
+            .then_the_status_code_should_be(200) \
+            .then_the_response_body_should_contain_large_breakpoint_datasets_and_missing_error() \
+            .then_an_info_log_indicates_endpoint_called()
+
+    def test_get_datasets_when_an_id_is_invalid(self):
+        scenario = GetDatasetBatchScenario(self.context)
+        scenario \
+            .given_i_have_an_app_running() \
+            .when_the_get_datasets_endpoint_is_called_with_ids("notauuid4") \
+            .then_the_status_code_should_be(422)
+
+
+class TestGetDashboardLayoutScenarios(FastApiTestCase):
+
+    def setUp(self) -> None:
+        self.context = ScenarioContext(
+            client=self.client,
+            test_case=self,
+            logger=self.test_logger,
+            runner=ScenarioRunner()
+        )
+
+    def tearDown(self) -> None:
+        self.context \
+            .runner \
+            .assert_all()
+
+    def test_get_layout(self):
+        scenario = GetDashboardLayoutScenario(self.context)
+        scenario \
+            .given_i_have_an_app_running() \
+            .when_the_get_layout_endpoint_is_called("md") \
+            .then_the_status_code_should_be(200) \
+            .then_the_seeded_medium_layouts_should_be_returned()
+
+    def test_get_layout_when_a_dataset_config_is_created(self):
+        scenario = GetDashboardLayoutScenario(self.context)
+        scenario \
+            .given_i_have_an_app_running() \
+            .when_the_get_layout_endpoint_is_called("md") \
+            .and_a_dataset_config_is_created() \
+            .when_the_get_layout_endpoint_is_called("md") \
+            .then_the_status_code_should_be(200) \
+            .then_the_created_layout_should_be_returned()
+
+    def test_get_layout_when_breakpoint_has_no_layouts(self):
+        scenario = GetDashboardLayoutScenario(self.context)
+        scenario \
+            .given_i_have_an_app_running() \
+            .when_the_get_layout_endpoint_is_called("xxl") \
+            .then_the_status_code_should_be(200) \
+            .then_no_layouts_should_be_returned() \
+            .then_an_info_log_indicates_endpoint_called()
+
 
 class TestCreateDatasetConfigScenarios(FastApiTestCase):
 
@@ -122,6 +290,69 @@ class TestCreateDatasetConfigScenarios(FastApiTestCase):
             .then_the_dataset_should_have_been_created() \
             .then_an_info_log_indicates_endpoint_called()
 
+    def test_create_dataset_config_when_dataset_is_read_before_data_is_created(self):
+        scenario = CreateDatasetConfigScenario(self.context)
+        scenario \
+            .given_i_have_an_app_running() \
+            .when_the_create_dataset_config_endpoint_is_called_with_dataset_config() \
+            .and_the_dataset_is_read_before_it_has_data() \
+            .and_data_is_created_for_the_dataset() \
+            .then_the_dataset_should_have_been_created()
+
+    def test_create_dataset_config_when_dataset_is_polled_with_its_etag(self):
+        scenario = CreateDatasetConfigScenario(self.context)
+        scenario \
+            .given_i_have_an_app_running() \
+            .when_the_create_dataset_config_endpoint_is_called_with_dataset_config() \
+            .and_the_dataset_is_read_with_its_etag() \
+            .then_the_dataset_should_not_have_been_modified() \
+            .and_data_is_created_for_the_dataset() \
+            .then_the_old_etag_should_no_longer_match()
+
+    def test_create_dataset_config_when_data_is_created_in_batches(self):
+        scenario = CreateDatasetConfigScenario(self.context)
+        scenario \
+            .given_i_have_an_app_running() \
+            .when_the_create_dataset_config_endpoint_is_called_with_dataset_config() \
+            .and_a_batch_of_data_is_created_for_the_dataset(3) \
+            .and_a_batch_of_data_is_created_for_the_dataset(1000) \
+            .then_the_dataset_should_have_records(1003)
+
+    def test_create_dataset_config_when_data_points_are_exported(self):
+        scenario = CreateDatasetConfigScenario(self.context)
+        scenario.data_point.notification_type = 'Warning "\\ high'
+        scenario \
+            .given_i_have_an_app_running() \
+            .when_the_create_dataset_config_endpoint_is_called_with_dataset_config() \
+            .and_a_batch_of_data_is_created_for_the_dataset(3) \
+            .and_a_batch_of_data_is_created_for_the_dataset(1200) \
+            .then_the_data_points_should_export_as_csv(1203) \
+            .then_the_data_points_should_export_as_ndjson(1203) \
+            .then_an_interrupted_export_should_resume_after_the_last_row(500) \
+            .then_an_export_resuming_after_a_point_of_another_dataset_should_be_rejected("53aaf9d4-04d3-43d3-9f40-6ce4a9282a5c")
+
+    def test_create_dataset_config_when_data_is_uploaded_as_csv(self):
+        scenario = CreateDatasetConfigScenario(self.context)
+        scenario \
+            .given_i_have_an_app_running() \
+            .when_the_create_dataset_config_endpoint_is_called_with_dataset_config() \
+            .and_a_csv_batch_of_data_is_created_for_the_dataset(1500) \
+            .then_the_dataset_should_have_records(1500) \
+            .then_an_invalid_csv_batch_should_be_rejected_without_writing(1500) \
+            .then_an_unsupported_content_type_should_be_rejected()
+
+    def test_create_dataset_config_when_dataset_is_polled_since_a_watermark(self):
+        scenario = CreateDatasetConfigScenario(self.context)
+        scenario \
+            .given_i_have_an_app_running() \
+            .when_the_create_dataset_config_endpoint_is_called_with_dataset_config() \
+            .and_data_is_created_for_the_dataset() \
+            .and_the_dataset_is_read_for_its_watermark() \
+            .and_data_is_created_for_the_dataset() \
+            .then_only_records_added_since_the_watermark_should_be_returned(1) \
+            .then_only_records_added_since_the_watermark_should_be_returned(0) \
+            .then_a_statement_that_is_not_incremental_should_return_its_full_result()
+
 
 class TestCreateDataPointScenarios(FastApiTestCase):
 
@@ -146,6 +377,13 @@ class TestCreateDataPointScenarios(FastApiTestCase):
             .then_the_status_code_should_be(404) \
             .then_an_info_log_indicates_endpoint_called()
 
+    def test_create_data_points_when_no_dataset_config_is_present(self):
+        scenario = CreateDataPointScenario(self.context)
+        scenario \
+            .given_i_have_an_app_running() \
+            .when_the_create_data_points_endpoint_is_called(str(uuid.uuid4())) \
+            .then_the_status_code_should_be(404)
+
     def test_create_data_point(self):
         scenario = CreateDataPointScenario(self.context)
         scenario \
@@ -0,0 +1,187 @@
+import asyncio
+import uuid
+from datetime import date
+from unittest import IsolatedAsyncioTestCase
+
+from sqlalchemy import text
+
+from src.application.services import DatasetUpdatePublisher
+from src.core import DatasetConfigAggregate, DatasetResult, RecordPage, DataNotificationListener, DataVersionStore, \
+    DatasetAggregateWriter, SqlStatement, UnitOfWork
+from src.infrastructure import Settings, SqlAlchemyConnectionPool
+from src.infrastructure.notifications import PostgresDataChangeFeed, DATA_POINTS_CHANNEL
+from src.web.responses import encode_events
+from tests import FastApiTestCase, FakeLogger
+
+
+class FakeDatasetUpdatePublisher(DatasetUpdatePublisher):
+    """
+    reads a fresh page numbered by the read count instead of querying the database
+    """
+
+    def __init__(self):
+        super().__init__(unit_of_work_factory=None, logger=FakeLogger())
+        self.reads = 0
+
+    async def read(self, key: tuple):
+        self.reads += 1
+        await asyncio.sleep(0.01)
+        if key[0] == "missing":
+            return None
+        return DatasetResult(
+            dataset=DatasetConfigAggregate(id=key[0], statement_id="s1", is_mutable=True),
+            page=RecordPage(columns=["read"], rows=[(self.reads,)])
+        )
+
+
+class TestDatasetUpdatePublisher(IsolatedAsyncioTestCase):
+
+    async def subscribe(self, publisher: DatasetUpdatePublisher, _id: str = "d1"):
+        return await publisher.subscribe(_id, date(2025, 6, 1), date(2025, 6, 30), 30, 100, keep_alive_seconds=5)
+
+    async def test_a_change_is_read_once_and_sent_to_every_subscriber(self):
+        # arrange
+        publisher = FakeDatasetUpdatePublisher()
+        subscriptions = [await self.subscribe(publisher) for _ in range(3)]
+        initial = [(await anext(x)).records for x in subscriptions]
+
+        # act
+        await publisher("s1")
+        updates = [(await anext(x)).records for x in subscriptions]
+
+        # assert
+        self.assertEqual(initial, [[{"read": 1}]] * 3)
+        self.assertEqual(updates, [[{"read": 2}]] * 3)
+        self.assertEqual(publisher.reads, 2)
+
+    async def test_changes_notified_during_a_read_are_coalesced(self):
+        # arrange
+        publisher = FakeDatasetUpdatePublisher()
+        subscription = await self.subscribe(publisher)
+        await anext(subscription)
+
+        # act
+        await publisher("s1")
+        await asyncio.sleep(0)
+        for _ in range(10):
+            await publisher("s1")
+        await publisher.topics[("d1", date(2025, 6, 1), date(2025, 6, 30), 30, 100)].refreshing
+        update = await anext(subscription)
+
+        # assert
+        self.assertEqual(publisher.reads, 3)
+        self.assertEqual(update.records, [{"read": 3}])
+
+    async def test_changes_to_other_statements_are_ignored(self):
+        # arrange
+        publisher = FakeDatasetUpdatePublisher()
+        subscription = await self.subscribe(publisher)
+        await anext(subscription)
+
+        # act
+        await publisher("s2")
+
+        # assert
+        self.assertEqual(publisher.reads, 1)
+
+    async def test_topic_is_dropped_with_its_last_subscriber(self):
+        # arrange
+        publisher = FakeDatasetUpdatePublisher()
+        subscription = await self.subscribe(publisher)
+        await anext(subscription)
+
+        # act
+        await subscription.aclose()
+
+        # assert
+        self.assertEqual(publisher.topics, {})
+
+    async def test_missing_datasets_have_no_subscription(self):
+        # arrange
+        publisher = FakeDatasetUpdatePublisher()
+
+        # act
+        subscription = await self.subscribe(publisher, "missing")
+
+        # assert
+        self.assertIsNone(subscription)
+        self.assertEqual(publisher.topics, {})
+
+
+class TestEncodeEvents(IsolatedAsyncioTestCase):
+
+    async def test_items_are_sent_as_events_and_gaps_as_comments(self):
+        # arrange
+        async def events():
+            yield {"a": 1}
+            yield None
+
+        # act
+        chunks = [x async for x in encode_events(events(), event="dataset", mapper=lambda x: x)]
+
+        # assert
+        self.assertEqual(chunks, [b'event: dataset\ndata: {"a":1}\n\n', b": keep-alive\n\n"])
+
+
+class TestPostgresDataChangeFeed(FastApiTestCase):
+
+    def setUp(self):
+        self.statement_id = str(uuid.uuid4())
+        self.dataset_id = str(uuid.uuid4())
+
+    def write_dataset(self) -> None:
+        self.write(DatasetAggregateWriter, DatasetConfigAggregate(
+            id=self.dataset_id,
+            is_mutable=True,
+            statement=SqlStatement(id=self.statement_id, statement="SELECT 1 AS data_value"),
+            layouts=[]
+        ))
+
+    async def notify_from_another_process(self) -> None:
+        """
+        runs the feed as the app's lifespan would and sends the notification over a connection of its own
+        """
+        version_store = self.services[DataVersionStore]
+        version = version_store.get(self.statement_id)
+        logged = len(self.test_logger.logs)
+        feed = PostgresDataChangeFeed(
+            self.services[SqlAlchemyConnectionPool],
+            self.services[list[DataNotificationListener]],
+            self.services[Settings],
+            self.test_logger
+        )
+        await feed.start()
+        try:
+            async with asyncio.timeout(5):
+                while not any(x[1] == "Listening for data notifications" for x in self.test_logger.logs[logged:]):
+                    await asyncio.sleep(0.01)
+                async with self.services[UnitOfWork] as uow:
+                    await uow.session.execute(
+                        text("SELECT pg_notify(:channel, :statement_id)"),
+                        {"channel": DATA_POINTS_CHANNEL, "statement_id": self.statement_id}
+                    )
+                    await uow.save()
+                while version_store.get(self.statement_id) == version:
+                    await asyncio.sleep(0.01)
+        finally:
+            await feed.stop()
+
+    def read(self, etag: str = None):
+        headers = {"Authorization": "Bearer test"}
+        if etag is not None:
+            headers["If-None-Match"] = etag
+        return self.client.get(f"/data/{self.dataset_id}", headers=headers)
+
+    def test_notifications_from_other_processes_change_the_etag(self):
+        # arrange
+        self.write_dataset()
+        etag = self.read().headers["etag"]
+        self.assertEqual(self.read(etag).status_code, 304)
+
+        # act
+        asyncio.run(self.notify_from_another_process())
+
+        # assert
+        response = self.read(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["etag"], etag)